@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+多日持仓变化分析
+基于历史数据库计算每个 (席位, 品种) 的滚动 N 日净变化、连续增减天数、当日变化相对自身历史的 Z 值，
+以及各品种的跨席位一致性。按组排序后用累计和一次算完所有分组，不逐组循环
+
+使用方法:
+    python3 analytics.py --window 5 --days 180
+"""
+
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from position_matrix import PositionMatrix
+from position_store import PositionStore
+
+
+class PositionAnalytics:
+    """历史持仓的多日变化分析"""
+
+    WINDOW = 5  # 滚动净变化的交易日数
+    Z_WINDOW = 60  # Z 值使用的历史观测数（不含当日）
+    Z_MIN_PERIODS = 10  # 历史观测少于该数时不计算 Z 值
+    LOOKBACK_DAYS = 180  # 未指定开始日期时读取的自然日范围
+    CACHE_SIZE = 16
+
+    COLUMNS = ["日期", "席位", "品种", "净方向", "净持仓", "净变化"]
+
+    # 跨实例共享：常驻模式下多次生成报告时复用，数据库写入后通过 revision 自动失效
+    _cache = OrderedDict()
+
+    def __init__(self, store: PositionStore, window: int = None, z_window: int = None,
+                 z_min_periods: int = None):
+        self.store = store
+        self.window = window or self.WINDOW
+        self.z_window = z_window or self.Z_WINDOW
+        self.z_min_periods = max(2, z_min_periods or self.Z_MIN_PERIODS)  # 样本标准差至少需要两个观测
+
+    def compute(self, end: str = None, start: str = None, brokers: list = None):
+        """计算截至 end 的分析结果，返回 {start, end, window, seats, consensus}；没有数据时返回 None"""
+        end = end or self.store.latest_date()
+        if end is None:
+            return None
+        start = start or (datetime.strptime(end, "%Y-%m-%d")
+                          - timedelta(days=self.LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        seats = tuple(sorted(set(brokers))) if brokers else None
+
+        key = (os.path.abspath(self.store.path), start, end, seats, self.window,
+               self.z_window, self.z_min_periods, self.store.revision())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        history = self.store.history(start, end, list(seats) if seats else None, self.COLUMNS)
+        seat_stats = self.seat_stats(history, end)
+        result = {
+            "start": start,
+            "end": end,
+            "window": self.window,
+            "seats": seat_stats,
+            "consensus": self.consensus(seat_stats),
+        }
+        self._cache[key] = result
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def seat_stats(self, history: pd.DataFrame, end: str) -> pd.DataFrame:
+        """逐 (席位, 品种) 的时间序列指标，只返回 end 当天的行；history 需按 (席位, 品种, 日期) 排序"""
+        n = len(history)
+        columns = ["席位", "品种", "净头寸", "当日变化", "N日变化", "连续天数", "Z值", "观测数"]
+        if n == 0:
+            return pd.DataFrame(columns=columns)
+
+        # 净多为正、净空为负；网站的净变化以净持仓绝对值的增减记，换算成同一方向
+        sign = np.where(history["净方向"].to_numpy() == "多", 1, -1)
+        net = history["净持仓"].fillna(0).to_numpy(dtype=np.int64) * sign
+        change = history["净变化"].fillna(0).to_numpy(dtype=np.int64) * sign
+
+        # 分组边界：席位或品种变化处开始新组，group_start 为每行所在组的首行号
+        seat_codes = pd.factorize(history["席位"])[0]
+        variety_codes = pd.factorize(history["品种"])[0]
+        pos = np.arange(n)
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = (seat_codes[1:] != seat_codes[:-1]) | (variety_codes[1:] != variety_codes[:-1])
+        group_start = np.maximum.accumulate(np.where(starts, pos, 0))
+
+        # 滚动和用前缀和相减：窗口左端截断在组首行
+        cs = np.concatenate(([0], np.cumsum(change)))
+        cs2 = np.concatenate(([0], np.cumsum(change * change)))
+        lo = np.maximum(pos - self.window + 1, group_start)
+        rolling = cs[pos + 1] - cs[lo]
+
+        # 连续天数：同号变化连续出现的次数，增多为正、增空为负，无变化为 0
+        direction = np.sign(change)
+        new_run = starts.copy()
+        new_run[1:] |= direction[1:] != direction[:-1]
+        run_start = np.maximum.accumulate(np.where(new_run, pos, 0))
+        streak = (pos - run_start + 1) * direction
+
+        # Z 值：当日变化相对此前 z_window 个观测的均值与样本标准差
+        lo = np.maximum(pos - self.z_window, group_start)
+        count = pos - lo
+        s1 = (cs[pos] - cs[lo]).astype(np.float64)
+        s2 = (cs2[pos] - cs2[lo]).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = s1 / count
+            std = np.sqrt(np.maximum(s2 - s1 * mean, 0) / (count - 1))
+            z = (change - mean) / std
+        z[(count < self.z_min_periods) | ~(std > 0)] = np.nan
+
+        today = (history["日期"] == end).to_numpy()
+        return pd.DataFrame({
+            "席位": history["席位"].to_numpy()[today],
+            "品种": history["品种"].to_numpy()[today],
+            "净头寸": net[today],
+            "当日变化": change[today],
+            "N日变化": rolling[today],
+            "连续天数": streak[today],
+            "Z值": np.round(z[today], 2),
+            "观测数": (pos - group_start + 1)[today],
+        }, columns=columns)
+
+    def consensus(self, seat_stats: pd.DataFrame) -> pd.DataFrame:
+        """各品种跨席位一致性：N 日内增多与增空的席位数之差占有持仓席位数的比例，由 PositionMatrix.consensus 计算"""
+        columns = ["品种", "席位数", "净多席位", "增多席位", "增空席位", "一致度", "N日合计", "净头寸合计"]
+        if seat_stats.empty:
+            return pd.DataFrame(columns=columns)
+        matrix = PositionMatrix.from_stats(seat_stats, net="净头寸", change="N日变化")
+        return matrix.consensus(by="change").rename(columns={"净变化合计": "N日合计"})[columns]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="多日持仓变化分析")
+    parser.add_argument("--end", help="截止日期 YYYY-MM-DD，默认数据库中最新日期")
+    parser.add_argument("--days", type=int, default=PositionAnalytics.LOOKBACK_DAYS, help="读取的自然日范围")
+    parser.add_argument("--window", type=int, default=PositionAnalytics.WINDOW, help="滚动净变化的交易日数")
+    parser.add_argument("--brokers", help="席位，逗号分隔，默认全部")
+    parser.add_argument("--top", type=int, default=20, help="每张表显示的行数")
+    parser.add_argument("--db", default=PositionStore.DB_FILE, help="数据库文件")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ 数据库不存在: {args.db}")
+        return
+    with PositionStore(args.db, readonly=True) as store:
+        end = args.end or store.latest_date()
+        start = None
+        if end:
+            start = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=args.days)).strftime("%Y-%m-%d")
+        result = PositionAnalytics(store, window=args.window).compute(
+            end, start, args.brokers.split(",") if args.brokers else None)
+    if result is None or result["seats"].empty:
+        print("⚠️ 没有匹配的数据")
+        return
+    seats = result["seats"]
+    print(f"📅 {result['start']} ~ {result['end']}，滚动 {result['window']} 个交易日")
+    print("\n📈 N 日净变化最大:")
+    order = np.argsort(-seats["N日变化"].abs().to_numpy(), kind="stable")[:args.top]
+    print(seats.iloc[order].to_string(index=False))
+    print("\n🤝 品种一致性:")
+    print(result["consensus"].head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
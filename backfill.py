@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+批量回补
+对日期范围内缓存中的每个交易日重新解析、写入历史数据库并生成当日报告。
+解析与渲染分两轮在进程池中并行：第一轮各进程解析，主进程统一写库；第二轮各进程只读数据库，
+计算多日分析并渲染报告。在途任务数有上限，内存不随日期数增长；进度逐日写入文件，中断后重新运行会跳过已完成的日期
+
+使用方法:
+    python3 broker_position_scraper.py --backfill 2024-01-01 2024-12-31 --workers 8
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from analytics import PositionAnalytics
+from broker_position_scraper import BrokerPositionScraper
+from metrics import Metrics
+from position_store import PositionStore
+from response_cache import ResponseCache
+
+
+class Backfill:
+    """按交易日并行回补历史数据与报告"""
+
+    PROGRESS_FILE = "backfill_progress.json"
+    OUTPUT_DIR = "reports"
+    QUEUE_FACTOR = 2  # 在途任务数上限 = 进程数 × 该系数
+
+    def __init__(self, options: dict, cache_dir: str = None, db_path: str = None,
+                 workers: int = None, output_dir: str = None, progress_file: str = None,
+                 metrics: Metrics = None):
+        self.options = options  # 构造 BrokerPositionScraper 的参数（brokers、report_mode 等），需可序列化
+        self.cache_dir = cache_dir or ResponseCache.CACHE_DIR
+        self.db_path = db_path or PositionStore.DB_FILE
+        self.workers = workers or os.cpu_count() or 1
+        self.output_dir = output_dir or self.OUTPUT_DIR
+        self.progress_file = progress_file or self.PROGRESS_FILE
+        self.metrics = metrics or Metrics()
+        self.progress = {"key": self._progress_key(), "parsed": {}, "rendered": {}}
+
+    def run(self, start: str, end: str, force: bool = False):
+        """回补 [start, end] 内缓存中有数据的交易日；force 时忽略已完成记录全部重做"""
+        with ResponseCache(self.cache_dir) as cache:
+            dates = [d for d in cache.dates() if start <= d <= end]
+        print("=" * 70)
+        print(f"📦 批量回补 {start} ~ {end}: 缓存中共 {len(dates)} 个交易日, {self.workers} 个进程")
+        print("=" * 70)
+        if not dates:
+            print("❌ 缓存中没有该范围的数据，请先抓取或调整日期范围")
+            return
+
+        if not force:
+            self._load_progress()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with self.metrics.span("backfill"):
+            # 第一轮：解析，主进程写库
+            pending = [d for d in dates if d not in self.progress["parsed"]]
+            print(f"\n[1/2] 解析 {len(pending)} 个交易日（已完成 {len(dates) - len(pending)} 个）")
+            if pending:
+                with PositionStore(self.db_path) as store:
+                    self._run_phase("parse", _parse_day, pending,
+                                    lambda result: self._store_day(store, result))
+
+            # 第二轮：渲染，各进程只读数据库
+            pending = [d for d in dates if self.progress["parsed"].get(d) and d not in self.progress["rendered"]]
+            print(f"\n[2/2] 生成报告 {len(pending)} 份")
+            self._run_phase("render", _render_day, pending, self._record_report)
+
+        missing = [d for d in dates if not self.progress["parsed"].get(d)]
+        print(f"\n✅ 回补完成: 报告目录 {self.output_dir}/")
+        if missing:
+            print(f"   ⚠️ {len(missing)} 个交易日没有可用数据: {', '.join(missing[:10])}"
+                  + (" ..." if len(missing) > 10 else ""))
+        self.metrics.print_summary()
+
+    def _run_phase(self, name: str, func, dates: list, on_result):
+        """在进程池中执行 func(任务参数)，在途任务不超过上限，结果按完成顺序交给 on_result"""
+        if not dates:
+            return
+        limit = self.workers * self.QUEUE_FACTOR
+        total = len(dates)
+        done = 0
+        start = time.perf_counter()
+        todo = iter(dates)
+        # spawn 启动的子进程不继承主进程已打开的 SQLite 连接
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(self.workers, total), mp_context=context) as pool:
+            running = set()
+            while True:
+                for trade_date in todo:
+                    running.add(pool.submit(func, self._task(trade_date)))
+                    if len(running) >= limit:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done += 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"   [{done}/{total}] ❌ {e}")
+                        continue
+                    self.metrics.record(f"backfill_{name}", result["seconds"])
+                    on_result(result)
+                    elapsed = time.perf_counter() - start
+                    eta = elapsed / done * (total - done)
+                    print(f"   [{done}/{total}] {result['date']} ✓ {result['summary']} "
+                          f"(已用 {elapsed:.0f}s, 预计剩余 {eta:.0f}s)")
+
+    def _task(self, trade_date: str) -> dict:
+        return {"date": trade_date, "options": self.options, "cache_dir": self.cache_dir,
+                "db_path": self.db_path, "output_dir": self.output_dir}
+
+    def _store_day(self, store: PositionStore, result: dict):
+        """主进程统一写库，避免多进程并发写 SQLite。没有数据的日期不记为完成，下次运行重新解析"""
+        if not result["rows"]:
+            return
+        store.upsert(result["varieties"], result["date"])
+        store.upsert_contracts(result["contracts"], result["date"])
+        self.progress["parsed"][result["date"]] = result["rows"]
+        # 新写入的日期会改变其后各日的多日分析，这些日期的报告需要重新生成
+        self.progress["rendered"] = {d: p for d, p in self.progress["rendered"].items() if d < result["date"]}
+        self._save_progress()
+
+    def _record_report(self, result: dict):
+        self.progress["rendered"][result["date"]] = result["path"]
+        self._save_progress()
+
+    def _progress_key(self) -> str:
+        """进度只对同一组席位与参数有效，参数改变后已完成的日期需要重做"""
+        payload = json.dumps({"options": self.options, "output_dir": self.output_dir},
+                             ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _load_progress(self):
+        if not os.path.exists(self.progress_file):
+            return
+        with open(self.progress_file, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("key") != self.progress["key"]:
+            print("   ℹ️ 席位或参数与上次回补不同，忽略已有进度")
+            return
+        self.progress.update(saved)
+
+    def _save_progress(self):
+        # 先写临时文件再改名，中断时进度文件不会损坏
+        tmp = f"{self.progress_file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self.progress_file)
+
+
+def _parse_day(task: dict) -> dict:
+    """子进程：从缓存重放某交易日并清理，返回品种汇总与合约明细"""
+    start = time.perf_counter()
+    with ResponseCache(task["cache_dir"]) as cache:
+        scraper = BrokerPositionScraper(trade_date=task["date"], cache=cache, **task["options"])
+        scraper.load_cached(task["date"])
+    varieties = contracts = None
+    if not scraper.position_data.empty:
+        rows = scraper.position_data
+        varieties = scraper.aggregate_varieties(rows)
+        contracts = rows[rows["合约"].notna()]
+    count = 0 if varieties is None else len(varieties)
+    return {"date": task["date"], "varieties": varieties, "contracts": contracts, "rows": count,
+            "seconds": time.perf_counter() - start, "summary": f"{count} 条"}
+
+
+def _render_day(task: dict) -> dict:
+    """子进程：只读数据库，计算截至当日的多日分析并生成当日报告"""
+    start = time.perf_counter()
+    scraper = BrokerPositionScraper(trade_date=task["date"], **task["options"])
+    with PositionStore(task["db_path"], readonly=True) as store:
+        df = store.snapshot(task["date"])
+        analytics = PositionAnalytics(store).compute(task["date"], brokers=scraper.brokers)
+    path = os.path.join(task["output_dir"], f"broker_positions_report_{task['date']}.html")
+    size = scraper.write_report(df, analytics, path)
+    return {"date": task["date"], "path": path, "seconds": time.perf_counter() - start,
+            "summary": f"{size / 1024:.0f} KB"}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+多日持仓分析的等价性校验与性能基准
+
+使用方法:
+    python3 benchmarks/bench_analytics.py                          # 300 席位 × 40 品种 × 250 交易日
+    python3 benchmarks/bench_analytics.py --seats 500 --days 750 --skip-reference
+
+先用 groupby/rolling 的直接实现校验前缀和实现的结果，再分别测量读库、计算与命中缓存的耗时。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analytics import PositionAnalytics  # noqa: E402
+from position_store import PositionStore  # noqa: E402
+
+
+def synthetic_history(seats: int, varieties: int, days: int, seed: int = 7):
+    """逐交易日生成清理后数据，约 10% 的 (席位, 品种) 当天缺席，返回 [(日期, DataFrame)]"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=days).strftime("%Y-%m-%d")
+    seat_names = np.repeat([f"席位{i:03d}" for i in range(seats)], varieties)
+    variety_names = np.tile([f"品种{j:02d}" for j in range(varieties)], seats)
+    net = rng.integers(-20000, 20000, seats * varieties)
+    frames = []
+    for date in dates:
+        step = rng.integers(-800, 800, len(net))
+        net = net + step
+        present = rng.random(len(net)) > 0.1
+        frames.append((date, pd.DataFrame({
+            '席位': seat_names[present],
+            '品种': variety_names[present],
+            '净方向': np.where(net[present] >= 0, '多', '空'),
+            '净持仓': np.abs(net[present]),
+            # 与网站一致：净变化按净持仓绝对值的增减记
+            '净变化': (step * np.where(net >= 0, 1, -1))[present],
+            '多头持仓': 0, '多头变化': 0, '空头持仓': 0, '空头变化': 0,
+        })))
+    return frames
+
+
+def seat_stats_reference(analytics, history: pd.DataFrame, end: str) -> pd.DataFrame:
+    """groupby + rolling 的直接实现，作为等价性校验的基准"""
+    df = history.copy()
+    sign = np.where(df['净方向'] == '多', 1, -1)
+    df['净头寸'] = df['净持仓'].fillna(0).astype('int64') * sign
+    df['当日变化'] = df['净变化'].fillna(0).astype('int64') * sign
+    grouped = df.groupby(['席位', '品种'], sort=False)['当日变化']
+    df['N日变化'] = grouped.transform(lambda s: s.rolling(analytics.window, min_periods=1).sum()).astype('int64')
+    prev = grouped.shift(1)
+    stats = prev.groupby([df['席位'], df['品种']], sort=False).rolling(analytics.z_window, min_periods=1)
+    mean = stats.mean().reset_index(level=[0, 1], drop=True).sort_index()
+    std = stats.std().reset_index(level=[0, 1], drop=True).sort_index()
+    count = df.groupby(['席位', '品种'], sort=False).cumcount()
+    z = (df['当日变化'] - mean) / std
+    z[(count.clip(upper=analytics.z_window) < analytics.z_min_periods) | ~(std > 0)] = np.nan
+    df['Z值'] = z.round(2)
+
+    def streak(s):
+        direction = np.sign(s)
+        run = (direction != direction.shift()).cumsum()
+        return (direction.groupby(run).cumcount() + 1) * direction
+
+    df['连续天数'] = grouped.transform(streak).astype('int64')
+    df['观测数'] = count + 1
+    today = df[df['日期'] == end]
+    return today[['席位', '品种', '净头寸', '当日变化', 'N日变化', '连续天数', 'Z值', '观测数']].reset_index(drop=True)
+
+
+def consensus_reference(seat_stats: pd.DataFrame) -> pd.DataFrame:
+    """groupby 的直接实现：净多按净头寸大于 0 计，席位数为该品种的全部席位"""
+    rolling = seat_stats['N日变化']
+    grouped = seat_stats.assign(
+        净多=seat_stats['净头寸'] > 0, 增多=rolling > 0, 增空=rolling < 0,
+    ).groupby('品种', sort=False)
+    result = pd.DataFrame({
+        '席位数': grouped.size(),
+        '净多席位': grouped['净多'].sum(),
+        '增多席位': grouped['增多'].sum(),
+        '增空席位': grouped['增空'].sum(),
+        'N日合计': grouped['N日变化'].sum(),
+        '净头寸合计': grouped['净头寸'].sum(),
+    })
+    result['一致度'] = ((result['增多席位'] - result['增空席位']) / result['席位数']).round(2)
+    strength = result['一致度'].abs() * result['席位数']
+    result = result.iloc[np.argsort(-strength.to_numpy(), kind='stable')]
+    return result.reset_index()[['品种', '席位数', '净多席位', '增多席位', '增空席位', '一致度', 'N日合计', '净头寸合计']]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多日持仓分析基准")
+    parser.add_argument("--seats", type=int, default=300)
+    parser.add_argument("--varieties", type=int, default=40)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--skip-reference", action="store_true", help="不运行 groupby/rolling 实现")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "history.db")
+    frames = synthetic_history(args.seats, args.varieties, args.days)
+    with PositionStore(path) as store:
+        for date, df in frames:
+            store.upsert(df, date)
+        end = frames[-1][0]
+        rows = sum(len(df) for _, df in frames)
+        print(f"{args.seats} 席位 × {args.varieties} 品种 × {args.days} 交易日 = {rows:,} 行")
+
+        analytics = PositionAnalytics(store)
+        read, history = timed(store.history, None, end, None, analytics.COLUMNS)
+        fast, actual = timed(analytics.seat_stats, history, end)
+        print(f"   读取历史: {read:.2f}s")
+        print(f"   前缀和实现: {fast:.3f}s")
+        if not args.skip_reference:
+            slow, expected = timed(seat_stats_reference, analytics, history, end)
+            pd.testing.assert_frame_equal(actual.astype({'Z值': 'float64'}), expected,
+                                          check_dtype=False, atol=0.011)
+            print(f"   groupby/rolling 实现: {slow:.3f}s ({slow / fast:.1f}x)，结果一致")
+            # 品种一致性：部分席位的净头寸置为 0，这些席位计入席位数但不算净多
+            stats = actual.copy()
+            stats.loc[stats.index[::50], '净头寸'] = 0
+            pd.testing.assert_frame_equal(analytics.consensus(stats), consensus_reference(stats), check_dtype=False)
+            print("   品种一致性与 groupby 实现一致（含净头寸为 0 的席位）")
+
+        first, _ = timed(analytics.compute, end, "2000-01-01")
+        cached, _ = timed(analytics.compute, end, "2000-01-01")
+        print(f"   compute 首次: {first:.2f}s, 命中缓存: {cached * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
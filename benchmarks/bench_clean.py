@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+_clean_data 列式实现的等价性校验与性能基准
+
+使用方法:
+    python3 benchmarks/bench_clean.py                  # 校验 + 1万/10万/100万行基准
+    python3 benchmarks/bench_clean.py --rows 1000000 --skip-reference
+
+先用边界用例语料和随机数据确认列式实现与原逐行实现输出完全一致，再比较耗时。
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from broker_position_scraper import BrokerPositionScraper  # noqa: E402
+
+
+# 逐行实现使用的单元格解析规则与函数，原样保留在这里，不随被测代码变化
+NET_PATTERN = re.compile(r'净(多|空)(\d+)\s*\n?\(?([增减]少?)(\d+)\)?')
+POSITION_PATTERN = re.compile(r'^(\d+)(?:\s*\n?\(([+-]?\d+)\))?')
+CONTRACT_PATTERN = re.compile(r'^([a-zA-Z]+\d+)')
+
+
+def parse_net(text):
+    if pd.isna(text) or text == 0:
+        return None, None, None
+    match = NET_PATTERN.search(str(text))
+    if match:
+        change_dir = 1 if '增' in match.group(3) else -1
+        return match.group(1), int(match.group(2)), int(match.group(4)) * change_dir
+    return None, None, None
+
+
+def parse_position(text):
+    if pd.isna(text):
+        return None, None
+    match = POSITION_PATTERN.match(str(text))
+    if match:
+        return int(match.group(1)), int(match.group(2) or 0)
+    return None, None
+
+
+def extract_contract(text):
+    if pd.isna(text):
+        return None
+    match = CONTRACT_PATTERN.match(str(text))
+    return match.group(1) if match else None
+
+
+def clean_rows_reference(df):
+    """原逐行实现（iterrows）保留合约列、按 (席位, 品种, 合约) 去重，作为等价性校验的基准；
+    当前品种按席位分别记录，不沿用上一席位的品种"""
+    results = []
+    current_varieties = {}
+    
+    for _, row in df.iterrows():
+        broker = row.get('席位', '')
+        variety_text = str(row.get('品种', '')) if pd.notna(row.get('品种')) else ''
+        net_text = row.get('总净持仓', '')
+        contract_text = row.get('合约', '')
+        long_text = row.get('多头持仓', '')
+        short_text = row.get('空头持仓', '')
+        current_variety = current_varieties.get(broker)
+        
+        if pd.isna(net_text) and pd.isna(contract_text) and pd.isna(long_text):
+            if variety_text and '建仓过程' not in variety_text and len(variety_text) < 10:
+                current_varieties[broker] = variety_text
+            continue
+            
+        direction, net_pos, net_chg = parse_net(net_text)
+        
+        if direction:
+            current_variety = variety_text if variety_text and '建仓过程' not in variety_text else current_variety
+            current_varieties[broker] = current_variety
+            long_pos, long_chg = parse_position(long_text)
+            short_pos, short_chg = parse_position(short_text)
+            
+            if current_variety:
+                results.append({
+                    '席位': broker,
+                    '品种': current_variety,
+                    '合约': extract_contract(contract_text),
+                    '净方向': direction,
+                    '净持仓': net_pos,
+                    '净变化': net_chg,
+                    '多头持仓': long_pos,
+                    '多头变化': long_chg,
+                    '空头持仓': short_pos,
+                    '空头变化': short_chg,
+                })
+                
+    df_result = pd.DataFrame(results)
+    df_result = df_result.dropna(subset=['品种'])
+    df_result = df_result[df_result['品种'].str.len() > 0]
+    df_result = df_result.drop_duplicates(subset=['席位', '品种', '合约'])
+    return df_result.reset_index(drop=True)
+
+
+def aggregate_reference(rows):
+    """按 (席位, 品种) 的直接 groupby 汇总：有合约时对合约求和，否则取第一条"""
+    results = []
+    for (broker, variety), group in rows.groupby(['席位', '品种'], sort=False):
+        coded = group[group['合约'].notna()]
+        group = coded if len(coded) else group.iloc[:1]
+        sign = group['净方向'].map({'多': 1, '空': -1})
+        net = int((group['净持仓'] * sign).sum())
+        change = int((group['净变化'] * sign).sum())
+        direction = 1 if net >= 0 else -1
+        result = {'席位': broker, '品种': variety, '净方向': '多' if direction > 0 else '空',
+                  '净持仓': abs(net), '净变化': change * direction}
+        for name in ['多头持仓', '多头变化', '空头持仓', '空头变化']:
+            result[name] = group[name].sum(min_count=1)
+        results.append(result)
+    return pd.DataFrame(results)
+
+
+# 边界用例：分类行、建仓过程行、超长品种名、缺失单元格、API 数字行、无法解析的文本
+EDGE_CORPUS = [
+    [
+        {'席位': '乾坤期货', '品种': '黑色系'},
+        {'席位': '乾坤期货', '品种': '螺纹钢', '合约': 'rb2505', '总净持仓': '净多123\n(增45)',
+         '多头持仓': '500\n(+12)', '空头持仓': '377\n(-3)'},
+        {'席位': '乾坤期货', '品种': '', '合约': 'rb2510', '总净持仓': '净空20(减少5)',
+         '多头持仓': '10', '空头持仓': None},
+        {'席位': '乾坤期货', '品种': '建仓过程', '合约': 'hc2505', '总净持仓': '净空7 (增1)',
+         '多头持仓': 'abc', '空头持仓': '7(+1)'},
+        # 新席位开头的持仓行没有品种，不沿用上一席位的 "螺纹钢"，应被丢弃
+        {'席位': '摩根大通', '品种': '这是一个超过十个字的分类标题行'},
+        {'席位': '摩根大通', '品种': None, '合约': 'i2509', '总净持仓': '净多9(减9)',
+         '多头持仓': '9 (0)', '空头持仓': '0'},
+        {'席位': '摩根大通', '品种': '螺纹钢', '合约': 'rb2505', '总净持仓': '净多1(增1)',
+         '多头持仓': '1', '空头持仓': '0'},
+        {'席位': '摩根大通', '品种': '铁矿石', '合约': 'i2505', '总净持仓': '—',
+         '多头持仓': '1', '空头持仓': '0'},
+        {'席位': '国泰君安', '品种': '铜', '合约': None, '总净持仓': None, '多头持仓': None},
+        {'席位': '国泰君安', '品种': '一', '合约': 'cu2505', '总净持仓': '净空300\n增10',
+         '多头持仓': 1200, '空头持仓': 1500.0},
+        {'席位': '中信期货', '品种': '螺纹钢', '合约': 'rb2505', '多头持仓': 10, '空头持仓': 3,
+         '净持仓': 7},
+    ],
+    # 没有任何分类行时，开头的持仓行应被丢弃
+    [
+        {'席位': '乾坤期货', '品种': '', '合约': 'rb2505', '总净持仓': '净多1(增1)',
+         '多头持仓': '1', '空头持仓': '0'},
+        {'席位': '乾坤期货', '品种': '螺纹钢', '合约': 'rb2505', '总净持仓': '净多2(增2)',
+         '多头持仓': '2', '空头持仓': '0'},
+    ],
+]
+
+VARIETIES = ['螺纹钢', '热卷', '铁矿石', '焦炭', '焦煤', '沪铜', '沪铝', '沪镍', '豆粕', '棕榈油',
+             '甲醇', 'PTA', '原油', '黄金', '白银', '玉米', '白糖', '棉花', '橡胶', '纯碱']
+BROKERS = ['乾坤期货', '摩根大通', '国泰君安', '中信期货', '永安期货', '华泰期货', '银河期货', '东证期货']
+
+
+def synthetic_rows(n: int, seed: int = 7) -> pd.DataFrame:
+    """生成与页面表格结构相同的原始数据：分类行 + 若干合约行"""
+    rng = random.Random(seed)
+    rows = []
+    while len(rows) < n:
+        broker = rng.choice(BROKERS)
+        variety = rng.choice(VARIETIES)
+        rows.append({'席位': broker, '品种': variety})
+        for i in range(rng.randint(1, 4)):
+            long_pos = rng.randint(0, 50000)
+            short_pos = rng.randint(0, 50000)
+            net = long_pos - short_pos
+            word = rng.choice(['增', '减', '减少'])
+            rows.append({
+                '席位': broker,
+                '品种': variety if i == 0 and rng.random() < 0.5 else rng.choice(['', '建仓过程']),
+                '合约': f"rb{2501 + i}",
+                '总净持仓': f"净{'多' if net >= 0 else '空'}{abs(net)}\n({word}{rng.randint(0, 999)})",
+                '多头持仓': f"{long_pos}\n({rng.randint(-999, 999):+d})" if rng.random() < 0.9 else None,
+                '空头持仓': f"{short_pos}\n({rng.randint(-999, 999):+d})" if rng.random() < 0.9 else str(short_pos),
+            })
+    return pd.DataFrame(rows[:n])
+
+
+def plain(df):
+    """类别与字符串列转为 object、整数列转为 float，便于与逐行实现的推断类型比较"""
+    df = df.copy()
+    for name in df.columns:
+        if pd.api.types.is_numeric_dtype(df[name]):
+            df[name] = df[name].astype('float64')
+        else:
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return df
+
+
+def check_equivalence(scraper):
+    """逐个语料比较合约级记录与品种汇总的输出"""
+    corpus = [pd.DataFrame(rows) for rows in EDGE_CORPUS]
+    corpus += [synthetic_rows(n, seed) for n, seed in [(50, 1), (500, 2), (5000, 3)]]
+    for i, df in enumerate(corpus):
+        expected = clean_rows_reference(df)
+        actual = scraper.normalizer.parse_table(df).drop(columns='来源')
+        pd.testing.assert_frame_equal(plain(actual), plain(expected))
+        pd.testing.assert_frame_equal(plain(scraper.aggregate_varieties(actual)),
+                                      plain(aggregate_reference(expected)))
+    print(f"✓ 等价性校验通过 ({len(corpus)} 组语料)")
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="_clean_data 基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-reference", action="store_true", help="不运行逐行实现（大数据量时很慢）")
+    args = parser.parse_args()
+    
+    scraper = BrokerPositionScraper()
+    check_equivalence(scraper)
+    
+    print(f"\n{'行数':>10} {'逐行(秒)':>10} {'列式(秒)':>10} {'加速比':>8}")
+    for n in args.rows:
+        df = synthetic_rows(n)
+        fast, _ = timed(scraper._clean_data, df)
+        if args.skip_reference:
+            print(f"{n:>10,} {'-':>10} {fast:>10.3f} {'-':>8}")
+            continue
+        slow, _ = timed(clean_rows_reference, df)
+        print(f"{n:>10,} {slow:>10.3f} {fast:>10.3f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+数据文件导出基准
+
+使用方法:
+    python3 benchmarks/bench_export.py                        # 10万/100万行，全部格式
+    python3 benchmarks/bench_export.py --rows 100000 --formats parquet csv excel_stream
+
+对原始数据（页面表格文本、稀疏列）和合约明细（清理后的类别与整数列）两种数据，
+分别测量各格式的写入耗时、常驻内存（RSS）峰值增量与文件大小。每项在独立的子进程中运行，互不影响内存峰值。
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_clean import synthetic_rows  # noqa: E402
+from data_export import DataExporter  # noqa: E402
+
+FORMATS = ["excel_pandas", "excel_stream", "csv", "parquet", "feather"]
+
+
+def synthetic_contracts(n: int, seed: int = 7) -> pd.DataFrame:
+    """生成 RecordNormalizer.parse_table 输出格式的合约级数据"""
+    rng = np.random.default_rng(seed)
+    long_pos = rng.integers(0, 50000, n, dtype=np.int32)
+    short_pos = rng.integers(0, 50000, n, dtype=np.int32)
+    net = long_pos - short_pos
+    return pd.DataFrame({
+        '席位': pd.Categorical.from_codes(rng.integers(0, 500, n), [f"席位{i:03d}" for i in range(500)]),
+        '品种': pd.Categorical.from_codes(rng.integers(0, 80, n), [f"品种{j:02d}" for j in range(80)]),
+        '合约': pd.Categorical.from_codes(rng.integers(0, 400, n), [f"rb{2501 + k}" for k in range(400)]),
+        '净方向': pd.Categorical(np.where(net >= 0, '多', '空'), categories=['多', '空']),
+        '净持仓': np.abs(net),
+        '净变化': rng.integers(-999, 999, n, dtype=np.int32),
+        '多头持仓': long_pos,
+        '多头变化': rng.integers(-999, 999, n, dtype=np.int32),
+        '空头持仓': short_pos,
+        '空头变化': rng.integers(-999, 999, n, dtype=np.int32),
+    })
+
+
+def current_rss() -> int:
+    """当前常驻内存字节数；非 Linux 系统退回进程历史峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_case(dataset: str, fmt: str, rows: int, directory: str) -> dict:
+    """子进程：生成数据后写一次文件，返回耗时、RSS 峰值增量与文件大小"""
+    df = synthetic_rows(rows) if dataset == "raw" else synthetic_contracts(rows)
+    name = os.path.join(directory, f"{dataset}_{fmt}_{rows}")
+    if fmt == "excel_pandas":
+        path = name + ".xlsx"
+        write = lambda: df.to_excel(path, index=False)  # noqa: E731
+    elif fmt == "excel_stream":
+        path = name + ".xlsx"
+        write = lambda: DataExporter("csv").write_excel(name, {"data": df})  # noqa: E731
+    else:
+        exporter = DataExporter(fmt)
+        path = name + exporter.EXTENSIONS[exporter.output_format]
+        write = lambda: exporter.write({name: df})  # noqa: E731
+
+    # 后台线程采样 RSS，记录写入期间的最大值
+    baseline = current_rss()
+    peak = [baseline]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            peak[0] = max(peak[0], current_rss())
+            time.sleep(0.002)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    write()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    sampler.join()
+    peak[0] = max(peak[0], current_rss())
+    size = os.path.getsize(path)
+    os.remove(path)
+    return {"seconds": elapsed, "rss_mb": (peak[0] - baseline) / 1024 / 1024, "size_mb": size / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据文件导出基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--datasets", nargs="+", choices=["raw", "contracts"], default=["raw", "contracts"])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    context = multiprocessing.get_context("spawn")
+    for dataset in args.datasets:
+        for n in args.rows:
+            print(f"\n{dataset} {n:,} 行")
+            print(f"   {'格式':<14}{'耗时':>10}{'RSS 增量':>12}{'文件大小':>12}")
+            for fmt in args.formats:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(run_case, dataset, fmt, n, directory).result()
+                print(f"   {fmt:<14}{result['seconds']:>9.2f}s{result['rss_mb']:>10.1f}MB"
+                      f"{result['size_mb']:>10.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
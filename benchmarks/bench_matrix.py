@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+席位 × 品种矩阵的等价性校验与性能基准
+
+使用方法:
+    python3 benchmarks/bench_matrix.py                        # 100/500/1000 个席位
+    python3 benchmarks/bench_matrix.py --seats 500 --varieties 80
+
+先确认矩阵查询与逐席位筛选长表的 pandas 实现结果一致（各席位净多/净空前 8 个品种、品种持仓席位、
+品种一致性、席位余弦相似度），再比较耗时。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from broker_position_scraper import BrokerPositionScraper  # noqa: E402
+from fixtures import SyntheticMarket  # noqa: E402
+from position_matrix import PositionMatrix  # noqa: E402
+
+TOP_N = 8
+
+
+def top_reference(df: pd.DataFrame, brokers: list) -> dict:
+    """原 _build_html 的做法：每个席位筛选一次长表，再 nlargest"""
+    result = {}
+    for broker in brokers:
+        seat = df[df['席位'] == broker]
+        for direction in ['多', '空']:
+            rows = seat[seat['净方向'] == direction].nlargest(TOP_N, '净持仓')
+            result[broker, direction] = rows['品种'].astype(str).tolist()
+    return result
+
+
+def top_matrix(matrix: PositionMatrix) -> dict:
+    result = {}
+    for direction, side in [('多', PositionMatrix.LONG), ('空', PositionMatrix.SHORT)]:
+        top = matrix.top_k(TOP_N, side)
+        for i, broker in enumerate(matrix.seats):
+            result[broker, direction] = [matrix.varieties[j] for j in top[i] if j >= 0]
+    return result
+
+
+def short_seats_reference(df: pd.DataFrame, variety: str) -> list:
+    rows = df[(df['品种'] == variety) & (df['净方向'] == '空')]
+    rows = rows.iloc[np.argsort(-rows['净持仓'].to_numpy(), kind='stable')]
+    return [(str(s), -int(n)) for s, n in zip(rows['席位'], rows['净持仓'])]
+
+
+def consensus_reference(df: pd.DataFrame) -> pd.DataFrame:
+    sign = np.where(df['净方向'] == '多', 1, -1)
+    grouped = df.assign(净多=sign > 0, 净空=sign < 0, 净头寸=df['净持仓'] * sign,
+                        带符号变化=df['净变化'] * sign).groupby('品种', sort=False, observed=True)
+    result = pd.DataFrame({'席位数': grouped.size(), '净多席位': grouped['净多'].sum(),
+                           '净空席位': grouped['净空'].sum(), '净头寸合计': grouped['净头寸'].sum(),
+                           '净变化合计': grouped['带符号变化'].sum()})
+    return result
+
+
+def similarity_reference(df: pd.DataFrame, brokers: list) -> np.ndarray:
+    sign = np.where(df['净方向'] == '多', 1, -1)
+    wide = df.assign(净头寸=df['净持仓'] * sign).pivot_table(
+        index='席位', columns='品种', values='净头寸', aggfunc='first', observed=True).reindex(brokers).fillna(0)
+    vectors = wide.to_numpy(dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = np.inf
+    unit = vectors / norms[:, None]
+    return unit @ unit.T
+
+
+def timed(func, repeat: int = 3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="席位 × 品种矩阵基准")
+    parser.add_argument("--seats", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--varieties", type=int, default=60)
+    args = parser.parse_args()
+
+    for seats in args.seats:
+        market = SyntheticMarket(seats, args.varieties)
+        scraper = BrokerPositionScraper(brokers=market.brokers)
+        df = scraper._clean_data(pd.DataFrame(market.all_dom_rows()))
+        brokers = market.brokers
+        variety = market.varieties[0]
+
+        build_time, matrix = timed(lambda: PositionMatrix.from_frame(df, brokers))
+        ref_top_time, ref_top = timed(lambda: top_reference(df, brokers), 1)
+        top_time, top = timed(lambda: top_matrix(matrix))
+        assert top == ref_top, "前 N 个品种不一致"
+        assert matrix.seats_in(variety, PositionMatrix.SHORT) == short_seats_reference(df, variety)
+
+        ref_consensus = consensus_reference(df)
+        consensus_time, consensus = timed(matrix.consensus)
+        mine = consensus.set_index('品种').loc[ref_consensus.index.astype(str)]
+        for column in ref_consensus.columns:
+            assert (mine[column].to_numpy() == ref_consensus[column].to_numpy()).all(), f"一致性 {column} 不一致"
+
+        ref_sim_time, ref_sim = timed(lambda: similarity_reference(df, brokers), 1)
+        sim_time, sim = timed(matrix.similarity)
+        assert np.allclose(sim, ref_sim), "相似度不一致"
+        assert np.isclose(matrix.compare(brokers[0], brokers[1]), ref_sim[0, 1])
+
+        print(f"\n{seats} 个席位 × {len(matrix.varieties)} 个品种 ({len(df)} 行): 结果一致 ✓")
+        print(f"   构建矩阵          {build_time * 1000:>9.2f} ms")
+        print(f"   各席位前 {TOP_N} 品种   {ref_top_time * 1000:>9.2f} ms → {top_time * 1000:>8.2f} ms"
+              f"  ({ref_top_time / top_time:.0f}x)")
+        print(f"   品种一致性        {consensus_time * 1000:>9.2f} ms")
+        print(f"   相似度矩阵        {ref_sim_time * 1000:>9.2f} ms → {sim_time * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+HTML 报告渲染基准
+
+使用方法:
+    python3 benchmarks/bench_render.py                      # 500 席位 × 80 品种
+    python3 benchmarks/bench_render.py --seats 200 --varieties 60
+    python3 benchmarks/bench_render.py --seats 5000 --varieties 80 --incremental
+
+分别测量逐段写文件与整页拼接字符串两种方式的耗时和 Python 内存峰值。
+--incremental 测量片段缓存：只有一个席位变化时，从缓存文件读取（单次运行）与复用内存缓存（常驻模式）的重新生成耗时，
+并确认输出与全部重新渲染完全一致。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from report_renderer import FragmentCache, ReportRenderer  # noqa: E402
+
+
+def synthetic_clean(seats: int, varieties: int, seed: int = 7) -> pd.DataFrame:
+    """生成 _clean_data 输出格式的数据：每个席位持有全部品种"""
+    rng = np.random.default_rng(seed)
+    n = seats * varieties
+    long_pos = rng.integers(0, 50000, n)
+    short_pos = rng.integers(0, 50000, n)
+    net = long_pos - short_pos
+    return pd.DataFrame({
+        '席位': np.repeat([f"席位{i:03d}" for i in range(seats)], varieties),
+        '品种': np.tile([f"品种{j:02d}" for j in range(varieties)], seats),
+        '净方向': np.where(net >= 0, '多', '空'),
+        '净持仓': np.abs(net),
+        '净变化': rng.integers(-999, 999, n),
+        '多头持仓': long_pos,
+        '多头变化': rng.integers(-999, 999, n),
+        '空头持仓': short_pos,
+        '空头变化': rng.integers(-999, 999, n),
+    })
+
+
+def measure(func):
+    """返回 (耗时秒, 内存峰值 MB)；tracemalloc 会拖慢执行，计时与内存分两次测量"""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 报告渲染基准")
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--varieties", type=int, default=80)
+    parser.add_argument("--incremental", action="store_true", help="测量片段缓存的增量生成")
+    args = parser.parse_args()
+    if args.incremental:
+        incremental(args.seats, args.varieties)
+        return
+
+    df = synthetic_clean(args.seats, args.varieties)
+    renderer = ReportRenderer(df['席位'].unique().tolist())
+    path = os.path.join(tempfile.mkdtemp(), "report.html")
+
+    print(f"{args.seats} 席位 × {args.varieties} 品种 = {len(df):,} 行")
+    stream_time, stream_peak = measure(lambda: renderer.write(df, path))
+    join_time, join_peak = measure(lambda: ''.join(renderer.render(df)))
+    size = os.path.getsize(path) / 1024 / 1024
+
+    print(f"   报告大小: {size:.1f} MB")
+    print(f"   逐段写文件: {stream_time:.2f}s, 内存峰值 {stream_peak:.1f} MB")
+    print(f"   整页字符串: {join_time:.2f}s, 内存峰值 {join_peak:.1f} MB")
+
+
+def incremental(seats: int, varieties: int):
+    """一个席位的一个品种变化后重新生成报告：全部渲染 vs 片段缓存"""
+    df = synthetic_clean(seats, varieties)
+    brokers = df['席位'].unique().tolist()
+    generated_at = datetime(2024, 1, 2, 15, 40)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "report.html")
+    cache_file = os.path.join(directory, FragmentCache.FILE)
+
+    # 首次生成，建立缓存文件
+    fragments = FragmentCache.load(cache_file)
+    ReportRenderer(brokers, generated_at, fragments=fragments).write(df, path)
+    fragments.save()
+
+    changed = df.copy()
+    changed.loc[changed.index[changed['席位'] == brokers[len(brokers) // 2]][0], '净变化'] += 1
+    print(f"{seats} 席位 × {varieties} 品种 = {len(df):,} 行，其中 1 个席位的 1 个品种变化")
+
+    start = time.perf_counter()
+    ReportRenderer(brokers, generated_at).write(changed, path)
+    full = time.perf_counter() - start
+    with open(path, encoding='utf-8') as f:
+        expected = f.read()
+
+    def regenerate():
+        fragments = FragmentCache.load(cache_file)
+        ReportRenderer(brokers, generated_at, fragments=fragments).write(changed, path)
+        fragments.save()
+        return fragments
+
+    # 单次运行：进程内没有缓存，需读取缓存数据库
+    FragmentCache._loaded.clear()
+    from_file, fragments = timed(regenerate)
+    counts = fragments.reused, fragments.rendered
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == expected, "片段缓存的输出与全部重新渲染不一致"
+    # 常驻模式：把变化改回去再生成一次，缓存数据库未被其他进程改动，直接复用内存中的缓存
+    changed = df
+    in_memory, _ = timed(regenerate)
+
+    print(f"   全部重新渲染: {full:.3f}s")
+    print(f"   片段缓存（读缓存数据库）: {from_file:.3f}s，复用 {counts[0]} 个片段，重新渲染 {counts[1]} 个")
+    print(f"   片段缓存（内存）: {in_memory:.3f}s")
+    print(f"   输出与全部重新渲染一致，缓存数据库 {os.path.getsize(cache_file) / 1024 / 1024:.1f} MB")
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    main()
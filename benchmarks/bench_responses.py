@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+浏览器模式接口响应处理的内存基准
+
+使用方法:
+    python3 benchmarks/bench_responses.py                         # 500 个席位，各轮次重复到达
+    python3 benchmarks/bench_responses.py --seats 200 --rounds 1 5 20 --noise 10
+
+把合成的持仓接口响应（以及不相关的 JSON 响应）按页面事件的方式逐个交给 _on_response，
+经有界队列和解析工作者处理后，用 tracemalloc 测量处理期间的峰值与处理完后仍保留的内存。
+同一批席位的响应重复到达多轮（SPA 重新请求、重试等）时，保留的内存应保持不变。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import quote
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from broker_position_scraper import BrokerPositionScraper  # noqa: E402
+from fixtures import SyntheticMarket  # noqa: E402
+
+
+class SyntheticResponse:
+    """只实现 _on_response / _handle_response 用到的 Playwright Response 属性"""
+
+    def __init__(self, url: str, body: bytes, content_type: str = "application/json"):
+        self.url = url
+        self.status = 200
+        self.headers = {"content-type": content_type}
+        self._body = body
+
+    async def body(self) -> bytes:
+        await asyncio.sleep(0)  # 模拟跨进程读取响应体时的让出
+        return self._body
+
+
+async def feed(scraper, responses: list):
+    scraper._start_response_workers()
+    for response in responses:
+        scraper._on_response(response)
+        await asyncio.sleep(0)  # 页面事件之间让出，解析工作者与事件交替执行
+    await scraper._drain_response_tasks()
+
+
+def run_case(market: SyntheticMarket, rounds: int, noise: int) -> dict:
+    scraper = BrokerPositionScraper(brokers=market.brokers, base_url="http://127.0.0.1")
+    bodies = {b: json.dumps(market.api_payload(b), ensure_ascii=False).encode("utf-8") for b in market.brokers}
+    # 统计、配置等不相关的 JSON 响应，不应被读取
+    filler = json.dumps({"code": 0, "data": list(range(200))}).encode("utf-8")
+    responses = []
+    for _ in range(rounds):
+        for broker in market.brokers:
+            responses.append(SyntheticResponse(
+                f"http://127.0.0.1/api/broker/position?broker={quote(broker)}", bodies[broker]))
+            responses.extend(SyntheticResponse(f"http://127.0.0.1/api/stats/{k}", filler) for k in range(noise))
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    asyncio.run(feed(scraper, responses))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = sum(len(rows) for rows in scraper._api_rows.values())
+    return {"seconds": elapsed, "responses": len(responses), "rows": rows,
+            "peak_mb": (peak - baseline) / 1024 / 1024, "retained_mb": (current - baseline) / 1024 / 1024,
+            "deferred": scraper.metrics.counter("responses_deferred"),
+            "dropped": scraper.metrics.counter("responses_dropped")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口响应处理的内存基准")
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--varieties", type=int, default=40)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[1, 5, 20], help="同一批响应重复到达的轮数")
+    parser.add_argument("--noise", type=int, default=5, help="每个席位伴随的不相关 JSON 响应数")
+    args = parser.parse_args()
+
+    market = SyntheticMarket(args.seats, args.varieties)
+    print(f"{args.seats} 个席位, 队列上限 {BrokerPositionScraper.RESPONSE_QUEUE_SIZE}, "
+          f"解析工作者 {BrokerPositionScraper.RESPONSE_WORKERS}")
+    print(f"   {'轮数':<6}{'响应数':>8}{'记录数':>8}{'耗时':>10}{'峰值':>10}{'保留':>10}{'延后入队':>10}{'丢弃':>8}")
+    for rounds in args.rounds:
+        r = run_case(market, rounds, args.noise)
+        print(f"   {rounds:<6}{r['responses']:>8}{r['rows']:>8}{r['seconds']:>9.2f}s"
+              f"{r['peak_mb']:>8.1f}MB{r['retained_mb']:>8.1f}MB{r['deferred']:>10.0f}{r['dropped']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+命令行各子命令的导入耗时检查
+
+使用方法:
+    python3 benchmarks/bench_startup.py                 # 检查全部子命令，超出预算时退出码为 1
+    python3 benchmarks/bench_startup.py --commands report query --repeat 5
+
+每个子命令在新的解释器中执行 `import cli; cli.load(子命令)`，用 `python -X importtime` 统计导入耗时
+（顶层模块累计耗时之和，取多次运行的最小值），并确认没有导入不需要的重型模块：
+clean、report、query 不导入 Playwright，query 也不导入 pandas。
+离线基准套件（run_suite.py，默认包含 startup 项）同样用 check 检查，超出预算时以非零状态退出。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from cli import COMMAND_MODULES  # noqa: E402
+
+# 子命令 -> 导入耗时上限（秒）；scrape、bench 本身要运行很久，只报告不检查
+BUDGETS = {"clean": 0.9, "report": 0.6, "query": 0.35}
+FORBIDDEN = {
+    "clean": ["playwright"],
+    "report": ["playwright"],
+    "query": ["playwright", "pandas"],
+}
+
+
+def measure(command: str) -> tuple:
+    """返回 (导入耗时秒, 解释器总耗时秒, 导入的顶层包集合)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import cli; cli.load({command!r})"],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    total = 0
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith("  "):  # 顶层导入，累计耗时已包含其依赖
+            total += int(cumulative)
+    return total / 1e6, wall, packages
+
+
+def check(command: str, repeat: int = 3) -> dict:
+    """运行 repeat 次取最小值，返回 {imports, wall, heavy, budget, failures}；
+    failures 列出超出预算与导入了不需要的重型模块的问题，为空表示通过"""
+    runs = [measure(command) for _ in range(repeat)]
+    imports = min(r[0] for r in runs)
+    packages = runs[0][2]
+    budget = BUDGETS.get(command)
+    failures = []
+    unexpected = [name for name in FORBIDDEN.get(command, []) if name in packages]
+    if unexpected:
+        failures.append(f"{command} 导入了 {', '.join(unexpected)}")
+    if budget is not None and imports > budget:
+        failures.append(f"{command} 导入耗时 {imports:.3f}s 超出预算 {budget:.2f}s")
+    return {"imports": imports, "wall": min(r[1] for r in runs), "budget": budget, "failures": failures,
+            "heavy": [name for name in ("pandas", "playwright") if name in packages]}
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="命令行子命令的导入耗时检查")
+    parser.add_argument("--commands", nargs="+", choices=list(COMMAND_MODULES), default=list(COMMAND_MODULES))
+    parser.add_argument("--repeat", type=int, default=3, help="每个子命令运行的次数，取最小值")
+    args = parser.parse_args(argv)
+
+    failed = []
+    print(f"   {'子命令':<8}{'导入':>9}{'启动':>9}{'预算':>9}  重型模块")
+    for command in args.commands:
+        result = check(command, args.repeat)
+        budget = result["budget"]
+        print(f"   {command:<8}{result['imports']:>8.3f}s{result['wall']:>8.3f}s"
+              f"{f'{budget:.2f}s' if budget else '-':>9}  "
+              f"{', '.join(result['heavy']) or '-'} {'❌' if result['failures'] else '✓'}")
+        failed += result["failures"]
+    if failed:
+        print("\n⚠️ " + "\n⚠️ ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+合成的交易可查数据
+同一份随机持仓可以输出为三种形式，彼此数值一致：
+    api_payload(席位)   持仓接口的 JSON（buy/ss/net_chge 等字段，按净多/净空分组）
+    table_html(席位)    页面持仓表格的 HTML（"净多123\\n(增45)"、"678\\n(+12)" 格式的单元格）
+    dom_blocks(席位)    POSITION_TABLE_JS 从该表格提取出的按表头分段的列式结果
+    dom_rows(席位)      按表头还原的逐行记录（带席位），无需浏览器即可测试清理
+"""
+
+import html
+import random
+
+# 常见品种及合约代码前缀；品种数超出时按序号生成
+VARIETY_CODES = [
+    ('螺纹钢', 'rb'), ('热卷', 'hc'), ('铁矿石', 'i'), ('焦炭', 'j'), ('焦煤', 'jm'),
+    ('沪铜', 'cu'), ('沪铝', 'al'), ('沪镍', 'ni'), ('豆粕', 'm'), ('棕榈油', 'p'),
+    ('甲醇', 'MA'), ('PTA', 'TA'), ('原油', 'sc'), ('黄金', 'au'), ('白银', 'ag'),
+    ('玉米', 'c'), ('白糖', 'SR'), ('棉花', 'CF'), ('橡胶', 'ru'), ('纯碱', 'SA'),
+]
+TABLE_HEADERS = ['品种', '合约', '总净持仓', '多头持仓', '空头持仓']
+
+
+def _letters(index: int) -> str:
+    """序号转为字母串：0 -> a, 25 -> z, 26 -> ba"""
+    text = ''
+    while True:
+        text = chr(ord('a') + index % 26) + text
+        index //= 26
+        if index == 0:
+            return text
+
+
+class SyntheticMarket:
+    """若干席位在若干品种上的随机持仓，每个席位持有部分品种、每个品种 1~max_contracts 个合约"""
+
+    def __init__(self, seats: int = 4, varieties: int = 20, max_contracts: int = 3,
+                 holding_ratio: float = 0.6, seed: int = 7):
+        rng = random.Random(seed)
+        codes = VARIETY_CODES[:varieties] + [
+            (f'品种{k:03d}', 'z' + _letters(k)) for k in range(len(VARIETY_CODES), varieties)]
+        self.brokers = [f'席位{i:04d}' for i in range(seats)]
+        self.varieties = [name for name, _ in codes]
+        # 席位 -> [(品种, [合约持仓, ...])]；合约持仓为 dict(code, long, long_chg, short, short_chg)
+        self.positions = {}
+        for broker in self.brokers:
+            holdings = []
+            for name, prefix in codes:
+                if rng.random() >= holding_ratio:
+                    continue
+                contracts = []
+                for k in range(rng.randint(1, max_contracts)):
+                    contracts.append({
+                        'code': f'{prefix}{2501 + k * 2}',
+                        'long': rng.randint(0, 50000),
+                        'long_chg': rng.randint(-2000, 2000),
+                        'short': rng.randint(0, 50000),
+                        'short_chg': rng.randint(-2000, 2000),
+                    })
+                holdings.append((name, contracts))
+            self.positions[broker] = holdings
+
+    def row_count(self) -> int:
+        """全部席位页面表格的数据行数（含品种分类行）"""
+        return sum(1 + len(contracts) for holdings in self.positions.values() for _, contracts in holdings)
+
+    def api_payload(self, broker: str) -> dict:
+        """持仓接口响应：{"code": 0, "data": {"多": [...], "空": [...]}}，按合约净方向分组"""
+        data = {'多': [], '空': []}
+        for variety, contracts in self.positions.get(broker, []):
+            for c in contracts:
+                net = c['long'] - c['short']
+                data['多' if net >= 0 else '空'].append({
+                    'variety': variety,
+                    'code': c['code'],
+                    'buy': c['long'],
+                    'buy_chge': c['long_chg'],
+                    'ss': c['short'],
+                    'ss_chge': c['short_chg'],
+                    'net': net,
+                    'net_chge': c['long_chg'] - c['short_chg'],
+                })
+        return {'code': 0, 'msg': 'ok', 'data': data}
+
+    def table_cells(self, broker: str) -> list:
+        """页面表格的单元格文本：首行为表头，品种分类行只有一格"""
+        rows = [TABLE_HEADERS]
+        for variety, contracts in self.positions.get(broker, []):
+            rows.append([variety])
+            for k, c in enumerate(contracts):
+                rows.append([variety if k == 0 else '', c['code'], self._net_text(c),
+                             f"{c['long']}\n({c['long_chg']:+d})", f"{c['short']}\n({c['short_chg']:+d})"])
+        return rows
+
+    def table_html(self, broker: str) -> str:
+        """页面持仓表格；分类行用 colspan 占满整行，与网站一致"""
+        parts = ['<table class="position-table">']
+        for index, cells in enumerate(self.table_cells(broker)):
+            tag = 'th' if index == 0 else 'td'
+            if len(cells) == 1:
+                parts.append(f'<tr class="variety"><td colspan="{len(TABLE_HEADERS)}">{html.escape(cells[0])}</td></tr>')
+            else:
+                parts.append('<tr>' + ''.join(f'<{tag}>{html.escape(c)}</{tag}>' for c in cells) + '</tr>')
+        parts.append('</table>')
+        return '\n'.join(parts)
+
+    def dom_blocks(self, broker: str) -> list:
+        """POSITION_TABLE_JS 对 table_html 的提取结果，与浏览器模式的页面数据格式相同"""
+        cells = self.table_cells(broker)
+        return [{'headers': cells[0], 'rows': cells[1:]}]
+
+    def dom_rows(self, broker: str) -> list:
+        """dom_blocks 按表头还原的逐行记录（已带席位），与旧版缓存中的页面记录格式相同"""
+        cells = self.table_cells(broker)
+        headers = cells[0]
+        return [{**dict(zip(headers, values)), '席位': broker} for values in cells[1:]]
+
+    def all_dom_rows(self) -> list:
+        return [row for broker in self.brokers for row in self.dom_rows(broker)]
+
+    @staticmethod
+    def _net_text(c: dict) -> str:
+        """总净持仓单元格，如 "净多123\\n(增45)"；增减按净持仓绝对值相对前一日的变化记"""
+        net = c['long'] - c['short']
+        previous = net - (c['long_chg'] - c['short_chg'])
+        delta = abs(net) - abs(previous)
+        return f"净{'多' if net >= 0 else '空'}{abs(net)}\n({'增' if delta >= 0 else '减'}{abs(delta)})"
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+离线基准套件：抓取、清理、报告渲染，不需要登录或联网
+
+使用方法:
+    python3 benchmarks/run_suite.py                                   # 全部基准，结果写入 bench_results.json
+    python3 benchmarks/run_suite.py --benchmarks clean render --scales small medium
+    python3 benchmarks/run_suite.py --output new.json --compare bench_results.json --threshold 0.2
+
+抓取基准启动 standin_server.py 的本地替身站点，用 --base-url 的方式把爬虫指向它，
+浏览器模式（lean 为 --lean 精简浏览）需要已安装 Playwright 的 Chromium，未安装时记为跳过；直连模式只需要 requests。
+清理与渲染基准使用 fixtures.py 生成的页面表格记录。结果保存为 JSON，--compare 与之前的结果逐项对比，
+耗时超过基线 (1 + threshold) 倍时以非零状态退出，可用于回归检查。
+startup 项按 bench_startup.py 的预算检查命令行各子命令的导入耗时，超出预算或导入了不需要的重型模块时同样以非零状态退出。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+from bench_startup import BUDGETS, FORBIDDEN, check as check_startup  # noqa: E402
+from broker_position_scraper import BrokerPositionScraper  # noqa: E402
+from fixtures import SyntheticMarket  # noqa: E402
+from report_renderer import LazyReportRenderer, ReportRenderer  # noqa: E402
+from standin_server import StandinServer  # noqa: E402
+
+SCALES = {
+    "small": {"seats": 4, "varieties": 20},
+    "medium": {"seats": 50, "varieties": 40},
+    "large": {"seats": 500, "varieties": 60},
+}
+BENCHMARKS = ["startup", "scrape", "clean", "render"]
+
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    """爬虫的登录状态、接口记录、数据库等都写在当前目录，基准在临时目录中运行"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def best_of(func, repeat: int):
+    """重复执行取最短耗时，返回 (秒, 最后一次的返回值)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def span_total(metrics, name: str) -> float:
+    return sum(total for span, total, _ in metrics.summary() if span == name)
+
+
+def bench_scrape(scale: str, mode: str, latency: float, concurrency: int) -> dict:
+    """对替身站点完整运行一次爬虫（抓取 + 清理 + 报告），爬虫输出不打印"""
+    market = SyntheticMarket(**SCALES[scale])
+    workdir = tempfile.mkdtemp(prefix="jykc-bench-")
+    with StandinServer(market, latency=latency) as server, working_directory(workdir):
+        # 有登录状态文件时爬虫使用无头浏览器；替身站点不校验 Cookie
+        with open(BrokerPositionScraper.AUTH_FILE, "w", encoding="utf-8") as f:
+            json.dump({"cookies": [{"name": "bench", "value": "1", "domain": "127.0.0.1", "path": "/",
+                                    "expires": -1, "httpOnly": False, "secure": False, "sameSite": "Lax"}],
+                       "origins": []}, f)
+        if mode == "direct":
+            with open(BrokerPositionScraper.ENDPOINTS_FILE, "w", encoding="utf-8") as f:
+                json.dump({b: [server.api_url(b)] for b in market.brokers}, f, ensure_ascii=False)
+        scraper = BrokerPositionScraper(concurrency=concurrency, direct=mode == "direct", lean=mode == "lean",
+                                        brokers=market.brokers, base_url=server.url)
+        log = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            asyncio.run(scraper.run())
+        elapsed = time.perf_counter() - start
+        requests = server.requests
+    brokers = [s for s in scraper.metrics.spans if s["name"] == "broker"]
+    return {
+        "seconds": elapsed,
+        "launch_seconds": span_total(scraper.metrics, "browser_launch"),
+        "per_broker_ms": 1000 * np.mean([s["seconds"] for s in brokers]) if brokers else None,
+        "rows_captured": scraper.metrics.counter("rows_captured"),
+        "rows_cleaned": scraper.metrics.counter("rows_cleaned"),
+        "requests": requests,
+        "fallbacks": scraper.metrics.counter("fallbacks"),
+        "requests_loaded": scraper.metrics.counter("requests_loaded"),
+        "content_length_bytes": scraper.metrics.counter("content_length_bytes"),
+        "requests_blocked": scraper.metrics.counter("requests_blocked"),
+    }
+
+
+def bench_clean(scale: str, repeat: int) -> dict:
+    market = SyntheticMarket(**SCALES[scale])
+    scraper = BrokerPositionScraper(brokers=market.brokers)
+    # 页面行按列解析为合约级记录表（ingest）与品种汇总，两段合计为清理耗时
+    dom_rows = market.all_dom_rows()
+    ingest_time, rows = best_of(lambda: scraper.normalizer.parse_table(pd.DataFrame(dom_rows)), repeat)
+    agg_time, varieties = best_of(lambda: scraper.aggregate_varieties(rows), repeat)
+    return {"seconds": ingest_time + agg_time, "ingest_seconds": ingest_time, "aggregate_seconds": agg_time,
+            "input_rows": len(dom_rows), "contract_rows": len(rows), "variety_rows": len(varieties)}
+
+
+def bench_render(scale: str, repeat: int, renderer_class) -> dict:
+    market = SyntheticMarket(**SCALES[scale])
+    scraper = BrokerPositionScraper(brokers=market.brokers)
+    df = scraper._clean_data(pd.DataFrame(market.all_dom_rows()))
+    path = os.path.join(tempfile.mkdtemp(prefix="jykc-bench-"), "report.html")
+    seconds, size = best_of(lambda: renderer_class(market.brokers).write(df, path), repeat)
+    return {"seconds": seconds, "rows": len(df), "chars": size}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count(),
+            "pandas": pd.__version__, "numpy": np.__version__, "commit": commit}
+
+
+def result_key(result: dict) -> tuple:
+    return result["benchmark"], result.get("mode", ""), result["scale"]
+
+
+def compare(results: list, baseline_file: str, threshold: float) -> int:
+    """与基线结果逐项对比，打印耗时比值，返回超过阈值的项数"""
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    print(f"\n📊 对比基线 {baseline_file}（阈值 +{threshold:.0%}）")
+    regressions = 0
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if not previous or result.get("skipped") or previous.get("skipped"):
+            continue
+        ratio = result["seconds"] / previous["seconds"] if previous["seconds"] else float("inf")
+        flag = "⚠️ " if ratio > 1 + threshold else "  "
+        regressions += ratio > 1 + threshold
+        name = "/".join(k for k in result_key(result) if k)
+        print(f"   {flag}{name:<28}{previous['seconds']:>9.3f}s → {result['seconds']:>9.3f}s  ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="离线基准套件")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=list(SCALES))
+    parser.add_argument("--scrape-modes", nargs="+", choices=["browser", "lean", "direct"],
+                        default=["browser", "lean", "direct"])
+    parser.add_argument("--scrape-max-seats", type=int, default=50, help="抓取基准只运行不超过该席位数的规模")
+    parser.add_argument("--latency", type=float, default=20.0, help="替身站点接口的模拟延迟（毫秒）")
+    parser.add_argument("--concurrency", type=int, default=BrokerPositionScraper.CONCURRENCY)
+    parser.add_argument("--repeat", type=int, default=3, help="清理与渲染基准的重复次数，取最短耗时")
+    parser.add_argument("--output", default="bench_results.json", help="结果文件")
+    parser.add_argument("--compare", metavar="BASELINE", help="与之前的结果文件对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为回归的耗时增幅")
+    args = parser.parse_args(argv)
+
+    results = []
+
+    def add(benchmark: str, scale: str, run, mode: str = None):
+        label = "/".join(x for x in (benchmark, mode, scale) if x)
+        entry = {"benchmark": benchmark, "scale": scale, **SCALES[scale]}
+        if mode:
+            entry["mode"] = mode
+        try:
+            entry.update(run())
+            print(f"   ✓ {label:<28}{entry['seconds']:>9.3f}s")
+        except Exception as e:
+            # 例如未安装 Chromium：记为跳过，其余基准照常运行
+            entry.update({"skipped": True, "error": f"{type(e).__name__}: {e}".splitlines()[0]})
+            print(f"   - {label:<28}跳过: {entry['error']}")
+        results.append(entry)
+
+    print(f"🏁 离线基准: {', '.join(args.benchmarks)}  规模: {', '.join(args.scales)}")
+    startup_failures = []
+    if "startup" in args.benchmarks:
+        # 与规模无关，只检查有预算或有禁止导入模块的子命令
+        for command in dict.fromkeys([*BUDGETS, *FORBIDDEN]):
+            check = check_startup(command, args.repeat)
+            results.append({"benchmark": "startup", "mode": command, "scale": "", "seconds": check["imports"],
+                            "wall_seconds": check["wall"], "budget": check["budget"], "failures": check["failures"]})
+            print(f"   {'✓' if not check['failures'] else '❌'} {'startup/' + command:<28}{check['imports']:>9.3f}s")
+            startup_failures += check["failures"]
+    for scale in args.scales:
+        if "scrape" in args.benchmarks and SCALES[scale]["seats"] <= args.scrape_max_seats:
+            for mode in args.scrape_modes:
+                add("scrape", scale, lambda: bench_scrape(scale, mode, args.latency / 1000, args.concurrency), mode)
+        if "clean" in args.benchmarks:
+            add("clean", scale, lambda: bench_clean(scale, args.repeat))
+        if "render" in args.benchmarks:
+            add("render", scale, lambda: bench_render(scale, args.repeat, ReportRenderer), "static")
+            add("render", scale, lambda: bench_render(scale, args.repeat, LazyReportRenderer), "lazy")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": datetime.now().isoformat(timespec="seconds"), "environment": environment(),
+                   "settings": {"latency_ms": args.latency, "concurrency": args.concurrency, "repeat": args.repeat},
+                   "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {args.output}")
+
+    failed = bool(startup_failures)
+    if startup_failures:
+        print("\n⚠️ " + "\n⚠️ ".join(startup_failures))
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n❌ {regressions} 项耗时超过阈值")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+交易可查的本地替身站点
+单页应用：首页带登录标识和席位链接，席位页 "#/broker/position/broker=X" 在 hash 变化后请求持仓接口，
+再把持仓表格渲染到页面上。浏览器模式、直连模式与席位发现都可以指向它做离线基准
+
+使用方法:
+    python3 benchmarks/standin_server.py --seats 50 --port 8900 --latency 80
+    python3 broker_position_scraper.py --base-url http://127.0.0.1:8900 --discover-seats --brokers 席位0000
+
+接口:
+    GET /                                   单页应用首页
+    GET /api/broker/position?broker=X       持仓接口 JSON
+    GET /fragment/position?broker=X         持仓表格 HTML 片段（页面脚本使用）
+    GET /static/...                         样式表、字体与图片（占位内容，用于对比 --lean 拦截前后的加载量）
+"""
+
+import argparse
+import html
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import SyntheticMarket  # noqa: E402
+
+INDEX_HTML = '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="UTF-8"><title>交易可查（本地替身）</title>
+<link rel="stylesheet" href="/static/app.css"></head>
+<body>
+<img src="/static/banner.png" alt="">
+<div class="user-info"><a href="#/">个人中心</a> <a href="#/">退出</a></div>
+<div id="seats">{links}</div>
+<div id="app"></div>
+<script>
+async function route() {{
+    const app = document.getElementById('app');
+    const match = location.hash.match(/broker=([^&/]+)/);
+    if (!match) {{ app.innerHTML = ''; return; }}
+    app.innerHTML = '<p>加载中...</p>';
+    const query = 'broker=' + match[1];
+    const [api, table] = await Promise.all([
+        fetch('/api/broker/position?' + query), fetch('/fragment/position?' + query)]);
+    await api.json();
+    app.innerHTML = await table.text() + '<img src="/static/seat.png?' + query + '" alt="">';
+}}
+window.addEventListener('hashchange', route);
+route();
+</script>
+</body>
+</html>'''
+
+# 静态资源：路径 -> (开头内容, 填充字节数, Content-Type)；样式表引用字体，每个席位页面加载一张图片
+STATIC_ASSETS = {
+    "/static/app.css": (b"@font-face{font-family:s;src:url(/static/font.woff2)}body{font-family:s}",
+                        40_000, "text/css; charset=utf-8"),
+    "/static/banner.png": (b"", 120_000, "image/png"),
+    "/static/seat.png": (b"", 60_000, "image/png"),
+    "/static/font.woff2": (b"", 80_000, "font/woff2"),
+}
+
+
+class StandinServer:
+    """在后台线程运行的替身站点；latency 为接口与表格片段的模拟延迟（秒）"""
+
+    def __init__(self, market: SyntheticMarket, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0):
+        self.market = market
+        self.latency = latency
+        links = ''.join(f'<a href="#/broker/position/broker={quote(b)}">{html.escape(b)}</a>'
+                        for b in market.brokers)
+        self.index = INDEX_HTML.format(links=links).encode("utf-8")
+        # 响应体预先编码，服务端不成为基准的瓶颈
+        self.payloads = {b: json.dumps(market.api_payload(b), ensure_ascii=False).encode("utf-8")
+                         for b in market.brokers}
+        self.fragments = {b: market.table_html(b).encode("utf-8") for b in market.brokers}
+        self.assets = {path: (head + b"\n/*" + b"x" * size + b"*/", kind)
+                       for path, (head, size, kind) in STATIC_ASSETS.items()}
+        self.server = ThreadingHTTPServer((host, port), _StandinHandler)
+        self.server.owner = self
+        self.server.daemon_threads = True
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def api_url(self, broker: str) -> str:
+        return f"{self.url}/api/broker/position?broker={quote(broker)}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    """替身站点的请求处理"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        owner = self.server.owner
+        owner.requests += 1
+        broker = parse_qs(url.query).get("broker", [""])[0]
+        if url.path in ("/", "/index.html"):
+            self._send(200, owner.index, "text/html; charset=utf-8")
+        elif url.path == "/api/broker/position":
+            time.sleep(owner.latency)
+            body = owner.payloads.get(broker)
+            if body is None:
+                self._send(200, b'{"code": 404, "msg": "unknown broker", "data": null}',
+                           "application/json; charset=utf-8")
+            else:
+                self._send(200, body, "application/json; charset=utf-8")
+        elif url.path in owner.assets:
+            body, content_type = owner.assets[url.path]
+            self._send(200, body, content_type)
+        elif url.path == "/fragment/position":
+            time.sleep(owner.latency)
+            self._send(200, owner.fragments.get(broker, b""), "text/html; charset=utf-8")
+        else:
+            self._send(404, b"not found", "text/plain; charset=utf-8")
+
+    def _send(self, code: int, body: bytes, content_type: str):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 不逐条打印请求日志
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易可查本地替身站点")
+    parser.add_argument("--seats", type=int, default=20)
+    parser.add_argument("--varieties", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="接口模拟延迟（毫秒）")
+    args = parser.parse_args()
+
+    market = SyntheticMarket(args.seats, args.varieties)
+    server = StandinServer(market, port=args.port, latency=args.latency / 1000)
+    print(f"🌐 替身站点: {server.url}  ({args.seats} 个席位, {market.row_count()} 行表格数据)")
+    print(f"   席位示例: {', '.join(market.brokers[:3])}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
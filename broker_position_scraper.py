@@ -2,6 +2,7 @@
 """
 期货公司持仓数据爬虫 + HTML报告生成
 一键获取乾坤期货、摩根大通、国泰君安、中信期货的持仓数据并生成可视化报告
+席位可通过 seats.json、--brokers 配置，或用 --discover-seats 从网站发现全市场席位
 
 使用方法:
     python3 broker_position_scraper.py
@@ -16,607 +17,1163 @@ import asyncio
 import json
 import re
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from playwright.async_api import async_playwright
+from urllib.parse import unquote
+import numpy as np
 import pandas as pd
 
+from analytics import PositionAnalytics
+from position_store import PositionStore
+from report_renderer import FragmentCache, LazyReportRenderer, ReportRenderer
+from response_cache import ResponseCache
+from metrics import Metrics
+from data_export import DataExporter
+from position_record import RecordNormalizer
+from session_manager import SessionManager
+
 
 class BrokerPositionScraper:
     """期货公司持仓数据爬虫"""
     
     BASE_URL = "https://www.jiaoyikecha.com"
-    TARGET_BROKERS = ["乾坤期货", "摩根大通", "国泰君安", "中信期货"]
+    TARGET_BROKERS = ["乾坤期货", "摩根大通", "国泰君安", "中信期货"]  # 默认席位
+    SEATS_FILE = "seats.json"  # 席位配置文件，存在时覆盖默认席位
     AUTH_FILE = "auth_state.json"  # 保存登录状态的文件
+    CONCURRENCY = 4  # 同时打开的页面数
+    MAX_RETRIES = 2  # 每个席位的重试次数
+    RETRY_BACKOFF = 2.0  # 重试退避基数（秒）
+    ENDPOINTS_FILE = "api_endpoints.json"  # 浏览器模式下捕获的持仓接口地址
+    USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+    READY_TIMEOUT = 15.0  # 单个席位等待数据就绪的上限（秒）
+    LOGIN_CHECK_TIMEOUT = 8.0  # 等待登录标识出现的上限（秒）
+    DOM_GRACE = 2.0  # 接口数据到达后，等待表格渲染稳定的上限（秒）
+    SEAT_PRINT_LIMIT = 20  # 超过该席位数时只打印汇总
+    NOT_MODIFIED = object()  # 条件请求返回 304 时的标记
+    LAZY_REPORT_ROWS = 2000  # auto 模式下超过该行数改用按需渲染的报告
+    RESPONSE_QUEUE_SIZE = 64  # 待处理的接口响应上限，队列满时页面工作者先等积压处理完再导航
+    RESPONSE_WORKERS = 4  # 解析接口响应的工作者数
+    RESPONSE_DEFERRED_LIMIT = 256  # 队列满时等待入队的响应上限，超出的响应丢弃，该席位改用页面表格
+    # 精简浏览（--lean）：拦截的资源类型与统计/广告脚本；持仓接口始终放行
+    BLOCK_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest", "ping"})
+    BLOCK_URL_PATTERN = re.compile(
+        r'google-analytics|googletagmanager|doubleclick|hm\.baidu\.com|cnzz\.com|umeng|growingio|sentry', re.I)
+    API_URL_PATTERN = re.compile(r'broker|position', re.I)  # 持仓接口地址，只有匹配的响应才会读取响应体
+    REPORT_FILE = "broker_positions_report.html"
+    RAW_FILE = "broker_positions_raw"  # 数据文件名不含扩展名，由导出格式决定
+    VARIETY_FILE = "broker_positions_varieties"
+    CONTRACT_FILE = "broker_positions_contracts"
+    CLEAN_EXCEL_FILE = "broker_positions_cleaned"
+    
+    # 页面已登录的标识
+    LOGIN_JS = '''() => document.body && (
+        document.body.innerText.includes('退出') ||
+        document.body.innerText.includes('个人中心') ||
+        document.querySelector('.user-info') !== null)'''
+    # 页面中指向席位持仓页的链接，用于发现全市场席位
+    SEAT_LINKS_JS = '''() => Array.from(document.querySelectorAll('a[href*="broker="]'))
+        .map(a => a.getAttribute('href'))'''
+    # 表格内容指纹，用于区分同一页面上一个席位残留的表格
+    TABLE_FINGERPRINT_JS = '''() => Array.from(document.querySelectorAll('table tr'))
+        .slice(0, 5).map(r => r.textContent).join('|')'''
+    # 表格已更换且行数连续多次轮询不变，视为渲染稳定
+    TABLE_STABLE_JS = '''(prev) => {
+        const rows = document.querySelectorAll('table tr');
+        const fp = Array.from(rows).slice(0, 5).map(r => r.textContent).join('|');
+        const s = window.__jykcReady || (window.__jykcReady = {rows: -1, hits: 0});
+        if (rows.length > 1 && fp !== prev && rows.length === s.rows) {
+            s.hits += 1;
+        } else {
+            s.rows = rows.length;
+            s.hits = 0;
+        }
+        return s.hits >= 2;
+    }'''
+    
+    # 持仓表提取：只扫描含持仓表头的表格，逐个文本节点读取而不用 innerText，避免逐格触发布局；
+    # <br> 与块级元素处记为换行（与 innerText 一致，"净多123<br>(增45)" 读作 "净多123\n(增45)"），行内元素直接相连。
+    # 返回按表头分段的列式结果 [{headers: [...], rows: [[...], ...]}]
+    POSITION_TABLE_JS = '''() => {
+        const isHeader = cells => cells.some(c => ['品种', '合约', '多头', '空头'].some(h => c.includes(h)));
+        const BREAKS = new Set(['BR', 'DIV', 'P', 'LI', 'TR']);
+        const text = cell => {
+            const parts = [];
+            const walker = document.createTreeWalker(cell, NodeFilter.SHOW_TEXT | NodeFilter.SHOW_ELEMENT);
+            for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+                if (node.nodeType === Node.TEXT_NODE) parts.push(node.data);
+                else if (BREAKS.has(node.nodeName)) parts.push('\\n');
+            }
+            return parts.join('').replace(/\\s*\\n\\s*/g, '\\n').replace(/[^\\S\\n]+/g, ' ').trim();
+        };
+        const blocks = [];
+        for (const table of document.querySelectorAll('table')) {
+            if (!isHeader([table.textContent])) continue;
+            let block = null;
+            for (let idx = 0; idx < table.rows.length; idx++) {
+                const cells = table.rows[idx].cells;
+                if (cells.length === 0) continue;
+                const values = new Array(cells.length);
+                for (let i = 0; i < cells.length; i++) values[i] = text(cells[i]);
+                if (idx === 0 || isHeader(values)) {
+                    block = {headers: values, rows: []};
+                    blocks.push(block);
+                } else if (block) {
+                    block.rows.push(values.slice(0, block.headers.length));
+                }
+            }
+        }
+        return blocks;
+    }'''
+    
+    DIRECTIONS = RecordNormalizer.DIRECTIONS
+    POSITION_COLUMNS = ['多头持仓', '多头变化', '空头持仓', '空头变化']
     
-    def __init__(self):
-        self.position_data = []
-        self.api_data = {}
+    def __init__(self, concurrency: int = None, max_retries: int = None, direct: bool = False,
+                 ready_timeout: float = None, trade_date: str = None, report_mode: str = "auto",
+                 brokers: list = None, discover_url: str = None, max_brokers: int = None,
+                 cache: ResponseCache = None, metrics: Metrics = None,
+                 output_format: str = None, excel: bool = False, base_url: str = None,
+                 report_cache: bool = True, lean: bool = False):
+        if base_url:
+            # 指向其他站点（如 benchmarks/standin_server.py 的本地替身）时覆盖类常量
+            self.BASE_URL = base_url.rstrip("/")
+        self.concurrency = concurrency or self.CONCURRENCY
+        self.set_brokers(brokers or self.TARGET_BROKERS)
+        self.discover_url = discover_url
+        self.max_brokers = max_brokers
+        self.cache = cache  # 原始响应缓存，为 None 时不落盘
+        self.metrics = metrics or Metrics()
+        self.report_mode = report_mode
+        self.output_format = output_format  # parquet / feather / csv，为 None 时使用 DataExporter 默认格式
+        self.excel = excel  # 额外导出 Excel
+        self.report_cache = report_cache  # 复用上次报告中内容未变的席位片段
+        self.lean = lean  # 拦截图片、字体、样式表与统计脚本
+        self.trade_date = trade_date or datetime.now().strftime('%Y-%m-%d')
+        self.direct = direct
+        self.ready_timeout = ready_timeout or self.READY_TIMEOUT
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.normalizer = RecordNormalizer()
+        self.position_data = self.normalizer.frame([])  # 合并后的合约级记录表
+        self._api_rows = {}  # 席位 -> {(交易日, 合约或品种): PositionRecord}，重复到达的响应覆盖旧记录
+        self._dom_blocks = {}  # 席位 -> 页面表格原文（按表头分段的列式结果），合并时统一按列解析
+        self._responses = None  # 待解析的接口响应队列，抓取期间存在
+        self._response_workers = []
+        self._response_tasks = set()  # 队列满时等待入队的任务
+        self._page_brokers = {}  # 页面 -> 正在抓取的席位，按席位统计请求
+        self._endpoints = {}  # 席位 -> 可直接请求的接口地址
+        self._api_ready = {}  # 席位 -> 接口数据到达事件
+        self.wait_stats = []  # 每次等待的耗时记录
+        # 登录状态在多个进程间共享；有记录的持仓接口时用它验证登录，无需加载首页
+        self.session = SessionManager(self.AUTH_FILE, self.BASE_URL, probe_url=self._probe_url(),
+                                      metrics=self.metrics)
+        
+    def set_brokers(self, brokers: list):
+        """设置目标席位：去重并保持顺序，成员判断使用集合"""
+        self.brokers = list(dict.fromkeys(b for b in brokers if b))
+        self._broker_set = frozenset(self.brokers)
+        
+    @classmethod
+    def load_seats(cls, path: str = None) -> dict:
+        """读取席位配置；文件可以是席位列表，也可以是含 brokers/discover_url/max_brokers 的对象"""
+        path = path or cls.SEATS_FILE
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        if isinstance(config, list):
+            config = {"brokers": config}
+        return config
         
     async def run(self):
         """运行爬虫并生成报告"""
         print("=" * 70)
         print("🚀 期货公司持仓数据爬虫")
-        print(f"   目标席位: {', '.join(self.TARGET_BROKERS)}")
+        print(f"   目标席位: {self.describe_brokers()}")
         print(f"   开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("=" * 70)
         
-        # 获取数据
-        await self._scrape_data()
+        with self.metrics.span("run"):
+            # 获取数据：直连模式先走 HTTP 接口，失败的席位再交给浏览器
+            if self.direct:
+                pending = await self._fetch_direct()
+                if pending:
+                    print(f"\n   ↪ {len(pending)} 个席位改用浏览器获取: {', '.join(pending)}")
+                    await self._scrape_data(pending)
+                else:
+                    self._merge_results()
+            else:
+                await self._scrape_data()
+            
+            # 处理数据并生成报告
+            if not self.position_data.empty:
+                self._generate_report()
+            else:
+                print("\n❌ 未获取到数据，无法生成报告")
+                
+            if self.cache:
+                with self.metrics.span("cache_evict"):
+                    removed = self.cache.evict()
+                if removed:
+                    print(f"   已清理 {removed} 条过期缓存")
+        self.metrics.print_summary()
+            
+    def replay(self, trade_date: str = None):
+        """离线重放：从缓存读取某交易日的接口与页面数据，重新解析并生成报告"""
+        trade_date = trade_date or self.cache.latest_date()
+        if trade_date is None:
+            print("❌ 缓存为空，无法重放")
+            return
+        self.trade_date = trade_date
+        print("=" * 70)
+        print(f"🔁 离线重放 {trade_date} 的缓存数据")
+        print("=" * 70)
         
-        # 处理数据并生成报告
-        if self.position_data:
+        with self.metrics.span("replay"):
+            with self.metrics.span("replay_load"):
+                api_count, dom_count = self.load_cached(trade_date)
+            print(f"   接口记录 {api_count} 条, 页面记录 {dom_count} 条")
+            
+            if not self.position_data.empty:
+                self._generate_report()
+            else:
+                print("\n❌ 缓存中没有目标席位的数据")
+        self.metrics.print_summary()
+            
+    def load_cached(self, trade_date: str) -> tuple:
+        """从缓存读取某交易日的接口与页面数据并合并，返回 (接口记录数, 页面记录数)"""
+        api_count = 0
+        for url, data in self.cache.entries(ResponseCache.API, trade_date):
+            if isinstance(data, dict) and data.get("code") == 0:
+                api_count += self._extract_from_api(url, data)
+        dom_count = 0
+        for broker, blocks in self.cache.entries(ResponseCache.DOM, trade_date):
+            if broker in self._broker_set:
+                if blocks and "headers" not in blocks[0]:
+                    blocks = self._legacy_blocks(blocks)
+                self._dom_blocks[broker] = blocks
+                dom_count += sum(len(block["rows"]) for block in blocks)
+        self.metrics.inc("rows_captured", dom_count, source="dom")
+        self._merge_results()
+        return api_count, dom_count
+        
+    async def scrape_with_context(self, context):
+        """在已登录的浏览器 context 上抓取目标席位并生成报告，供守护进程复用常驻浏览器"""
+        self._start_response_workers()
+        context.on("response", self._on_response)
+        if self.lean:
+            await context.route("**/*", self._route_request)
+        try:
+            if self.discover_url:
+                page = await context.new_page()
+                try:
+                    await self._discover_brokers(page)
+                finally:
+                    await page.close()
+            print(f"\n   获取席位持仓数据 (并发数: {self.concurrency})...")
+            await self._scrape_brokers(context, self.brokers)
+            self._print_wait_summary()
+            self._print_traffic_summary()
+        finally:
+            # context 不关闭，只摘掉本次的响应监听与请求拦截
+            context.remove_listener("response", self._on_response)
+            if self.lean:
+                await context.unroute("**/*", self._route_request)
+            await self._drain_response_tasks()
+            self._merge_results()
+            self._save_endpoints()
+        
+        if not self.position_data.empty:
             self._generate_report()
         else:
             print("\n❌ 未获取到数据，无法生成报告")
             
-    async def _scrape_data(self):
-        """爬取数据"""
-        async with async_playwright() as p:
-            # 检查是否有保存的登录状态
-            has_auth = os.path.exists(self.AUTH_FILE)
+    async def _fetch_direct(self) -> list:
+        """直连模式：复用登录 Cookie 直接请求持仓接口，返回需要回退到浏览器的席位"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        print("\n[1/4] 直连模式: 使用已保存的 Cookie 请求接口...")
+        endpoints = self._load_endpoints()
+        if self.discover_url and endpoints:
+            # 直连模式无法浏览页面发现席位，改用已记录接口的全部席位
+            self._extend_brokers(endpoints.keys())
+        state = self.session.load()
+        if state is None or not endpoints:
+            print("   ⚠️ 缺少登录状态或接口地址，使用浏览器模式")
+            return list(self.brokers)
             
-            browser = await p.chromium.launch(
-                headless=has_auth,  # 有登录状态时使用无头模式
-                slow_mo=50 if not has_auth else 0
-            )
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"User-Agent": self.USER_AGENT, "Referer": f"{self.BASE_URL}/"})
+        for cookie in state.get("cookies", []):
+            session.cookies.set(cookie["name"], cookie["value"],
+                                domain=cookie.get("domain"), path=cookie.get("path", "/"))
+                                
+        loop = asyncio.get_running_loop()
+        pending = []
+        fetch_start = time.perf_counter()
+        # 条件请求头在主线程读取，工作线程不访问缓存数据库
+        validators = {url: self.cache.validators(url) if self.cache else {}
+                      for urls in endpoints.values() for url in urls}
+        print("\n[3/4] 获取席位持仓数据...")
+        with session, ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            jobs = {
+                broker: [loop.run_in_executor(pool, self._get_json, session, url, validators.get(url))
+                         for url in endpoints.get(broker, [])]
+                for broker in self.brokers
+            }
+            for broker, futures in jobs.items():
+                results = await asyncio.gather(*futures)
+                rows = 0
+                expired = False
+                for url, data, headers in results:
+                    if data is self.NOT_MODIFIED:
+                        # 304：沿用缓存中最近一次的内容和校验头
+                        data = self.cache.get(ResponseCache.API, url)
+                        previous = validators.get(url) or {}
+                        headers = {"ETag": previous.get("If-None-Match"),
+                                   "Last-Modified": previous.get("If-Modified-Since"), **headers}
+                    if data is None:
+                        continue
+                    if self.cache:
+                        self.cache.put(ResponseCache.API, url, self.trade_date, data, headers)
+                    if not isinstance(data, dict) or data.get("code") != 0:
+                        expired = True
+                        continue
+                    rows += self._extract_from_api(url, data)
+                    
+                if rows:
+                    print(f"  📊 {broker}: ✓ 获取 {rows} 条记录")
+                else:
+                    reason = "登录状态已过期" if expired else "接口无数据或格式未知"
+                    print(f"  📊 {broker}: ⚠️ {reason}")
+                    self._api_rows.pop(broker, None)
+                    pending.append(broker)
+        self.metrics.record("direct_fetch", time.perf_counter() - fetch_start)
+        self.metrics.inc("fallbacks", len(pending))
+        return pending
+        
+    def _get_json(self, session, url: str, validators: dict = None):
+        """在线程池中请求单个接口，返回 (url, JSON, 响应头)；失败时 JSON 为 None，未变化时为 NOT_MODIFIED"""
+        try:
+            response = session.get(url, timeout=30, headers=validators or None)
+            self.metrics.inc("http_requests", status=response.status_code)
+            self.metrics.inc("bytes_received", len(response.content), source="direct")
+            if response.status_code == 304:
+                return url, self.NOT_MODIFIED, dict(response.headers)
+            if response.status_code in (401, 403):
+                return url, {"code": response.status_code}, {}
+            response.raise_for_status()
+            return url, response.json(), dict(response.headers)
+        except Exception as e:
+            print(f"    ❌ 请求失败 {url}: {e}")
+            return url, None, {}
             
-            # 如果有保存的登录状态，加载它
-            if has_auth:
-                print("\n[1/4] 使用已保存的登录状态...")
-                context = await browser.new_context(
-                    storage_state=self.AUTH_FILE,
-                    viewport={"width": 1400, "height": 900},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-                )
-            else:
-                context = await browser.new_context(
-                    viewport={"width": 1400, "height": 900},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-                )
-                
-            page = await context.new_page()
-            page.set_default_timeout(120000)
+    def _load_endpoints(self) -> dict:
+        """读取浏览器模式下记录的接口地址"""
+        if not os.path.exists(self.ENDPOINTS_FILE):
+            return {}
+        try:
+            with open(self.ENDPOINTS_FILE, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+            
+    def _probe_url(self) -> str:
+        """验证登录用的接口：优先取目标席位已记录的持仓接口"""
+        endpoints = self._load_endpoints()
+        for broker in self.brokers + list(endpoints):
+            if endpoints.get(broker):
+                return endpoints[broker][0]
+        return None
+        
+    def _save_endpoints(self):
+        """保存本次捕获到的接口地址，供直连模式使用：本次抓到的席位以新地址替换旧地址，其他席位保持不变"""
+        if not self._endpoints:
+            return
+        endpoints = self._load_endpoints()
+        for broker, urls in self._endpoints.items():
+            # 不与旧地址合并：接口改版或参数变化后，失效的地址不会一直留在文件中被直连模式请求
+            endpoints[broker] = sorted(urls)
+        with open(self.ENDPOINTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(endpoints, f, ensure_ascii=False, indent=2)
             
-            page.on("response", lambda r: asyncio.create_task(self._handle_response(r)))
+    async def _scrape_data(self, brokers: list = None):
+        """爬取数据"""
+        # 只有浏览器模式需要 Playwright，清理、报告等不抓取的入口不付出导入开销
+        from playwright.async_api import async_playwright
+        
+        discover = brokers is None and self.discover_url
+        async with async_playwright() as p:
+            # 有保存的登录状态时使用无头模式；没有时直接打开浏览器窗口，登录沿用同一个浏览器
+            self._start_response_workers()
+            state = self.session.load()
+            print("\n[1/4] 启动浏览器" + ("，使用已保存的登录状态..." if state else "..."))
+            launch_start = time.perf_counter()
+            browser, context = await self._launch(p, state)
+            self.metrics.record("browser_launch", time.perf_counter() - launch_start)
             
             try:
-                print("\n[1/4] 打开网站..." if has_auth else "\n[1/4] 打开网站...")
-                await page.goto(self.BASE_URL, wait_until="domcontentloaded")
-                await asyncio.sleep(3)
-                
-                # 检查是否需要登录
-                need_login = not has_auth
-                if has_auth:
-                    # 验证登录状态是否有效
-                    is_logged_in = await page.evaluate('''() => {
-                        return document.body.innerText.includes('退出') || 
-                               document.body.innerText.includes('个人中心') ||
-                               document.querySelector('.user-info') !== null;
-                    }''')
-                    if not is_logged_in:
-                        print("   ⚠️ 登录状态已过期，需要重新登录")
-                        need_login = True
-                        # 删除过期的登录状态
-                        os.remove(self.AUTH_FILE)
-                        await browser.close()
-                        # 重新打开浏览器（非无头模式）
-                        browser = await p.chromium.launch(headless=False, slow_mo=50)
-                        context = await browser.new_context(
-                            viewport={"width": 1400, "height": 900},
-                            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-                        )
-                        page = await context.new_page()
-                        page.set_default_timeout(120000)
-                        page.on("response", lambda r: asyncio.create_task(self._handle_response(r)))
-                        await page.goto(self.BASE_URL, wait_until="domcontentloaded")
-                        await asyncio.sleep(3)
-                
-                if need_login:
-                    print("\n" + "=" * 70)
-                    print("🔐 请在浏览器窗口中登录您的账号")
-                    print("   登录完成后，回到终端按 Enter 键继续...")
-                    print("   (登录状态会被保存，下次无需重复登录)")
-                    print("=" * 70)
-                    input()
-                    
-                    # 保存登录状态
-                    await context.storage_state(path=self.AUTH_FILE)
-                    print("   ✓ 登录状态已保存")
-                
                 print("\n[2/4] 验证登录状态...")
-                await asyncio.sleep(2)
+                status = SessionManager.INVALID
+                if state is not None:
+                    # 优先用一次接口请求确认，没有记录到接口时才打开首页检查
+                    status = await self.session.validate(context, lambda: self.page_logged_in(context))
+                if status == SessionManager.VALID:
+                    print("   ✓ 登录状态有效")
+                elif status == SessionManager.UNKNOWN:
+                    # 网络波动等无法判断的情况不视为登录失效，各席位抓取自带重试
+                    print("   ⚠️ 暂时无法确认登录状态，继续使用已保存的登录状态")
+                elif state is not None:
+                    # 无头浏览器无法交互登录，关闭后由 _login 打开浏览器窗口
+                    print("   ⚠️ 登录状态已过期，需要重新登录")
+                    await browser.close()
+                    browser, context = await self._login(p)
+                else:
+                    browser, context = await self._login(p, browser, context)
+                if self.lean:
+                    # 登录完成后再拦截，交互登录页面需要完整加载
+                    await context.route("**/*", self._route_request)
                 
-                print("\n[3/4] 获取席位持仓数据...")
-                for broker in self.TARGET_BROKERS:
-                    print(f"\n  📊 {broker}...")
+                if discover:
+                    page = await context.new_page()
+                    page.set_default_timeout(120000)
                     try:
-                        url = f"{self.BASE_URL}/#/broker/position/broker={broker}"
-                        await page.goto(url, wait_until="domcontentloaded")
-                        await asyncio.sleep(5)
-                        
-                        try:
-                            await page.wait_for_selector("table", timeout=10000)
-                        except:
-                            pass
-                            
-                        await self._extract_page_data(page, broker)
-                        
-                    except Exception as e:
-                        print(f"    ❌ 出错: {e}")
-                        
+                        await self._discover_brokers(page)
+                    finally:
+                        await page.close()
+                brokers = brokers or self.brokers
+                
+                print(f"\n[3/4] 获取席位持仓数据 (并发数: {self.concurrency})...")
+                await self._scrape_brokers(context, brokers)
+                # 服务端可能轮换了 Cookie，写回共享的登录状态文件
+                await self.session.save(context)
+                
+                self._print_wait_summary()
+                self._print_traffic_summary()
                 print("\n[4/4] 处理数据...")
                         
             except Exception as e:
+                # 单次出错不清除登录状态，下次运行会重新验证
                 print(f"❌ 出错: {e}")
-                # 如果出错可能是登录状态问题，删除保存的状态
-                if os.path.exists(self.AUTH_FILE):
-                    os.remove(self.AUTH_FILE)
-                    print("   已清除登录状态，请重新运行")
             finally:
+                # 排队的响应要在浏览器关闭前读取响应体
+                await self._drain_response_tasks()
                 await browser.close()
+                self._merge_results()
+                self._save_endpoints()
                 
-    async def _handle_response(self, response):
-        """处理API响应"""
-        url = response.url
-        if response.status == 200:
+    async def _launch(self, p, state: dict = None):
+        """启动浏览器并创建 context，返回 (browser, context)；没有登录状态时打开浏览器窗口以便登录"""
+        headless = state is not None
+        browser = await p.chromium.launch(headless=headless, slow_mo=0 if headless else 50)
+        context = await browser.new_context(
+            storage_state=state,
+            viewport={"width": 1400, "height": 900},
+            user_agent=self.USER_AGENT
+        )
+        # 响应监听挂在 context 上，所有页面共享
+        context.on("response", self._on_response)
+        return browser, context
+        
+    async def _login(self, p, browser=None, context=None):
+        """交互登录，返回 (browser, context)；传入已打开窗口的浏览器时在其中登录，不再另行启动。
+        持有登录锁：并发运行的其他进程在此等待，等待期间已有进程完成登录时直接使用新的登录状态"""
+        with self.session.login_lock():
+            if self.session.changed_on_disk():
+                state = self.session.load()
+                if state is not None:
+                    if browser is not None:
+                        await browser.close()
+                    browser, context = await self._launch(p, state)
+                    status = await self.session.validate(context, lambda: self.page_logged_in(context))
+                    if status != SessionManager.INVALID:
+                        print("   ✓ 使用其他进程刚保存的登录状态")
+                        return browser, context
+                    await browser.close()
+                    browser = context = None
+                    
+            if browser is None:
+                browser, context = await self._launch(p)
+            page = await context.new_page()
+            page.set_default_timeout(120000)
+            await page.goto(self.BASE_URL, wait_until="domcontentloaded")
+            print("\n" + "=" * 70)
+            print("🔐 请在浏览器窗口中登录您的账号")
+            print("   登录完成后，回到终端按 Enter 键继续...")
+            print("   (登录状态会被保存，下次无需重复登录)")
+            print("=" * 70)
+            input()
+            
+            # 保存登录状态
+            await self.session.save(context)
+            await page.close()
+            print("   ✓ 登录状态已保存")
+            return browser, context
+            
+    async def page_logged_in(self, context) -> bool:
+        """打开首页检查登录标识，作为没有可用接口时的登录验证方式"""
+        page = await context.new_page()
+        try:
+            await page.goto(self.BASE_URL, wait_until="domcontentloaded")
+            return await self._wait_logged_in(page)
+        finally:
+            await page.close()
+            
+    async def _scrape_brokers(self, context, brokers: list):
+        """用有界页面池并发抓取指定席位"""
+        queue = asyncio.Queue()
+        for broker in brokers:
+            queue.put_nowait(broker)
+            
+        workers = [
+            asyncio.create_task(self._broker_worker(context, queue))
+            for _ in range(max(1, min(self.concurrency, len(brokers))))
+        ]
+        # 所有工作者都退出时队列不会再被消费，不能只等 queue.join()
+        joined = asyncio.create_task(queue.join())
+        finished = asyncio.gather(*workers, return_exceptions=True)
+        await asyncio.wait([joined, finished], return_when=asyncio.FIRST_COMPLETED)
+        joined.cancel()
+        for worker in workers:
+            worker.cancel()
+        results = await finished
+        errors = [r for r in results if isinstance(r, Exception) and not isinstance(r, asyncio.CancelledError)]
+        if errors and not queue.empty():
+            raise RuntimeError(f"页面池全部失效，{queue.qsize()} 个席位未抓取: {errors[0]}")
+            
+    async def _broker_worker(self, context, queue):
+        """页面池中的单个工作者：独占一个页面，依次处理队列中的席位"""
+        page = None
+        try:
+            page = await context.new_page()
+            page.set_default_timeout(120000)
+            while True:
+                broker = await queue.get()
+                try:
+                    with self.metrics.span("broker", broker=broker):
+                        await self._scrape_broker(page, broker)
+                finally:
+                    queue.task_done()
+        except Exception as e:
+            print(f"  ❌ 页面工作者退出: {e}")
+            raise
+        finally:
+            if page is not None:
+                self._page_brokers.pop(page, None)
+                await page.close()
+            
+    async def _scrape_broker(self, page, broker: str):
+        """抓取单个席位，失败时按指数退避重试"""
+        for attempt in range(self.max_retries + 1):
             try:
-                content_type = response.headers.get("content-type", "")
-                if "json" in content_type:
-                    data = await response.json()
-                    if "broker" in url.lower() or "position" in url.lower():
-                        self.api_data[url] = data
-                        if isinstance(data, dict) and data.get("code") == 0:
-                            self._extract_from_api(url, data)
-            except:
-                pass
+                url = f"{self.BASE_URL}/#/broker/position/broker={broker}"
+                await self._wait_response_backlog()
+                self._page_brokers[page] = broker
+                with self.metrics.span("navigate", broker=broker):
+                    # 记录导航前的表格指纹，并在导航前登记接口到达事件
+                    previous = await page.evaluate(self.TABLE_FINGERPRINT_JS)
+                    await page.evaluate("() => { delete window.__jykcReady; }")
+                    self._api_ready[broker] = asyncio.Event()
+                    await page.goto(url, wait_until="domcontentloaded")
+                source, table_ready = await self._wait_ready(page, broker, previous)
+                if not table_ready:
+                    # 表格没有换成本席位的内容，页面上可能仍是上一个席位的表格，不能读取
+                    self._dom_blocks.pop(broker, None)
+                    if source == "api":
+                        self.metrics.inc("dom_skipped", broker=broker)
+                        print(f"  📊 {broker}: 表格未就绪，只使用接口数据")
+                        return
+                    raise TimeoutError(f"{self.ready_timeout:.0f}秒内数据未就绪")
+                    
+                with self.metrics.span("extract", broker=broker):
+                    blocks = await self._extract_page_data(page, broker)
+                    self._dom_blocks[broker] = blocks
+                count = sum(len(block["rows"]) for block in blocks)
+                self.metrics.inc("rows_captured", count, source="dom")
+                if self.cache and count:
+                    # 缓存保存页面原文（按表头分段的列式结果），重放时按当时的规则重新规整
+                    self.cache.put(ResponseCache.DOM, broker, self.trade_date, blocks)
+                return
                 
-    def _extract_from_api(self, url: str, response: dict):
-        """从API提取数据"""
-        data = response.get("data")
-        if not data:
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    print(f"  ❌ {broker} 出错: {e}")
+                    return
+                delay = self.RETRY_BACKOFF * (2 ** attempt)
+                self.metrics.inc("retries")
+                print(f"  ⚠️ {broker} 出错，{delay:.0f}秒后重试 ({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+                
+    async def _wait_logged_in(self, page) -> bool:
+        """等待登录标识出现，超时视为未登录"""
+        start = time.perf_counter()
+        try:
+            await page.wait_for_function(self.LOGIN_JS, timeout=self.LOGIN_CHECK_TIMEOUT * 1000,
+                                         polling=100)
+            source = "dom"
+        except Exception:
+            source = "timeout"
+        self._record_wait("login", "", start, source)
+        return source != "timeout"
+        
+    async def _wait_ready(self, page, broker: str, previous: str = "") -> tuple:
+        """等待席位数据就绪：接口响应到达或表格渲染稳定，先到先返回 (来源, 表格是否已就绪)。
+        表格就绪指指纹已不同于导航前的 previous 且行数稳定；接口先到时再给表格 DOM_GRACE 秒"""
+        start = time.perf_counter()
+        api_task = asyncio.create_task(self._api_ready[broker].wait())
+        dom_task = asyncio.create_task(page.wait_for_function(
+            self.TABLE_STABLE_JS, arg=previous, polling=100, timeout=self.ready_timeout * 1000))
+        done, _ = await asyncio.wait({api_task, dom_task}, timeout=self.ready_timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if dom_task in done and dom_task.exception() is not None and api_task not in done:
+            # 页面检测提前失败（如执行上下文被导航销毁），剩余时间只等接口
+            remaining = self.ready_timeout - (time.perf_counter() - start)
+            done, _ = await asyncio.wait({api_task}, timeout=max(0.0, remaining))
+            done = done | {dom_task}
+
+        table_ready = False
+        if dom_task in done and dom_task.exception() is None:
+            source = "dom"
+            table_ready = True
+        elif api_task in done:
+            source = "api"
+            # 接口已返回，表格通常随后一帧内渲染，短暂等待以便读取页面数据
+            try:
+                await asyncio.wait_for(asyncio.shield(dom_task), timeout=self.DOM_GRACE)
+                table_ready = True
+            except Exception:
+                pass
+        else:
+            source = "timeout"
+            
+        for task in (api_task, dom_task):
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(api_task, dom_task, return_exceptions=True)
+        self._record_wait("broker", broker, start, source)
+        return source, table_ready
+        
+    def _record_wait(self, step: str, broker: str, start: float, source: str):
+        """记录一次等待的耗时与结束原因"""
+        seconds = time.perf_counter() - start
+        self.wait_stats.append({
+            "步骤": step,
+            "席位": broker,
+            "耗时": round(seconds, 3),
+            "来源": source,
+        })
+        labels = {"broker": broker} if broker else {}
+        self.metrics.record(f"wait_{step}", seconds, source=source, **labels)
+        
+    def _print_wait_summary(self):
+        """打印等待耗时统计"""
+        waits = [w for w in self.wait_stats if w["步骤"] == "broker"]
+        if not waits:
+            return
+        total = sum(w["耗时"] for w in waits)
+        timeouts = sum(1 for w in waits if w["来源"] == "timeout")
+        print(f"\n   ⏱ 等待就绪: 共 {total:.2f}s, 平均 {total / len(waits):.2f}s, 超时 {timeouts} 次")
+        for w in waits:
+            print(f"      {w['席位']}: {w['耗时']:.2f}s ({w['来源']})")
+            
+    async def _discover_brokers(self, page):
+        """从席位列表页的链接中发现席位，追加到目标席位之后"""
+        print(f"\n   🔎 发现席位: {self.discover_url}")
+        start = time.perf_counter()
+        await page.goto(self.discover_url, wait_until="domcontentloaded")
+        try:
+            await page.wait_for_selector('a[href*="broker="]', timeout=self.ready_timeout * 1000)
+        except Exception:
+            pass
+        hrefs = await page.evaluate(self.SEAT_LINKS_JS)
+        self._record_wait("discover", "", start, "dom" if hrefs else "timeout")
+        
+        before = len(self.brokers)
+        self._extend_brokers(self._broker_from_url(h) for h in hrefs)
+        print(f"   ✓ 新增 {len(self.brokers) - before} 个席位，共 {len(self.brokers)} 个")
+        
+    def _extend_brokers(self, brokers):
+        """追加席位，受 max_brokers 限制"""
+        merged = self.brokers + [b for b in brokers if b and b not in self._broker_set]
+        if self.max_brokers:
+            merged = merged[:self.max_brokers]
+        self.set_brokers(merged)
+        
+    def describe_brokers(self) -> str:
+        """启动信息中的席位描述"""
+        text = ', '.join(self.brokers[:self.SEAT_PRINT_LIMIT])
+        if len(self.brokers) > self.SEAT_PRINT_LIMIT:
+            text += f" 等 {len(self.brokers)} 个"
+        if self.discover_url:
+            text += " (+ 网站发现)"
+        return text
+        
+    def _merge_results(self):
+        """按席位顺序合并页面与 API 记录，保证输出顺序确定；
+        同一 (席位, 合约, 交易日) 两种来源都有时以 API 记录为准。全部席位的页面表格一次按列解析为记录表，
+        只有接口记录逐条构造，页面行不再转为 PositionRecord"""
+        table = self._dom_frame()
+        dom = self.normalizer.parse_table(table) if table is not None else self.normalizer.frame([])
+        api = self.normalizer.frame([record for broker in self.brokers
+                                     for record in self._api_rows.get(broker, {}).values()])
+        self.position_data = self.normalizer.merge(dom, api, self.brokers)
+        
+    def _start_response_workers(self):
+        """创建有界的响应队列和固定数量的解析工作者"""
+        self._responses = asyncio.Queue(maxsize=self.RESPONSE_QUEUE_SIZE)
+        self._response_workers = [asyncio.create_task(self._response_worker())
+                                  for _ in range(self.RESPONSE_WORKERS)]
+        
+    def _on_response(self, response):
+        """响应事件回调：按席位统计加载量；只把持仓接口的响应放入队列，其余响应不读取响应体"""
+        broker = self._request_broker(response)
+        length = response.headers.get("content-length", "")
+        self.metrics.inc("requests_loaded", broker=broker)
+        self.metrics.inc("content_length_bytes", int(length) if length.isdigit() else 0, broker=broker)
+        if self._responses is None or not self._is_position_response(response):
             return
+        try:
+            self._responses.put_nowait(response)
+        except asyncio.QueueFull:
+            if len(self._response_tasks) >= self.RESPONSE_DEFERRED_LIMIT:
+                # 等待入队的任务也已到上限：丢弃该响应，席位数据等待页面表格
+                self.metrics.inc("responses_dropped", broker=broker)
+                return
+            # 回调不能等待：由单独的任务等空位入队，页面工作者在下一次导航前等待积压处理完
+            self.metrics.inc("responses_deferred")
+            task = asyncio.create_task(self._responses.put(response))
+            self._response_tasks.add(task)
+            task.add_done_callback(self._response_tasks.discard)
             
-        broker = ""
-        if "broker=" in url:
-            from urllib.parse import unquote
-            broker = unquote(url.split("broker=")[1].split("&")[0].split("/")[0])
+    def _is_position_response(self, response) -> bool:
+        return (response.status == 200 and self.API_URL_PATTERN.search(response.url) is not None
+                and "json" in response.headers.get("content-type", ""))
+                
+    def _request_broker(self, request) -> str:
+        """请求或响应所属页面正在抓取的席位；首页、席位发现等页面返回空字符串"""
+        try:
+            return self._page_brokers.get(request.frame.page, "")
+        except Exception:
+            return ""
+            
+    def _block_reason(self, request):
+        """精简模式下拦截请求的原因（资源类型或 tracker），放行时返回 None"""
+        if request.resource_type in self.BLOCK_RESOURCE_TYPES:
+            return request.resource_type
+        if self.BLOCK_URL_PATTERN.search(request.url) and not self.API_URL_PATTERN.search(request.url):
+            return "tracker"
+        return None
+        
+    async def _route_request(self, route):
+        """精简模式的请求拦截：页面、脚本与接口照常加载，其余按资源类型与地址拦截"""
+        request = route.request
+        reason = self._block_reason(request)
+        if reason is None:
+            await route.continue_()
+            return
+        self.metrics.inc("requests_blocked", broker=self._request_broker(request), source=reason)
+        await route.abort()
+        
+    def _print_traffic_summary(self):
+        """按席位打印加载与拦截的请求数；被拦截的请求没有下载，节省的字节数需与非精简模式的运行对比"""
+        traffic = {}
+        for (name, labels), value in self.metrics.counters.items():
+            if name in ("requests_loaded", "content_length_bytes", "requests_blocked"):
+                broker = dict(labels).get("broker", "")
+                stats = traffic.setdefault(broker, {"requests_loaded": 0, "content_length_bytes": 0, "requests_blocked": 0})
+                stats[name] += value
+        seats = [traffic[b] for b in self.brokers if b in traffic]
+        if not seats:
+            return
+        loaded = sum(t["requests_loaded"] for t in seats)
+        size = sum(t["content_length_bytes"] for t in seats)
+        blocked = sum(t["requests_blocked"] for t in seats)
+        print(f"\n   🌐 席位页面请求: 加载 {loaded:.0f} 个 (Content-Length 合计 {size / 1024:.1f} KB), "
+              f"拦截 {blocked:.0f} 个; "
+              f"平均每席位加载 {loaded / len(seats):.1f} 个 ({size / 1024 / len(seats):.1f} KB), "
+              f"拦截 {blocked / len(seats):.1f} 个")
+        if len(self.brokers) <= self.SEAT_PRINT_LIMIT:
+            for broker in self.brokers:
+                t = traffic.get(broker)
+                if t:
+                    print(f"      {broker}: 加载 {t['requests_loaded']:.0f} 个 ({t['content_length_bytes'] / 1024:.1f} KB), "
+                          f"拦截 {t['requests_blocked']:.0f} 个")
+                          
+    async def _response_worker(self):
+        """解析工作者：逐个读取响应体并提取记录，原始数据不保留"""
+        while True:
+            response = await self._responses.get()
+            try:
+                await self._handle_response(response)
+            finally:
+                self._responses.task_done()
+                
+    async def _wait_response_backlog(self):
+        """响应队列已满时等待积压处理完，避免页面产生响应的速度超过解析速度"""
+        if self._responses is not None and self._responses.full():
+            start = time.perf_counter()
+            await self._responses.join()
+            self.metrics.record("response_backlog", time.perf_counter() - start)
             
-        if broker not in self.TARGET_BROKERS:
+    async def _drain_response_tasks(self):
+        """等待排队中的响应处理完，然后停止解析工作者"""
+        if self._responses is None:
             return
+        if self._response_tasks:
+            await asyncio.gather(*list(self._response_tasks), return_exceptions=True)
+        await self._responses.join()
+        dropped = self.metrics.counter("responses_dropped")
+        if dropped:
+            print(f"   ⚠️ 接口响应积压过多，丢弃 {dropped:.0f} 个，相应席位使用页面表格")
+        for worker in self._response_workers:
+            worker.cancel()
+        await asyncio.gather(*self._response_workers, return_exceptions=True)
+        self._responses = None
+        self._response_workers = []
+                
+    async def _handle_response(self, response):
+        """处理API响应"""
+        url = response.url
+        try:
+            body = await response.body()
+            self.metrics.inc("bytes_received", len(body), source="browser")
+            data = json.loads(body)
+            del body
+            if self.cache:
+                self.cache.put(ResponseCache.API, url, self.trade_date, data, response.headers)
+            if isinstance(data, dict) and data.get("code") == 0:
+                # 能解析出记录的接口才记下来，供直连模式复用
+                if self._extract_from_api(url, data):
+                    broker = self._broker_from_url(url)
+                    self._endpoints.setdefault(broker, set()).add(url)
+                    if broker in self._api_ready:
+                        self._api_ready[broker].set()
+        except:
+            pass
+            
+    def _broker_from_url(self, url: str) -> str:
+        """从接口地址中解析席位名"""
+        if "broker=" not in url:
+            return ""
+        return unquote(url.split("broker=")[1].split("&")[0].split("/")[0])
+        
+    def _extract_from_api(self, url: str, response: dict) -> int:
+        """从API提取数据，返回新增记录数"""
+        data = response.get("data")
+        if not data:
+            return 0
             
+        broker = self._broker_from_url(url)
+        if broker not in self._broker_set:
+            return 0
+            
+        count = 0
         if isinstance(data, list):
             for item in data:
                 if isinstance(item, dict):
-                    self._add_position(broker, item)
+                    count += self._add_position(broker, item)
         elif isinstance(data, dict):
             for key, value in data.items():
                 if isinstance(value, list):
                     for item in value:
                         if isinstance(item, dict):
-                            self._add_position(broker, item, key)
+                            count += self._add_position(broker, item, key)
+        self.metrics.inc("rows_captured", count, source="api")
+        return count
                             
-    def _add_position(self, broker: str, item: dict, direction: str = None):
-        """添加持仓记录"""
-        variety = item.get("variety") or item.get("varietyName") or item.get("name")
-        if not variety:
-            return
+    def _add_position(self, broker: str, item: dict, direction: str = None) -> int:
+        """添加持仓记录，返回新增记录数"""
+        record = self.normalizer.from_api(broker, item, direction)
+        if record is None:
+            return 0
             
-        self.position_data.append({
-            "席位": broker,
-            "品种": variety,
-            "合约": item.get("code") or item.get("contract"),
-            "方向": direction,
-            "多头持仓": item.get("buy") or item.get("long"),
-            "多头变化": item.get("buy_chge") or item.get("buyChg"),
-            "空头持仓": item.get("ss") or item.get("sell") or item.get("short"),
-            "空头变化": item.get("ss_chge") or item.get("sellChg"),
-            "净持仓": item.get("net"),
-            "净变化": item.get("net_chge") or item.get("netChg"),
-        })
+        # 按 (交易日, 合约) 去重，没有合约代码时按品种；同一接口重复到达只保留一条
+        key = (self.trade_date, record.contract or record.variety)
+        self._api_rows.setdefault(broker, {})[key] = record
+        return 1
         
-    async def _extract_page_data(self, page, broker: str):
-        """从页面提取数据"""
+    async def _extract_page_data(self, page, broker: str) -> list:
+        """从页面提取数据，返回按表头分段的列式结果 [{headers, rows}]"""
         try:
-            table_data = await page.evaluate('''() => {
-                const results = [];
-                const tables = document.querySelectorAll('table');
-                tables.forEach(table => {
-                    const rows = table.querySelectorAll('tr');
-                    let headers = [];
-                    rows.forEach((row, idx) => {
-                        const cells = row.querySelectorAll('td, th');
-                        const rowData = [];
-                        cells.forEach(cell => rowData.push(cell.innerText.trim()));
-                        if (rowData.length > 0) {
-                            if (idx === 0 || rowData.some(c => ['品种', '合约', '多头', '空头'].some(h => c.includes(h)))) {
-                                headers = rowData;
-                            } else if (headers.length > 0) {
-                                const obj = {};
-                                headers.forEach((h, i) => { if (i < rowData.length) obj[h] = rowData[i]; });
-                                results.push(obj);
-                            }
-                        }
-                    });
-                });
-                return results;
-            }''')
-            
-            if table_data:
-                for row in table_data:
-                    row["席位"] = broker
-                    self.position_data.append(row)
-                print(f"    ✓ 获取 {len(table_data)} 条记录")
-            else:
-                print(f"    ⚠️ 未获取到数据")
+            blocks = await page.evaluate(self.POSITION_TABLE_JS)
+            count = sum(len(block["rows"]) for block in blocks)
+            if count:
+                print(f"  📊 {broker}: ✓ 获取 {count} 条记录")
+                return blocks
+            print(f"  📊 {broker}: ⚠️ 未获取到数据")
                 
         except Exception as e:
-            print(f"    ❌ 解析出错: {e}")
-            
+            print(f"  📊 {broker}: ❌ 解析出错: {e}")
+        return []
+        
+    def _dom_frame(self):
+        """全部席位的页面表格按表头分组，每种表头只构造一次 DataFrame；行号保持席位顺序与页面顺序。
+        数据行比表头短时缺少的列为空；没有页面数据时返回 None"""
+        groups = {}
+        position = 0
+        for broker in self.brokers:
+            for block in self._dom_blocks.get(broker, ()):
+                count = len(block["rows"])
+                if not count:
+                    continue
+                rows, brokers, index = groups.setdefault(tuple(block["headers"]), ([], [], []))
+                rows.extend(block["rows"])
+                brokers.extend([broker] * count)
+                index.extend(range(position, position + count))
+                position += count
+        frames = []
+        for headers, (rows, brokers, index) in groups.items():
+            frame = pd.DataFrame(rows, columns=headers, index=index)
+            if frame.columns.duplicated().any():
+                # 表头重名时保留最后一列，与按表头逐行还原记录时后者覆盖前者一致
+                frame = frame.loc[:, ~frame.columns.duplicated(keep="last")]
+            frame["席位"] = brokers
+            frames.append(frame)
+        if not frames:
+            return None
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames).sort_index()
+        
+    @staticmethod
+    def _legacy_blocks(rows: list) -> list:
+        """旧版缓存保存的是按表头还原的逐行记录，转换为分段的列式结果"""
+        headers = list(dict.fromkeys(key for row in rows for key in row if key != "席位"))
+        return [{"headers": headers, "rows": [[row.get(key) for key in headers] for row in rows]}]
+        
     def _generate_report(self):
         """生成HTML报告"""
         print("\n" + "=" * 70)
         print("📊 生成HTML报告...")
         print("=" * 70)
         
-        # 保存原始数据
-        df_raw = pd.DataFrame(self.position_data)
-        df_raw.to_excel("broker_positions_raw.xlsx", index=False)
-        
-        # 处理数据
-        df_clean = self._clean_data(df_raw)
+        # 处理数据：合并时已是合约级记录表，这里按 (席位, 品种) 汇总
+        with self.metrics.span("clean"):
+            df_rows = self.position_data
+            df_clean = self.aggregate_varieties(df_rows)
+            
+        # 保存原始数据：两种来源合并后的全部记录，带来源列
+        exporter = DataExporter(self.output_format)
+        with self.metrics.span("export_raw"):
+            exporter.write({self.RAW_FILE: df_rows})
+        self.metrics.inc("rows_cleaned", len(df_clean))
         
         if df_clean.empty:
             print("❌ 数据处理后为空")
             return
             
-        df_clean.to_excel("broker_positions_cleaned.xlsx", index=False)
+        df_contracts = df_rows[df_rows['合约'].notna()]
+        with self.metrics.span("export_clean"):
+            paths = exporter.write({self.VARIETY_FILE: df_clean, self.CONTRACT_FILE: df_contracts})
+        print(f"   数据文件: {', '.join(paths)}")
+        if self.excel:
+            with self.metrics.span("excel"):
+                exporter.write_excel(self.RAW_FILE, {"原始数据": df_rows})
+                exporter.write_excel(self.CLEAN_EXCEL_FILE, {"品种汇总": df_clean, "合约明细": df_contracts})
+            print(f"   Excel: {self.RAW_FILE}.xlsx, {self.CLEAN_EXCEL_FILE}.xlsx")
         
-        # 统计
+        # 追加到历史数据库，同一交易日重复运行会替换这些席位当天的数据
+        with PositionStore() as store:
+            with self.metrics.span("store"):
+                count = store.upsert(df_clean, self.trade_date)
+                contract_count = store.upsert_contracts(df_contracts, self.trade_date)
+            print(f"   已写入历史数据库 {store.path}: {self.trade_date} 共 {count} 个品种, {contract_count} 个合约")
+            # 多日分析：滚动净变化、连续增减、Z 值与品种一致性
+            with self.metrics.span("analytics"):
+                analytics = PositionAnalytics(store).compute(self.trade_date, brokers=self.brokers)
+        
+        # 统计：一次计数，席位较多时只列出汇总
         print("\n📈 数据统计:")
-        for broker in self.TARGET_BROKERS:
-            count = len(df_clean[df_clean['席位'] == broker])
-            print(f"   {broker}: {count} 个品种")
+        counts = df_clean['席位'].value_counts().to_dict()
+        if len(self.brokers) <= self.SEAT_PRINT_LIMIT:
+            for broker in self.brokers:
+                print(f"   {broker}: {counts.get(broker, 0)} 个品种")
+        else:
+            covered = sum(1 for broker in self.brokers if counts.get(broker))
+            print(f"   {covered}/{len(self.brokers)} 个席位有数据, 共 {len(df_clean)} 条")
             
-        # 生成HTML
-        html = self._build_html(df_clean)
-        
-        output_file = "broker_positions_report.html"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
+        output_file = self.REPORT_FILE
+        fragments = FragmentCache.load() if self.report_cache else None
+        with self.metrics.span("render"):
+            size = self.write_report(df_clean, analytics, output_file, fragments)
+            if fragments is not None:
+                fragments.save()
+        self.metrics.inc("report_chars", size)
+        if fragments is not None:
+            self.metrics.inc("fragments_reused", fragments.reused)
+            self.metrics.inc("fragments_rendered", fragments.rendered)
+            print(f"   报告片段: 复用 {fragments.reused}, 重新渲染 {fragments.rendered}")
             
         print(f"\n✅ 报告已生成: {output_file}")
         print(f"   请在浏览器中打开查看")
         
+    def write_report(self, df_clean, analytics: dict, output_file: str,
+                     fragments: FragmentCache = None) -> int:
+        """生成HTML：逐段写入文件，不在内存中拼接整个页面；行数较多时改用按需渲染，返回写入的字符数"""
+        lazy = self.report_mode == "lazy" or (
+            self.report_mode == "auto" and len(df_clean) > self.LAZY_REPORT_ROWS)
+        renderer_class = LazyReportRenderer if lazy else ReportRenderer
+        return renderer_class(self.brokers, analytics=analytics, fragments=fragments).write(df_clean, output_file)
+        
     def _clean_data(self, df):
-        """清理数据"""
-        results = []
-        current_variety = None
-        
-        for _, row in df.iterrows():
-            broker = row.get('席位', '')
-            variety_text = str(row.get('品种', '')) if pd.notna(row.get('品种')) else ''
-            net_text = row.get('总净持仓', '')
-            contract_text = row.get('合约', '')
-            long_text = row.get('多头持仓', '')
-            short_text = row.get('空头持仓', '')
-            
-            # 跳过分类行
-            if pd.isna(net_text) and pd.isna(contract_text) and pd.isna(long_text):
-                if variety_text and '建仓过程' not in variety_text and len(variety_text) < 10:
-                    current_variety = variety_text
-                continue
-                
-            # 解析净持仓
-            direction, net_pos, net_chg = self._parse_net(net_text)
-            
-            if direction:
-                current_variety = variety_text if variety_text and '建仓过程' not in variety_text else current_variety
-                contract = self._extract_contract(contract_text)
-                long_pos, long_chg = self._parse_position(long_text)
-                short_pos, short_chg = self._parse_position(short_text)
-                
-                if current_variety:
-                    results.append({
-                        '席位': broker,
-                        '品种': current_variety,
-                        '净方向': direction,
-                        '净持仓': net_pos,
-                        '净变化': net_chg,
-                        '多头持仓': long_pos,
-                        '多头变化': long_chg,
-                        '空头持仓': short_pos,
-                        '空头变化': short_chg,
-                    })
-                    
-        df_result = pd.DataFrame(results)
-        df_result = df_result.dropna(subset=['品种'])
-        df_result = df_result[df_result['品种'].str.len() > 0]
-        df_result = df_result.drop_duplicates(subset=['席位', '品种'])
-        
-        return df_result
-        
-    def _parse_net(self, text):
-        """解析净持仓"""
-        if pd.isna(text) or text == 0:
-            return None, None, None
-        text = str(text)
-        match = re.search(r'净(多|空)(\d+)\s*\n?\(?([增减]少?)(\d+)\)?', text)
-        if match:
-            direction = '多' if match.group(1) == '多' else '空'
-            position = int(match.group(2))
-            change_dir = 1 if '增' in match.group(3) else -1
-            change = int(match.group(4)) * change_dir
-            return direction, position, change
-        return None, None, None
-        
-    def _parse_position(self, text):
-        """解析持仓"""
-        if pd.isna(text):
-            return None, None
-        text = str(text)
-        match = re.match(r'(\d+)\s*\n?\(([+-]?\d+)\)', text)
-        if match:
-            return int(match.group(1)), int(match.group(2))
-        match = re.match(r'(\d+)', text)
-        if match:
-            return int(match.group(1)), 0
-        return None, None
-        
-    def _extract_contract(self, text):
-        """提取合约代码"""
-        if pd.isna(text):
-            return None
-        match = re.match(r'([a-zA-Z]+\d+)', str(text))
-        return match.group(1) if match else None
+        """清理数据：页面表格原文解析为合约级记录，再按 (席位, 品种) 汇总为品种级数据"""
+        return self.aggregate_varieties(self.normalizer.parse_table(df))
         
-    def _build_html(self, df):
-        """构建HTML"""
-        html = f'''<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>期货公司持仓分析报告</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
-            background: linear-gradient(135deg, #0f0f1a 0%, #1a1a2e 50%, #16213e 100%);
-            color: #e0e0e0;
-            min-height: 100vh;
-            padding: 20px;
-        }}
-        .container {{ max-width: 1600px; margin: 0 auto; }}
-        h1 {{
-            text-align: center;
-            color: #00d4ff;
-            margin-bottom: 10px;
-            font-size: 2.2em;
-            text-shadow: 0 0 30px rgba(0, 212, 255, 0.6);
-        }}
-        .subtitle {{ text-align: center; color: #888; margin-bottom: 30px; }}
-        .section {{
-            background: rgba(255, 255, 255, 0.03);
-            border-radius: 15px;
-            padding: 20px;
-            margin-bottom: 20px;
-            border: 1px solid rgba(255, 255, 255, 0.08);
-        }}
-        .section-title {{
-            color: #00d4ff;
-            font-size: 1.4em;
-            margin-bottom: 15px;
-            padding-bottom: 10px;
-            border-bottom: 2px solid rgba(0, 212, 255, 0.3);
-        }}
-        .summary-cards {{
-            display: grid;
-            grid-template-columns: repeat(4, 1fr);
-            gap: 15px;
-            margin-bottom: 25px;
-        }}
-        .broker-card {{
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 12px;
-            padding: 20px;
-            text-align: center;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            transition: transform 0.3s;
-        }}
-        .broker-card:hover {{ transform: translateY(-5px); }}
-        .broker-name {{ font-size: 1.3em; font-weight: bold; color: #00d4ff; margin-bottom: 15px; }}
-        .broker-stats {{ display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }}
-        .stat-item {{ padding: 8px; border-radius: 8px; background: rgba(0, 0, 0, 0.2); }}
-        .stat-value {{ font-size: 1.5em; font-weight: bold; }}
-        .stat-label {{ font-size: 0.8em; color: #888; }}
-        .long {{ color: #ff4757; }}
-        .short {{ color: #2ed573; }}
-        .tabs {{ display: flex; gap: 10px; margin-bottom: 20px; flex-wrap: wrap; }}
-        .tab {{
-            padding: 12px 24px;
-            background: rgba(255, 255, 255, 0.05);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            cursor: pointer;
-            transition: all 0.3s;
-        }}
-        .tab:hover {{ background: rgba(0, 212, 255, 0.1); }}
-        .tab.active {{ background: rgba(0, 212, 255, 0.2); border-color: #00d4ff; color: #00d4ff; }}
-        .tab-content {{ display: none; }}
-        .tab-content.active {{ display: block; }}
-        table {{ width: 100%; border-collapse: collapse; }}
-        th, td {{ padding: 12px 10px; text-align: right; border-bottom: 1px solid rgba(255, 255, 255, 0.08); }}
-        th {{ background: rgba(0, 212, 255, 0.1); color: #00d4ff; font-weight: 600; position: sticky; top: 0; }}
-        td:first-child, th:first-child {{ text-align: left; }}
-        tr:hover {{ background: rgba(255, 255, 255, 0.03); }}
-        .positive {{ color: #ff4757; }}
-        .negative {{ color: #2ed573; }}
-        .table-container {{ max-height: 500px; overflow-y: auto; border-radius: 10px; }}
-        .comparison {{ display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }}
-        .compare-box {{ background: rgba(255, 255, 255, 0.02); border-radius: 10px; padding: 15px; }}
-        .compare-title {{ font-size: 1.1em; margin-bottom: 10px; padding-bottom: 8px; border-bottom: 1px solid rgba(255, 255, 255, 0.1); }}
-        .variety-tag {{
-            display: inline-block;
-            padding: 4px 10px;
-            margin: 3px;
-            border-radius: 15px;
-            font-size: 0.85em;
-        }}
-        .variety-tag.long {{ background: rgba(255, 71, 87, 0.2); color: #ff4757; }}
-        .variety-tag.short {{ background: rgba(46, 213, 115, 0.2); color: #2ed573; }}
-        @media (max-width: 1200px) {{ .summary-cards {{ grid-template-columns: repeat(2, 1fr); }} .comparison {{ grid-template-columns: 1fr; }} }}
-        @media (max-width: 768px) {{ .summary-cards {{ grid-template-columns: 1fr; }} }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🔥 期货公司持仓分析报告</h1>
-        <p class="subtitle">生成时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} | 数据来源: 交易可查</p>
-        
-        <div class="summary-cards">
-'''
-        
-        # 统计卡片
-        for broker in self.TARGET_BROKERS:
-            df_b = df[df['席位'] == broker]
-            total = len(df_b)
-            long_count = len(df_b[df_b['净方向'] == '多'])
-            short_count = len(df_b[df_b['净方向'] == '空'])
-            pct = round(long_count/(total if total else 1)*100)
-            
-            html += f'''            <div class="broker-card">
-                <div class="broker-name">{broker}</div>
-                <div class="broker-stats">
-                    <div class="stat-item"><div class="stat-value">{total}</div><div class="stat-label">持仓品种</div></div>
-                    <div class="stat-item"><div class="stat-value long">{long_count}</div><div class="stat-label">净多品种</div></div>
-                    <div class="stat-item"><div class="stat-value short">{short_count}</div><div class="stat-label">净空品种</div></div>
-                    <div class="stat-item"><div class="stat-value">{pct}%</div><div class="stat-label">多头占比</div></div>
-                </div>
-            </div>
-'''
-        
-        html += '''        </div>
-        
-        <div class="section">
-            <h2 class="section-title">📊 各席位持仓对比</h2>
-            <div class="comparison">
-                <div class="compare-box">
-                    <div class="compare-title long">🔴 净多品种</div>
-'''
-        
-        # 净多对比
-        for broker in self.TARGET_BROKERS:
-            df_b = df[(df['席位'] == broker) & (df['净方向'] == '多')]
-            varieties = df_b.nlargest(8, '净持仓')['品种'].tolist() if not df_b.empty and '净持仓' in df_b.columns else []
-            html += f'                    <div style="margin-bottom:10px;"><strong>{broker}:</strong> '
-            for v in varieties:
-                html += f'<span class="variety-tag long">{v}</span>'
-            html += '</div>\n'
-            
-        html += '''                </div>
-                <div class="compare-box">
-                    <div class="compare-title short">🟢 净空品种</div>
-'''
-        
-        # 净空对比
-        for broker in self.TARGET_BROKERS:
-            df_b = df[(df['席位'] == broker) & (df['净方向'] == '空')]
-            varieties = df_b.nlargest(8, '净持仓')['品种'].tolist() if not df_b.empty and '净持仓' in df_b.columns else []
-            html += f'                    <div style="margin-bottom:10px;"><strong>{broker}:</strong> '
-            for v in varieties:
-                html += f'<span class="variety-tag short">{v}</span>'
-            html += '</div>\n'
-            
-        html += '''                </div>
-            </div>
-        </div>
-        
-        <div class="section">
-            <h2 class="section-title">📈 各席位持仓明细</h2>
-            <div class="tabs">
-'''
-        
-        # 标签
-        for i, broker in enumerate(self.TARGET_BROKERS):
-            active = 'active' if i == 0 else ''
-            html += f'                <div class="tab {active}" onclick="showTab(\'{broker}\')">{broker}</div>\n'
-            
-        html += '            </div>\n'
-        
-        # 表格
-        for i, broker in enumerate(self.TARGET_BROKERS):
-            active = 'active' if i == 0 else ''
-            df_b = df[df['席位'] == broker].copy()
-            if '净持仓' in df_b.columns:
-                df_b['净持仓_abs'] = df_b['净持仓'].abs()
-                df_b = df_b.sort_values('净持仓_abs', ascending=False)
-            
-            html += f'''            <div class="tab-content {active}" id="tab-{broker}">
-                <div class="table-container">
-                    <table>
-                        <thead>
-                            <tr><th>品种</th><th>净方向</th><th>净持仓</th><th>净变化</th><th>多头持仓</th><th>多头变化</th><th>空头持仓</th><th>空头变化</th></tr>
-                        </thead>
-                        <tbody>
-'''
-            
-            for _, row in df_b.iterrows():
-                net_dir = row.get('净方向', '')
-                net_class = 'long' if net_dir == '多' else 'short'
-                net_pos = int(row['净持仓']) if pd.notna(row.get('净持仓')) else 0
-                net_chg = int(row['净变化']) if pd.notna(row.get('净变化')) else 0
-                long_pos = int(row['多头持仓']) if pd.notna(row.get('多头持仓')) else 0
-                long_chg = int(row['多头变化']) if pd.notna(row.get('多头变化')) else 0
-                short_pos = int(row['空头持仓']) if pd.notna(row.get('空头持仓')) else 0
-                short_chg = int(row['空头变化']) if pd.notna(row.get('空头变化')) else 0
-                
-                net_chg_class = 'positive' if net_chg > 0 else 'negative' if net_chg < 0 else ''
-                long_chg_class = 'positive' if long_chg > 0 else 'negative' if long_chg < 0 else ''
-                short_chg_class = 'positive' if short_chg > 0 else 'negative' if short_chg < 0 else ''
-                
-                html += f'''                            <tr>
-                                <td>{row['品种']}</td>
-                                <td class="{net_class}">净{net_dir}</td>
-                                <td>{net_pos:,}</td>
-                                <td class="{net_chg_class}">{'+' if net_chg > 0 else ''}{net_chg:,}</td>
-                                <td>{long_pos:,}</td>
-                                <td class="{long_chg_class}">{'+' if long_chg > 0 else ''}{long_chg:,}</td>
-                                <td>{short_pos:,}</td>
-                                <td class="{short_chg_class}">{'+' if short_chg > 0 else ''}{short_chg:,}</td>
-                            </tr>
-'''
+    def clean_raw(self, df):
+        """重新清理原始数据文件：规整后的记录按类型转换；页面表格原文（旧版原始数据）按列解析"""
+        if '总净持仓' in df.columns:
+            return self.normalizer.parse_table(df)
+        return self.normalizer.frame(self.normalizer.from_table(df))
+        
+    def aggregate_varieties(self, rows):
+        """合约级记录按 (席位, 品种) 求和：有合约代码时汇总各合约，否则沿用该品种的第一条记录"""
+        columns = ['席位', '品种', '净方向', '净持仓', '净变化'] + self.POSITION_COLUMNS
+        if rows.empty:
+            return rows.reindex(columns=columns)
             
-            html += '''                        </tbody>
-                    </table>
-                </div>
-            </div>
-'''
-        
-        html += '''        </div>
-        
-        <div style="text-align: center; color: #666; margin-top: 30px; padding: 20px;">
-            <p>⚠️ 风险提示：以上数据仅供参考，期货交易风险较大，请谨慎决策</p>
-        </div>
-    </div>
-    
-    <script>
-        function showTab(broker) {
-            document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
-            document.querySelectorAll('.tab').forEach(el => el.classList.remove('active'));
-            document.getElementById('tab-' + broker).classList.add('active');
-            event.target.classList.add('active');
-        }
-    </script>
-</body>
-</html>
-'''
+        # 组号按首次出现顺序编号，输出顺序与页面一致
+        group = rows.groupby(['席位', '品种'], sort=False, observed=True).ngroup().to_numpy()
+        coded = rows['合约'].notna().to_numpy()
+        has_contract = np.bincount(group, weights=coded) > 0
+        first = np.zeros(len(rows), dtype=bool)
+        first[np.unique(group, return_index=True)[1]] = True
+        use = coded | (first & ~has_contract[group])
         
-        return html
+        # 净持仓换算成带符号的净头寸后求和；净变化同样按方向换算，汇总后再换回相对汇总方向的增减
+        sign = np.where(rows['净方向'].to_numpy() == '多', 1, -1)[use]
+        net = np.bincount(group[use], weights=rows['净持仓'].to_numpy()[use] * sign).astype('int64')
+        change = np.bincount(group[use], weights=rows['净变化'].to_numpy()[use] * sign).astype('int64')
+        agg_sign = np.where(net >= 0, 1, -1)
+        sums = rows.loc[use, self.POSITION_COLUMNS].groupby(group[use]).sum(min_count=1)
+        
+        firsts = rows.loc[first, ['席位', '品种']].reset_index(drop=True)
+        df_result = pd.DataFrame({
+            '席位': firsts['席位'].cat.remove_unused_categories(),
+            '品种': firsts['品种'].cat.remove_unused_categories(),
+            '净方向': pd.Categorical(np.where(agg_sign > 0, '多', '空'), categories=self.DIRECTIONS),
+            '净持仓': np.abs(net).astype('int32'),
+            '净变化': (change * agg_sign).astype('int32'),
+        })
+        for name in self.POSITION_COLUMNS:
+            df_result[name] = sums[name].astype(rows[name].dtype).reset_index(drop=True)
+        return df_result[columns]
+        
+    def _build_html(self, df, analytics: dict = None):
+        """构建HTML"""
+        return ''.join(ReportRenderer(self.brokers, analytics=analytics).render(df))
 
 
-async def main():
-    scraper = BrokerPositionScraper()
-    await scraper.run()
+async def main(argv: list = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="期货公司持仓数据爬虫")
+    parser.add_argument("--concurrency", type=int, default=BrokerPositionScraper.CONCURRENCY,
+                        help="并发抓取的页面数")
+    parser.add_argument("--retries", type=int, default=BrokerPositionScraper.MAX_RETRIES,
+                        help="每个席位失败后的重试次数")
+    parser.add_argument("--direct", action="store_true",
+                        help="直接请求持仓接口，登录过期或接口未知时回退到浏览器")
+    parser.add_argument("--lean", action="store_true",
+                        help="精简浏览：拦截图片、字体、样式表与统计脚本，只加载页面脚本和持仓接口")
+    parser.add_argument("--ready-timeout", type=float, default=BrokerPositionScraper.READY_TIMEOUT,
+                        help="每个席位等待数据就绪的超时（秒）")
+    parser.add_argument("--date", help="交易日期 YYYY-MM-DD，写入历史数据库时使用，默认今天")
+    parser.add_argument("--brokers", help="目标席位，逗号分隔；默认读取 seats.json，否则为内置的四个席位")
+    parser.add_argument("--seats-file", default=BrokerPositionScraper.SEATS_FILE, help="席位配置文件")
+    parser.add_argument("--discover-seats", nargs="?", const=BrokerPositionScraper.BASE_URL, metavar="URL",
+                        help="从页面链接发现全部席位，可指定席位列表页地址")
+    parser.add_argument("--base-url", help=f"网站地址，默认 {BrokerPositionScraper.BASE_URL}")
+    parser.add_argument("--max-brokers", type=int, help="席位数量上限")
+    parser.add_argument("--replay", nargs="?", const="latest", metavar="DATE",
+                        help="不联网，从缓存重放某交易日（默认最新）的数据并生成报告")
+    parser.add_argument("--no-cache", action="store_true", help="不把原始响应写入缓存")
+    parser.add_argument("--no-report-cache", action="store_true",
+                        help=f"不复用上次报告的片段（{FragmentCache.FILE}），全部重新渲染")
+    parser.add_argument("--cache-dir", default=ResponseCache.CACHE_DIR, help="缓存目录")
+    parser.add_argument("--cache-ttl-days", type=float, default=ResponseCache.TTL_DAYS,
+                        help="缓存保存天数，0 表示不过期")
+    parser.add_argument("--cache-max-mb", type=float, default=ResponseCache.MAX_BYTES / 1024 / 1024,
+                        help="缓存总大小上限（MB），超出时淘汰最久未使用的条目")
+    parser.add_argument("--metrics-file", default=Metrics.METRICS_FILE,
+                        help="运行指标追加写入的 JSON Lines 文件，设为空字符串则不写")
+    parser.add_argument("--prometheus-file", help="额外导出 Prometheus 文本格式指标的文件")
+    parser.add_argument("--daemon", action="store_true",
+                        help="常驻运行：保持浏览器登录状态，按发布时间定时抓取并提供本地 JSON 接口")
+    parser.add_argument("--schedule", help="常驻模式的抓取时间，逗号分隔，如 15:40,16:10,17:00")
+    parser.add_argument("--jitter", type=float, help="常驻模式每次抓取随机推迟的上限（秒）")
+    parser.add_argument("--port", type=int, help="常驻模式快照接口端口")
+    parser.add_argument("--run-now", action="store_true", help="常驻模式启动后立即抓取一次")
+    parser.add_argument("--refresh-token",
+                        help="常驻模式 POST /refresh 需要的令牌，也可用环境变量 JYKC_REFRESH_TOKEN 设置；未设置时不开放手动抓取")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"),
+                        help="批量回补：并行重新解析缓存中该日期范围的交易日，写入数据库并逐日生成报告")
+    parser.add_argument("--workers", type=int, help="回补使用的进程数，默认为 CPU 核数")
+    parser.add_argument("--output-dir", help="回补报告的输出目录，默认 reports")
+    parser.add_argument("--force", action="store_true", help="回补时忽略进度文件，全部重做")
+    parser.add_argument("--format", choices=DataExporter.FORMATS, default=DataExporter.FORMAT,
+                        help="原始数据与清理后数据的文件格式，未安装 pyarrow 时改用 csv")
+    parser.add_argument("--excel", action="store_true", help="额外导出 Excel（较慢）")
+    parser.add_argument("--report-mode", choices=["auto", "static", "lazy"], default="auto",
+                        help="报告明细表形式: static 全部输出为表格, lazy 由浏览器按需渲染, "
+                             f"auto 超过 {BrokerPositionScraper.LAZY_REPORT_ROWS} 行时使用 lazy")
+    args = parser.parse_args(argv)
+    
+    cache = None
+    if args.replay or not args.no_cache:
+        cache = ResponseCache(args.cache_dir, ttl_days=args.cache_ttl_days,
+                              max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    config = BrokerPositionScraper.load_seats(args.seats_file)
+    brokers = args.brokers.split(",") if args.brokers else config.get("brokers")
+    discover_url = args.discover_seats or config.get("discover_url")
+    if args.base_url and discover_url == BrokerPositionScraper.BASE_URL:
+        discover_url = args.base_url  # 未指定列表页时在 --base-url 站点上发现席位
+    
+    def make_scraper(trade_date=None):
+        return BrokerPositionScraper(concurrency=args.concurrency, max_retries=args.retries,
+                                     direct=args.direct, ready_timeout=args.ready_timeout,
+                                     trade_date=trade_date, report_mode=args.report_mode,
+                                     brokers=brokers,
+                                     discover_url=discover_url,
+                                     max_brokers=args.max_brokers or config.get("max_brokers"),
+                                     cache=cache, output_format=args.format, excel=args.excel,
+                                     base_url=args.base_url, report_cache=not args.no_report_cache,
+                                     lean=args.lean)
+    
+    if args.backfill:
+        from backfill import Backfill
+        backfill = Backfill({"brokers": brokers, "report_mode": args.report_mode},
+                            cache_dir=args.cache_dir, workers=args.workers, output_dir=args.output_dir)
+        backfill.run(*args.backfill, force=args.force)
+        if args.metrics_file:
+            backfill.metrics.write_jsonl(args.metrics_file)
+        if args.prometheus_file:
+            backfill.metrics.write_prometheus(args.prometheus_file)
+        return
+        
+    if args.daemon:
+        from daemon import ScraperDaemon
+        daemon = ScraperDaemon(make_scraper,
+                               schedule=args.schedule.split(",") if args.schedule else None,
+                               jitter=args.jitter, port=args.port, metrics_file=args.metrics_file,
+                               prometheus_file=args.prometheus_file, run_now=args.run_now,
+                               refresh_token=args.refresh_token)
+        await daemon.serve()
+        return
+        
+    scraper = make_scraper(args.date)
+    try:
+        if args.replay:
+            scraper.replay(None if args.replay == "latest" else args.replay)
+        else:
+            await scraper.run()
+    finally:
+        if args.metrics_file:
+            scraper.metrics.write_jsonl(args.metrics_file)
+        if args.prometheus_file:
+            scraper.metrics.write_prometheus(args.prometheus_file)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+命令行入口
+每个子命令只导入自己需要的模块：clean、report、query 不加载 Playwright，不启动浏览器；
+query 直接读取数据库的行元组，也不加载 pandas
+
+使用方法:
+    python3 cli.py scrape --direct                       # 抓取并生成报告，参数与 broker_position_scraper.py 相同
+    python3 cli.py clean broker_positions_raw.parquet --store --date 2024-06-28
+    python3 cli.py report --date 2024-06-28              # 用历史数据库中的数据重新生成报告
+    python3 cli.py query --variety 螺纹钢 --side short    # 参数与 position_matrix.py 相同
+    python3 cli.py bench --benchmarks clean render       # 参数与 benchmarks/run_suite.py 相同
+
+各子命令的导入耗时检查: python3 benchmarks/bench_startup.py
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 子命令 -> 需要导入的模块；benchmarks/bench_startup.py 按此检查各子命令的导入耗时
+COMMAND_MODULES = {
+    "scrape": ["broker_position_scraper"],
+    "clean": ["broker_position_scraper", "data_export", "position_store"],
+    "report": ["broker_position_scraper", "analytics", "position_store", "report_renderer"],
+    "query": ["position_matrix"],
+    "bench": ["run_suite"],
+}
+COMMAND_HELP = {
+    "scrape": "抓取持仓数据并生成报告（broker_position_scraper.py）",
+    "clean": "重新清理原始数据文件",
+    "report": "用历史数据库重新生成报告",
+    "query": "席位 × 品种矩阵查询（position_matrix.py）",
+    "bench": "运行基准测试（benchmarks/run_suite.py）",
+}
+# 参数原样交给对应模块的 main() 的子命令
+PASSTHROUGH = {"scrape", "query", "bench"}
+
+
+def load(command: str) -> dict:
+    """导入子命令需要的模块，返回 {模块名: 模块}"""
+    if command == "bench" and os.path.join(ROOT_DIR, "benchmarks") not in sys.path:
+        sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+    return {name: importlib.import_module(name) for name in COMMAND_MODULES[command]}
+
+
+def find_raw_file() -> str:
+    """当前目录下的原始数据文件，按 DataExporter 支持的格式依次查找"""
+    for extension in (".parquet", ".feather", ".csv"):
+        path = "broker_positions_raw" + extension
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def clean(args):
+    """重新清理原始数据文件，写出品种汇总与合约明细，可选写入历史数据库"""
+    modules = load("clean")
+    BrokerPositionScraper = modules["broker_position_scraper"].BrokerPositionScraper
+    DataExporter = modules["data_export"].DataExporter
+    PositionStore = modules["position_store"].PositionStore
+
+    path = args.input or find_raw_file()
+    if not path or not os.path.exists(path):
+        print(f"❌ 原始数据文件不存在: {path or 'broker_positions_raw.*'}")
+        return 1
+    scraper = BrokerPositionScraper(trade_date=args.date, output_format=args.format)
+    df_raw = DataExporter.read(path)
+    df_rows = scraper.clean_raw(df_raw)
+    df_clean = scraper.aggregate_varieties(df_rows)
+    if df_clean.empty:
+        print("❌ 数据处理后为空")
+        return 1
+    df_contracts = df_rows[df_rows['合约'].notna()]
+    exporter = DataExporter(args.format)
+    paths = exporter.write({scraper.VARIETY_FILE: df_clean, scraper.CONTRACT_FILE: df_contracts})
+    print(f"🧹 {path}: {len(df_raw)} 行 → {len(df_clean)} 个品种, {len(df_contracts)} 个合约")
+    print(f"   数据文件: {', '.join(paths)}")
+    if args.store:
+        with PositionStore(args.db) as store:
+            count = store.upsert(df_clean, scraper.trade_date)
+            contract_count = store.upsert_contracts(df_contracts, scraper.trade_date)
+        print(f"   已写入历史数据库 {args.db}: {scraper.trade_date} 共 {count} 个品种, {contract_count} 个合约")
+    return 0
+
+
+def report(args):
+    """用历史数据库中某交易日的数据重新生成报告，不联网、不启动浏览器"""
+    modules = load("report")
+    BrokerPositionScraper = modules["broker_position_scraper"].BrokerPositionScraper
+    PositionAnalytics = modules["analytics"].PositionAnalytics
+    PositionStore = modules["position_store"].PositionStore
+    FragmentCache = modules["report_renderer"].FragmentCache
+
+    if not os.path.exists(args.db):
+        print(f"❌ 数据库不存在: {args.db}")
+        return 1
+    with PositionStore(args.db, readonly=True) as store:
+        trade_date = args.date or store.latest_date()
+        df_clean = store.snapshot(trade_date)
+        if df_clean.empty:
+            print(f"❌ 数据库中没有 {trade_date} 的数据")
+            return 1
+        # 席位顺序：--brokers、席位配置文件，否则为当天有数据的席位（内置席位在前）
+        brokers = (args.brokers.split(",") if args.brokers
+                   else BrokerPositionScraper.load_seats(args.seats_file).get("brokers"))
+        if not brokers:
+            present = list(dict.fromkeys(df_clean['席位']))
+            brokers = [b for b in BrokerPositionScraper.TARGET_BROKERS if b in present]
+            brokers += [b for b in present if b not in brokers]
+        analytics = PositionAnalytics(store).compute(trade_date, brokers=brokers)
+
+    scraper = BrokerPositionScraper(brokers=brokers, trade_date=trade_date, report_mode=args.report_mode,
+                                    report_cache=not args.no_report_cache)
+    fragments = FragmentCache.load() if scraper.report_cache else None
+    size = scraper.write_report(df_clean, analytics, args.output, fragments)
+    if fragments is not None:
+        fragments.save()
+        print(f"   报告片段: 复用 {fragments.reused}, 重新渲染 {fragments.rendered}")
+    print(f"✅ {trade_date}: {len(scraper.brokers)} 个席位, {len(df_clean)} 个品种 → {args.output}"
+          f" ({size / 1024:.0f} KB)")
+    return 0
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="期货公司持仓数据工具")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+    parsers = {}
+    for name, description in COMMAND_HELP.items():
+        # 参数原样传递的子命令不处理 -h，由对应模块的参数解析器输出完整帮助
+        parsers[name] = commands.add_parser(name, help=description, add_help=name not in PASSTHROUGH)
+
+    # 这里的默认值与 broker_position_scraper.py / position_store.py 的类常量一致，避免为了显示帮助而导入
+    clean_parser = parsers["clean"]
+    clean_parser.add_argument("input", nargs="?", help="原始数据文件，默认当前目录的 broker_positions_raw.*")
+    clean_parser.add_argument("--format", choices=["parquet", "feather", "csv"], default="parquet",
+                              help="输出文件格式，未安装 pyarrow 时改用 csv")
+    clean_parser.add_argument("--store", action="store_true", help="同时写入历史数据库")
+    clean_parser.add_argument("--date", help="写入历史数据库时的交易日期 YYYY-MM-DD，默认今天")
+    clean_parser.add_argument("--db", default="broker_positions.db", help="数据库文件")
+
+    report_parser = parsers["report"]
+    report_parser.add_argument("--date", help="交易日期 YYYY-MM-DD，默认数据库中最新日期")
+    report_parser.add_argument("--brokers", help="报告中的席位，逗号分隔；默认读取 seats.json，否则为当天有数据的席位")
+    report_parser.add_argument("--seats-file", default="seats.json", help="席位配置文件")
+    report_parser.add_argument("--output", default="broker_positions_report.html", help="报告文件")
+    report_parser.add_argument("--report-mode", choices=["auto", "static", "lazy"], default="auto",
+                               help="报告明细表形式，与抓取时相同")
+    report_parser.add_argument("--no-report-cache", action="store_true", help="不复用上次报告的片段，全部重新渲染")
+    report_parser.add_argument("--db", default="broker_positions.db", help="数据库文件")
+
+    args, extra = parser.parse_known_args(argv)
+    if args.command in PASSTHROUGH:
+        module = load(args.command)[COMMAND_MODULES[args.command][0]]
+        if args.command == "scrape":
+            import asyncio
+            return asyncio.run(module.main(extra))
+        return module.main(extra)
+    if extra:
+        parser.error(f"无法识别的参数: {' '.join(extra)}")
+    return {"clean": clean, "report": report}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+常驻抓取进程
+保持一个已登录的无头浏览器 context，按交易所发布持仓排名的时间定时抓取（带随机延迟），
+并在本地 HTTP 端口以 JSON 提供最新的清理后快照。浏览器启动与登录验证每天只付出一次
+
+使用方法:
+    python3 broker_position_scraper.py --daemon --schedule 15:40,16:10,17:00 --port 8765
+
+接口:
+    GET  /snapshot?broker=摩根大通&variety=螺纹钢   最新交易日的清理后数据
+    GET  /status                                   进程状态、上次与下次抓取时间
+    POST /refresh                                  立即抓取一次，需带 Authorization: Bearer <令牌>；
+                                                   未配置令牌时不开放，已有抓取在运行时返回 409 与该次抓取的编号
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from playwright.async_api import async_playwright
+
+from position_store import PositionStore
+from session_manager import SessionManager
+
+
+class ScraperDaemon:
+    """常驻浏览器 + 定时抓取 + 本地快照接口"""
+
+    SCHEDULE = ["15:40", "16:10", "17:00"]  # 各交易所收盘后陆续发布会员持仓排名
+    WEEKDAYS = range(5)  # 周一至周五
+    JITTER = 120  # 每次定时抓取随机推迟的上限（秒）
+    HOST = "127.0.0.1"
+    PORT = 8765
+    BROWSER_MAX_AGE = 86400  # 浏览器运行超过该秒数后，在下一次抓取前重启
+    TOKEN_ENV = "JYKC_REFRESH_TOKEN"  # 未传入 refresh_token 时从该环境变量读取
+
+    def __init__(self, make_scraper, schedule: list = None, jitter: float = None,
+                 host: str = None, port: int = None, metrics_file: str = None,
+                 prometheus_file: str = None, run_now: bool = False, refresh_token: str = None):
+        self.make_scraper = make_scraper  # trade_date -> BrokerPositionScraper，每次抓取一个新实例
+        self.schedule = sorted(datetime.strptime(t.strip(), "%H:%M").time()
+                               for t in (schedule or self.SCHEDULE))
+        self.jitter = self.JITTER if jitter is None else jitter
+        self.host = host or self.HOST
+        self.port = self.PORT if port is None else port
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        self.run_now = run_now
+        self.refresh_token = refresh_token or os.environ.get(self.TOKEN_ENV) or None  # 为 None 时不开放手动抓取
+
+        self.browser = None
+        self.context = None
+        self.launched_at = 0.0
+        self.loop = None
+        self._playwright = None
+        self._refresh_lock = asyncio.Lock()
+        # 抓取编号：定时与手动抓取共用，HTTP 线程与事件循环都会读写，用线程锁保护
+        self._job_lock = threading.Lock()
+        self._jobs = 0
+        self._active_job = None  # 正在运行或已提交待运行的抓取编号
+
+        # 快照由抓取协程替换、HTTP 线程读取，整体替换引用即可，无需加锁
+        self._snapshot = None  # {"trade_date", "updated_at", "rows"}
+        self._snapshot_body = b""
+        self.state = {"status": "starting", "last_run": None, "last_error": None,
+                      "next_run": None, "runs": 0, "job": None}
+
+    async def serve(self):
+        """启动 HTTP 接口并进入定时循环，直到进程被中断"""
+        self.loop = asyncio.get_running_loop()
+        self._load_latest()
+        server = ThreadingHTTPServer((self.host, self.port), _SnapshotHandler)
+        server.owner = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"🌐 快照接口: http://{self.host}:{server.server_port}/snapshot")
+
+        try:
+            async with async_playwright() as p:
+                self._playwright = p
+                if self.run_now:
+                    await self.refresh()
+                while True:
+                    at = self._next_run(datetime.now()) + timedelta(seconds=random.uniform(0, self.jitter))
+                    self.state["next_run"] = at.isoformat(timespec="seconds")
+                    self.state["status"] = "idle"
+                    print(f"\n⏰ 下次抓取: {at:%Y-%m-%d %H:%M:%S}")
+                    await asyncio.sleep(max(0.0, (at - datetime.now()).total_seconds()))
+                    await self.refresh()
+        finally:
+            server.shutdown()
+            await self._close_browser()
+
+    async def refresh(self, job: int = None):
+        """抓取一次；定时任务与手动触发共用，同一时间只运行一个。job 为手动提交时分配的编号"""
+        async with self._refresh_lock:
+            with self._job_lock:
+                if job is None:
+                    self._jobs += 1
+                    job = self._jobs
+                self._active_job = job
+            self.state["job"] = job
+            self.state["status"] = "running"
+            scraper = self.make_scraper(datetime.now().strftime("%Y-%m-%d"))
+            print("\n" + "=" * 70)
+            print(f"🔄 定时抓取 {scraper.trade_date}: {scraper.describe_brokers()}")
+            print("=" * 70)
+            try:
+                with scraper.metrics.span("daemon_refresh"):
+                    if not await self._ensure_session(scraper):
+                        self.state["last_error"] = "登录状态已失效，请运行一次 broker_position_scraper.py 重新登录"
+                        print(f"   ⚠️ {self.state['last_error']}")
+                        return
+                    await scraper.scrape_with_context(self.context)
+                    if scraper.cache:
+                        scraper.cache.evict()
+                self._publish(scraper.trade_date)
+                self.state["last_error"] = None
+            except Exception as e:
+                # 浏览器崩溃等异常：下次抓取前重新启动
+                print(f"❌ 抓取出错: {e}")
+                self.state["last_error"] = str(e)
+                await self._close_browser()
+            finally:
+                with self._job_lock:
+                    self._active_job = None
+                self.state["runs"] += 1
+                self.state["last_run"] = datetime.now().isoformat(timespec="seconds")
+                scraper.metrics.print_summary()
+                if self.metrics_file:
+                    scraper.metrics.write_jsonl(self.metrics_file)
+                if self.prometheus_file:
+                    scraper.metrics.write_prometheus(self.prometheus_file)
+
+    async def _ensure_session(self, scraper) -> bool:
+        """确保浏览器在运行且登录有效；Cookie 未过期且近期确认过时不访问网络"""
+        if self.context is None or time.time() - self.launched_at > self.BROWSER_MAX_AGE:
+            await self._launch(scraper)
+            if self.context is None:
+                return False
+
+        session = scraper.session
+        status = await session.validate(self.context, lambda: scraper.page_logged_in(self.context))
+        if status == SessionManager.INVALID:
+            # 无头模式下无法交互登录；关闭浏览器，下次抓取时重新读取登录状态文件
+            await self._close_browser()
+            return False
+        if status == SessionManager.UNKNOWN:
+            print("   ⚠️ 暂时无法确认登录状态，继续抓取")
+        # 服务端可能轮换了 Cookie，写回登录状态文件供单次运行模式使用
+        await session.save(self.context)
+        return True
+
+    async def _launch(self, scraper):
+        """启动无头浏览器并加载登录状态"""
+        await self._close_browser()
+        state = scraper.session.load()
+        if state is None:
+            print(f"   ⚠️ 未找到 {scraper.AUTH_FILE}，请先运行一次 broker_position_scraper.py 完成登录")
+            return
+        start = time.perf_counter()
+        self.browser = await self._playwright.chromium.launch(headless=True)
+        self.context = await self.browser.new_context(
+            storage_state=state,
+            viewport={"width": 1400, "height": 900},
+            user_agent=scraper.USER_AGENT
+        )
+        scraper.metrics.record("browser_launch", time.perf_counter() - start)
+        self.launched_at = time.time()
+        scraper.session.reset_validation()
+        print("   ✓ 浏览器已启动")
+
+    async def _close_browser(self):
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        self.browser = None
+        self.context = None
+
+    def _next_run(self, now: datetime) -> datetime:
+        """下一个工作日发布时间点（不含随机延迟）"""
+        for days in range(8):
+            day = (now + timedelta(days=days)).date()
+            if day.weekday() not in self.WEEKDAYS:
+                continue
+            for at in self.schedule:
+                candidate = datetime.combine(day, at)
+                if candidate > now:
+                    return candidate
+        raise ValueError("调度时间表为空")
+
+    def _load_latest(self):
+        """启动时从历史数据库加载最新交易日，接口无需等待第一次抓取"""
+        if os.path.exists(PositionStore.DB_FILE):
+            with PositionStore() as store:
+                trade_date = store.latest_date()
+            if trade_date:
+                self._publish(trade_date)
+
+    def _publish(self, trade_date: str):
+        """从历史数据库读取某交易日快照，预先编码好 JSON 供接口直接返回"""
+        with PositionStore() as store:
+            df = store.snapshot(trade_date)
+        if df.empty:
+            return
+        snapshot = {
+            "trade_date": trade_date,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "rows": json.loads(df.to_json(orient="records", force_ascii=False)),
+        }
+        self._snapshot_body = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+        self._snapshot = snapshot
+        print(f"   ✓ 快照已更新: {trade_date} 共 {len(df)} 条")
+
+    def snapshot_body(self, broker: str = None, variety: str = None):
+        """接口响应体；无过滤条件时直接返回预编码的 JSON，尚无数据时返回 None"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if not broker and not variety:
+            return self._snapshot_body
+        rows = [r for r in snapshot["rows"]
+                if (not broker or r["席位"] == broker) and (not variety or r["品种"] == variety)]
+        return json.dumps({**snapshot, "rows": rows}, ensure_ascii=False).encode("utf-8")
+
+    def status(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            **self.state,
+            "browser": self.context is not None,
+            "trade_date": snapshot["trade_date"] if snapshot else None,
+            "rows": len(snapshot["rows"]) if snapshot else 0,
+            "schedule": [t.strftime("%H:%M") for t in self.schedule],
+        }
+
+    def authorized(self, header: str) -> bool:
+        """校验 Authorization 请求头中的令牌；未配置令牌时一律拒绝"""
+        if not self.refresh_token or not header or not header.startswith("Bearer "):
+            return False
+        return hmac.compare_digest(header[len("Bearer "):].encode("utf-8"), self.refresh_token.encode("utf-8"))
+
+    def trigger_refresh(self) -> tuple:
+        """从 HTTP 线程提交一次抓取到事件循环，返回 (是否新提交, 抓取编号)；
+        已有抓取在运行或已提交时不重复提交，返回该次抓取的编号"""
+        with self._job_lock:
+            if self._active_job is not None:
+                return False, self._active_job
+            self._jobs += 1
+            job = self._active_job = self._jobs
+        asyncio.run_coroutine_threadsafe(self.refresh(job), self.loop)
+        return True, job
+
+
+class _SnapshotHandler(BaseHTTPRequestHandler):
+    """本地快照接口"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        owner = self.server.owner
+        if url.path == "/status":
+            self._send(200, json.dumps(owner.status(), ensure_ascii=False).encode("utf-8"))
+        elif url.path in ("/", "/snapshot"):
+            body = owner.snapshot_body(params.get("broker", [None])[0], params.get("variety", [None])[0])
+            if body is None:
+                self._send(503, b'{"error": "no data yet"}')
+            else:
+                self._send(200, body)
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        owner = self.server.owner
+        if urlparse(self.path).path != "/refresh":
+            self._send(404, b'{"error": "not found"}')
+        elif owner.refresh_token is None:
+            self._send(403, b'{"error": "refresh disabled"}')
+        elif not owner.authorized(self.headers.get("Authorization")):
+            self._send(401, b'{"error": "unauthorized"}')
+        else:
+            started, job = owner.trigger_refresh()
+            body = {"status": "scheduled" if started else "running", "job": job, "status_url": "/status"}
+            self._send(202 if started else 409, json.dumps(body).encode("utf-8"))
+
+    def _send(self, code: int, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 不逐条打印请求日志
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+数据文件导出
+默认写 Parquet（需要 pyarrow），也可选 Feather 或 CSV；未安装 pyarrow 时自动改用 CSV。
+Excel 仅在需要时导出，使用 openpyxl 的只写模式分块写入，不在内存中保留整个工作簿
+"""
+
+import importlib.util
+import os
+
+import pandas as pd
+
+
+class DataExporter:
+    """把 DataFrame 写成列式数据文件，可选导出 Excel"""
+
+    FORMATS = ["parquet", "feather", "csv"]
+    FORMAT = "parquet"
+    EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+    EXCEL_CHUNK_ROWS = 10000  # Excel 每次转换、写入的行数
+
+    def __init__(self, output_format: str = None, output_dir: str = ""):
+        output_format = output_format or self.FORMAT
+        if output_format not in self.FORMATS:
+            raise ValueError(f"不支持的格式: {output_format}，可选 {', '.join(self.FORMATS)}")
+        if output_format != "csv" and importlib.util.find_spec("pyarrow") is None:
+            print(f"   ⚠️ 未安装 pyarrow，数据文件改为 CSV 格式（pip install pyarrow 后可写 {output_format}）")
+            output_format = "csv"
+        self.output_format = output_format
+        self.output_dir = output_dir
+
+    def write(self, frames: dict) -> list:
+        """frames 为 {文件名(不含扩展名): DataFrame}，返回写入的文件路径"""
+        paths = []
+        for name, df in frames.items():
+            path = os.path.join(self.output_dir, name + self.EXTENSIONS[self.output_format])
+            if self.output_format == "csv":
+                # 带 BOM，Excel 直接打开时中文不乱码
+                df.to_csv(path, index=False, encoding="utf-8-sig")
+            else:
+                df = self._arrow_compatible(df)
+                if self.output_format == "parquet":
+                    df.to_parquet(path, index=False)
+                else:
+                    df.to_feather(path)
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def read(path: str) -> pd.DataFrame:
+        """按扩展名读取 write 写出的数据文件；CSV 全部按文本读取，与页面表格原始数据一致"""
+        extension = os.path.splitext(path)[1]
+        if extension == ".parquet":
+            return pd.read_parquet(path)
+        if extension == ".feather":
+            return pd.read_feather(path)
+        return pd.read_csv(path, dtype=str, encoding="utf-8-sig")
+
+    def write_excel(self, name: str, sheets: dict) -> str:
+        """sheets 为 {工作表名: DataFrame}；只写模式逐行追加，内存占用与总行数无关"""
+        from openpyxl import Workbook
+
+        path = os.path.join(self.output_dir, name + ".xlsx")
+        workbook = Workbook(write_only=True)
+        for sheet_name, df in sheets.items():
+            sheet = workbook.create_sheet(sheet_name)
+            sheet.append([str(column) for column in df.columns])
+            for start in range(0, len(df), self.EXCEL_CHUNK_ROWS):
+                # 类别、可空整数等列转为普通 Python 值，缺失值写为空单元格
+                chunk = df.iloc[start:start + self.EXCEL_CHUNK_ROWS].astype(object)
+                chunk = chunk.where(chunk.notna(), None)
+                for row in chunk.itertuples(index=False, name=None):
+                    sheet.append(row)
+        workbook.save(path)
+        return path
+
+    @staticmethod
+    def _arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+        """object 列可能混有接口返回的数字与页面表格的文本，统一为字符串；Feather 要求默认索引"""
+        mixed = [column for column in df.columns if df[column].dtype == object]
+        if mixed:
+            df = df.astype({column: "string" for column in mixed})
+        return df.reset_index(drop=True)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+运行指标
+记录各阶段与各席位的耗时（span）和计数器，输出为 JSON Lines，并可导出 Prometheus 文本格式
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+class Metrics:
+    """单次运行的耗时与计数指标"""
+
+    PREFIX = "jykc"
+    METRICS_FILE = "metrics.jsonl"
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()  # 直连模式的工作线程也会累加计数
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """记录代码块耗时；代码块抛出异常时标记为失败并继续抛出"""
+        started = time.time()
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, started=started, ok=ok, **labels)
+
+    def record(self, name: str, seconds: float, started: float = None, ok: bool = True, **labels):
+        """记录一段已测得的耗时"""
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "labels": labels,
+                "started": started if started is not None else time.time() - seconds,
+                "seconds": round(seconds, 6),
+                "ok": ok,
+            })
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """累加计数器"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels) -> float:
+        """读取计数器；不指定标签时汇总该名称下的所有标签"""
+        if labels:
+            return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+        return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def summary(self) -> list:
+        """按阶段汇总耗时，返回 [(阶段, 总耗时, 次数)]，耗时降序"""
+        totals = {}
+        for span in self.spans:
+            total, count = totals.get(span["name"], (0.0, 0))
+            totals[span["name"]] = (total + span["seconds"], count + 1)
+        return sorted(((n, t, c) for n, (t, c) in totals.items()), key=lambda x: -x[1])
+
+    def write_jsonl(self, path: str = None):
+        """追加写入 JSON Lines：每个 span 和计数器各占一行，均带 run_id"""
+        path = path or self.METRICS_FILE
+        with open(path, "a", encoding="utf-8") as f:
+            for span in self.spans:
+                f.write(json.dumps({"run_id": self.run_id, "type": "span", **span}, ensure_ascii=False) + "\n")
+            for (name, labels), value in sorted(self.counters.items()):
+                f.write(json.dumps({"run_id": self.run_id, "type": "counter", "name": name,
+                                    "labels": dict(labels), "value": value}, ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path: str):
+        """导出 Prometheus 文本格式（供 node_exporter textfile collector 读取）"""
+        lines = [f"# TYPE {self.PREFIX}_stage_duration_seconds summary"]
+        stages = {}
+        for span in self.spans:
+            key = (span["name"], span["labels"].get("broker", ""))
+            total, count = stages.get(key, (0.0, 0))
+            stages[key] = (total + span["seconds"], count + 1)
+        for (name, broker), (total, count) in sorted(stages.items()):
+            labels = self._labels({"stage": name, "broker": broker} if broker else {"stage": name})
+            lines.append(f"{self.PREFIX}_stage_duration_seconds_sum{labels} {total:.6f}")
+            lines.append(f"{self.PREFIX}_stage_duration_seconds_count{labels} {count}")
+
+        names = sorted({name for name, _ in self.counters})
+        for name in names:
+            lines.append(f"# TYPE {self.PREFIX}_{name}_total counter")
+            for (n, labels), value in sorted(self.counters.items()):
+                if n == name:
+                    lines.append(f"{self.PREFIX}_{name}_total{self._labels(dict(labels))} {value:g}")
+
+        # 先写临时文件再改名，采集方不会读到写了一半的文件
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+    def print_summary(self, limit: int = 8):
+        """打印耗时最多的阶段与主要计数"""
+        stages = self.summary()
+        if not stages:
+            return
+        print("\n⏱ 阶段耗时:")
+        for name, total, count in stages[:limit]:
+            print(f"   {name:<16} {total:>8.2f}s  ×{count}")
+        counters = {}
+        for (name, _), value in self.counters.items():
+            counters[name] = counters.get(name, 0) + value
+        if counters:
+            print("   " + ", ".join(f"{name}={value:g}" for name, value in sorted(counters.items())))
+
+    @staticmethod
+    def _labels(labels: dict) -> str:
+        if not labels:
+            return ""
+
+        def escape(value) -> str:
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in sorted(labels.items())) + "}"
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+席位 × 品种持仓矩阵
+把清理后的品种汇总数据（每个 (席位, 品种) 一行）展开为 NumPy 矩阵：带符号的净持仓与净变化，
+席位与品种各有整数索引。跨席位查询（各席位前 k 个品种、某品种净空的席位、品种一致性、席位相似度）
+都是整块数组运算，不再逐席位筛选长表
+
+使用方法:
+    python3 position_matrix.py --variety 螺纹钢 --side short       # 最新交易日螺纹钢净空的席位
+    python3 position_matrix.py --similar 摩根大通 --top 5            # 与摩根大通持仓最相似的席位
+    python3 position_matrix.py --compare 摩根大通,中信期货            # 两个席位的余弦相似度
+    python3 position_matrix.py --consensus --top 20
+
+命令行查询直接读取数据库的行元组，只需要 NumPy；pandas 在 from_frame、from_stats 与 consensus 中才导入
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from position_store import PositionStore
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class PositionMatrix:
+    """席位 × 品种矩阵；没有记录的格子净持仓与净变化为 NaN、方向为 0、行号为 -1"""
+
+    LONG = 1
+    SHORT = -1
+    SIDES = {'多': LONG, '空': SHORT}
+
+    def __init__(self, seats: list, varieties: list, net: np.ndarray, change: np.ndarray,
+                 side: np.ndarray, order: np.ndarray):
+        self.seats = list(seats)
+        self.varieties = list(varieties)
+        self.seat_index = {seat: i for i, seat in enumerate(self.seats)}
+        self.variety_index = {variety: j for j, variety in enumerate(self.varieties)}
+        self.net = net  # float64，净多为正、净空为负
+        self.change = change  # float64，按净方向换算：正数表示向多头方向变化
+        self.side = side  # int8，1 净多、-1 净空、0 没有记录或没有方向
+        self.order = order  # int64，原表中的行号；排序并列时按页面顺序，没有记录为 -1
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, seats: list = None) -> "PositionMatrix":
+        """由品种汇总数据构建；seats 指定行的顺序与范围（不在其中的席位忽略），默认按出现顺序。
+        同一 (席位, 品种) 出现多次时保留第一行"""
+        import pandas as pd
+        if seats is None:
+            seats = pd.unique(df['席位'].astype(object)).tolist() if not df.empty else []
+        seat_codes = pd.Index(seats).get_indexer(df['席位'].astype(object))
+        variety_codes, varieties = pd.factorize(df['品种'].astype(object))
+        side = df['净方向'].astype(object).map(cls.SIDES).fillna(0).to_numpy(dtype=np.int8)
+        return cls._build(seats, [str(v) for v in varieties], seat_codes, variety_codes, side,
+                          df['净持仓'].to_numpy(dtype=np.float64, na_value=np.nan) * side,
+                          df['净变化'].to_numpy(dtype=np.float64, na_value=np.nan) * side)
+
+    @classmethod
+    def from_stats(cls, df: pd.DataFrame, net: str = '净头寸', change: str = 'N日变化') -> "PositionMatrix":
+        """由带符号的净头寸与变化列构建（如 PositionAnalytics.seat_stats 的结果）。
+        净头寸大于 0 为净多、小于 0 为净空；为 0 的格子没有方向，但仍算有记录的持仓席位"""
+        import pandas as pd
+        seat_codes, seats = pd.factorize(df['席位'].astype(object))
+        variety_codes, varieties = pd.factorize(df['品种'].astype(object))
+        net_values = df[net].to_numpy(dtype=np.float64)
+        side = np.sign(np.nan_to_num(net_values)).astype(np.int8)
+        return cls._build(list(seats), [str(v) for v in varieties], seat_codes, variety_codes, side,
+                          net_values, df[change].to_numpy(dtype=np.float64))
+
+    @classmethod
+    def from_rows(cls, rows: list, seats: list = None) -> "PositionMatrix":
+        """由 (席位, 品种, 净方向, 净持仓, 净变化) 元组构建，规则与 from_frame 相同，不需要 pandas"""
+        seat_index = {} if seats is None else {seat: i for i, seat in enumerate(seats)}
+        variety_index = {}
+        seat_codes = np.empty(len(rows), dtype=np.int64)
+        variety_codes = np.empty(len(rows), dtype=np.int64)
+        for k, (seat, variety, *_) in enumerate(rows):
+            if seats is None:
+                seat_index.setdefault(seat, len(seat_index))
+            seat_codes[k] = seat_index.get(seat, -1)
+            variety_codes[k] = variety_index.setdefault(variety, len(variety_index))
+        side = np.array([cls.SIDES.get(r[2], 0) for r in rows], dtype=np.int8)
+        net = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+        change = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64)
+        return cls._build(list(seat_index), list(variety_index), seat_codes, variety_codes, side,
+                          net * side, change * side)
+
+    @classmethod
+    def _build(cls, seats: list, varieties: list, seat_codes, variety_codes, side, net, change):
+        """按行的席位、品种编号填充矩阵，net 与 change 已按方向带符号；编号为 -1 的行忽略，同一格子保留第一行"""
+        shape = (len(seats), len(varieties))
+        rows = np.flatnonzero(seat_codes >= 0)
+        cells = seat_codes[rows].astype(np.int64) * shape[1] + variety_codes[rows]
+        cells, first = np.unique(cells, return_index=True)
+        rows = rows[first]
+
+        side_matrix = np.zeros(shape, dtype=np.int8)
+        side_matrix.flat[cells] = side[rows]
+        net_matrix = np.full(shape, np.nan)
+        net_matrix.flat[cells] = net[rows]
+        change_matrix = np.full(shape, np.nan)
+        change_matrix.flat[cells] = change[rows]
+        order = np.full(shape, -1, dtype=np.int64)
+        order.flat[cells] = rows
+        return cls(seats, varieties, net_matrix, change_matrix, side_matrix, order)
+
+    def counts(self) -> tuple:
+        """各席位的 (持仓品种数, 净多品种数, 净空品种数)"""
+        return ((self.order >= 0).sum(axis=1), (self.side == self.LONG).sum(axis=1),
+                (self.side == self.SHORT).sum(axis=1))
+
+    def top_k(self, k: int, side: int = None, axis: int = 1) -> np.ndarray:
+        """axis=1 时每个席位取净持仓最大的 k 个品种，axis=0 时每个品种取 k 个席位，返回索引矩阵（不足 k 个以 -1 补齐）。
+        side 为 LONG/SHORT 时只在该方向中取；按净持仓绝对值降序，并列时按原表顺序，净持仓为空的不参与"""
+        net, sides, order = (self.net, self.side, self.order) if axis == 1 else (
+            self.net.T, self.side.T, self.order.T)
+        valid = ~np.isnan(net)
+        if side is not None:
+            valid &= sides == side
+        rows, cols = np.nonzero(valid)
+        # 一次排序完成所有行：行号为第一关键字，其次 |净持仓| 降序、原表顺序
+        keys = np.lexsort((order[rows, cols], -np.abs(net[rows, cols]), rows))
+        rows, cols = rows[keys], cols[keys]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < k
+        result = np.full((net.shape[0], k), -1, dtype=np.int64)
+        result[rows[keep], rank[keep]] = cols[keep]
+        return result
+
+    def seats_in(self, variety: str, side: int = None) -> list:
+        """某品种的持仓席位 [(席位, 带符号净持仓)]，按净持仓绝对值降序；side 可只取净多或净空"""
+        j = self.variety_index.get(variety)
+        if j is None:
+            return []
+        top = self.top_k(len(self.seats), side, axis=0)[j]
+        return [(self.seats[i], int(self.net[i, j])) for i in top[top >= 0]]
+
+    def consensus(self, by: str = 'net') -> pd.DataFrame:
+        """各品种的跨席位一致性，参与席位多且方向一致的排在前面。
+        by='net' 时一致度为 (净多席位 - 净空席位) / 持仓席位数；by='change' 时按净变化的方向，
+        为 (增多席位 - 增空席位) / 持仓席位数（PositionAnalytics 以 N 日变化构建矩阵后使用）。
+        持仓席位数为有记录的席位数，包括没有方向（from_stats 中净头寸为 0）的席位"""
+        if by not in ('net', 'change'):
+            raise ValueError(f"by 只能是 'net' 或 'change'，收到 {by!r}")
+        import pandas as pd
+        held = (self.order >= 0).sum(axis=0)
+        long_seats = (self.side == self.LONG).sum(axis=0)
+        short_seats = (self.side == self.SHORT).sum(axis=0)
+        rising = (self.change > 0).sum(axis=0)
+        falling = (self.change < 0).sum(axis=0)
+        lead = long_seats - short_seats if by == 'net' else rising - falling
+        with np.errstate(divide='ignore', invalid='ignore'):
+            agreement = np.where(held > 0, lead / held, 0.0)
+        result = pd.DataFrame({
+            '品种': self.varieties,
+            '席位数': held,
+            '净多席位': long_seats,
+            '净空席位': short_seats,
+            '增多席位': rising,
+            '增空席位': falling,
+            '一致度': np.round(agreement, 2),
+            '净头寸合计': np.nansum(self.net, axis=0).astype(np.int64),
+            '净变化合计': np.nansum(self.change, axis=0).astype(np.int64),
+        })
+        strength = np.abs(result['一致度'].to_numpy()) * held
+        return result.iloc[np.argsort(-strength, kind='stable')].reset_index(drop=True)
+
+    def similarity(self) -> np.ndarray:
+        """席位之间净持仓向量的余弦相似度矩阵；没有持仓的席位与任何席位的相似度为 0"""
+        vectors = np.nan_to_num(self.net)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = np.inf
+        unit = vectors / norms[:, None]
+        return unit @ unit.T
+
+    def compare(self, a: str, b: str) -> float:
+        """两个席位的余弦相似度"""
+        vectors = np.nan_to_num(self.net[[self.seat_index[a], self.seat_index[b]]])
+        norms = np.linalg.norm(vectors, axis=1)
+        if not norms.all():
+            return 0.0
+        return float(vectors[0] @ vectors[1] / (norms[0] * norms[1]))
+
+    def most_similar(self, seat: str, k: int = 5) -> list:
+        """与某席位持仓最相似的 k 个席位 [(席位, 相似度)]"""
+        i = self.seat_index[seat]
+        vectors = np.nan_to_num(self.net)
+        norms = np.linalg.norm(vectors, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = vectors @ vectors[i] / (norms * norms[i])
+        scores = np.nan_to_num(scores)
+        scores[i] = -np.inf
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [(self.seats[t], float(scores[t])) for t in top if np.isfinite(scores[t])]
+
+
+def main(argv: list = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="席位 × 品种持仓矩阵查询")
+    parser.add_argument("--date", help="交易日期 YYYY-MM-DD，默认数据库中最新日期")
+    parser.add_argument("--variety", help="列出该品种的持仓席位")
+    parser.add_argument("--side", choices=["long", "short"], help="与 --variety 一起使用，只列出净多或净空的席位")
+    parser.add_argument("--similar", metavar="SEAT", help="与该席位持仓最相似的席位")
+    parser.add_argument("--compare", metavar="A,B", help="两个席位的余弦相似度")
+    parser.add_argument("--consensus", action="store_true", help="各品种的跨席位方向一致性")
+    parser.add_argument("--top", type=int, default=10, help="显示的行数")
+    parser.add_argument("--db", default=PositionStore.DB_FILE, help="数据库文件")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"❌ 数据库不存在: {args.db}")
+        return
+    with PositionStore(args.db, readonly=True) as store:
+        trade_date = args.date or store.latest_date()
+        rows = store.snapshot_rows(trade_date, ["席位", "品种", "净方向", "净持仓", "净变化"])
+    if not rows:
+        print("⚠️ 没有匹配的数据")
+        return
+    matrix = PositionMatrix.from_rows(rows)
+    print(f"📅 {trade_date}: {len(matrix.seats)} 个席位 × {len(matrix.varieties)} 个品种")
+
+    if args.variety:
+        side = {"long": PositionMatrix.LONG, "short": PositionMatrix.SHORT}.get(args.side)
+        seats = matrix.seats_in(args.variety, side)
+        print(f"\n{args.variety}: {len(seats)} 个席位")
+        for seat, net in seats[:args.top]:
+            print(f"   {seat}: {net:+,}")
+    if args.similar:
+        if args.similar not in matrix.seat_index:
+            print(f"❌ 没有该席位的数据: {args.similar}")
+            return
+        print(f"\n与 {args.similar} 最相似的席位:")
+        for seat, score in matrix.most_similar(args.similar, args.top):
+            print(f"   {seat}: {score:+.3f}")
+    if args.compare:
+        a, b = [s.strip() for s in args.compare.split(",")]
+        missing = [s for s in (a, b) if s not in matrix.seat_index]
+        if missing:
+            print(f"❌ 没有该席位的数据: {', '.join(missing)}")
+            return
+        print(f"\n{a} 与 {b} 的余弦相似度: {matrix.compare(a, b):+.3f}")
+    if args.consensus:
+        print("\n🤝 品种一致性:")
+        print(matrix.consensus().head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
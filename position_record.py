@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+持仓记录规整
+接口 JSON 与页面表格是同一份持仓的两种形式。两者按声明式字段表规整为同一种合约级记录表（列见 COLUMNS）：
+页面表格原文只在这里按列解析一次（parse_table，按列的正则提取）；接口数据项逐项规整为
+PositionRecord（__slots__，字段均为 Python 整数或字符串），再按列转为同样的表（frame）。
+合并时按 (席位, 合约) 去重，两种来源都有的合约以结构化的接口记录为准（merge）
+
+接口字段（持仓接口 data 中的每一项）:
+    品种 variety / varietyName / name    合约 code / contract
+    多头 buy / long (buy_chge / buyChg)  空头 ss / sell / short (ss_chge / sellChg)
+    净持仓 net (net_chge / netChg)，带符号：净多为正、净空为负；缺失时由多空持仓相减得到
+页面字段（POSITION_TABLE_JS 按表头还原的记录）:
+    品种 在同一席位内沿行向下传递   合约 "rb2501"   总净持仓 "净多123\\n(增45)"   多头持仓 / 空头持仓 "678\\n(+12)"
+"""
+
+import re
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+
+class PositionRecord:
+    """一个席位在一个合约（没有合约代码时为一个品种）上的持仓。
+    净方向为 '多'/'空'，净持仓为绝对值，净变化为净持仓绝对值相对前一日的增减；多空持仓及变化缺失时为 None"""
+
+    __slots__ = ('broker', 'variety', 'contract', 'direction', 'net', 'net_change',
+                 'long', 'long_change', 'short', 'short_change', 'source')
+
+    def __init__(self, broker: str, variety: str, contract: str, direction: str, net: int, net_change: int,
+                 long: int = None, long_change: int = None, short: int = None, short_change: int = None,
+                 source: str = None):
+        self.broker = broker
+        self.variety = variety
+        self.contract = contract
+        self.direction = direction
+        self.net = net
+        self.net_change = net_change
+        self.long = long
+        self.long_change = long_change
+        self.short = short
+        self.short_change = short_change
+        self.source = source
+
+    def __eq__(self, other):
+        return isinstance(other, PositionRecord) and RecordNormalizer.values(self) == RecordNormalizer.values(other)
+
+    def __repr__(self):
+        return f"PositionRecord{RecordNormalizer.values(self)}"
+
+
+class RecordNormalizer:
+    """按字段表把页面表格按列解析为清理后的合约级 DataFrame，接口数据项规整为 PositionRecord 后按列转为同样的表"""
+
+    API = "api"
+    DOM = "dom"
+    DIRECTIONS = ['多', '空']
+
+    # 记录字段与清理后 DataFrame 列名的对应，顺序即 PositionRecord 构造参数的顺序
+    COLUMNS = {
+        'broker': '席位', 'variety': '品种', 'contract': '合约', 'direction': '净方向',
+        'net': '净持仓', 'net_change': '净变化', 'long': '多头持仓', 'long_change': '多头变化',
+        'short': '空头持仓', 'short_change': '空头变化', 'source': '来源',
+    }
+    CATEGORY_FIELDS = ('broker', 'variety', 'contract', 'source')
+    INT_FIELDS = ('net', 'net_change')
+    NULLABLE_INT_FIELDS = ('long', 'long_change', 'short', 'short_change')
+
+    # 接口字段：记录字段 -> 依次尝试的键，取第一个非空值（数量为 0 时不再改用后面的键）
+    API_SCHEMA = {
+        'variety': ('variety', 'varietyName', 'name'),
+        'contract': ('code', 'contract'),
+        'long': ('buy', 'long'),
+        'long_change': ('buy_chge', 'buyChg'),
+        'short': ('ss', 'sell', 'short'),
+        'short_change': ('ss_chge', 'sellChg'),
+        'net': ('net',),
+        'net_change': ('net_chge', 'netChg'),
+    }
+    # 页面字段：表头 -> 解析出的记录字段；各表头解析结果依次拼接即为记录中品种之后的字段
+    DOM_SCHEMA = {
+        '合约': ('contract',),
+        '总净持仓': ('direction', 'net', 'net_change'),
+        '多头持仓': ('long', 'long_change'),
+        '空头持仓': ('short', 'short_change'),
+    }
+    # 品种分类行：这几列都没有值，品种列给出后续行所属品种
+    CATEGORY_HEADERS = ('总净持仓', '合约', '多头持仓')
+
+    # 单元格文本解析规则，例如 "净多123\n(增45)"、"678\n(+12)"
+    NET_PATTERN = re.compile(r'净(多|空)(\d+)\s*\n?\(?([增减]少?)(\d+)\)?')
+    POSITION_PATTERN = re.compile(r'^(\d+)(?:\s*\n?\(([+-]?\d+)\))?')
+    CONTRACT_PATTERN = re.compile(r'^([a-zA-Z]+\d+)')
+
+    values = attrgetter(*COLUMNS)
+
+    def __init__(self):
+        # 预先编译字段映射：每个字段一个取值函数，规整时不再查字段表
+        self._getters = {name: attrgetter(name) for name in self.COLUMNS}
+        self._api_getters = [(name, self._first_of(keys)) for name, keys in self.API_SCHEMA.items()]
+        parsed = [name for names in self.DOM_SCHEMA.values() for name in names]
+        if parsed != list(self.COLUMNS)[2:-1]:
+            raise ValueError("DOM_SCHEMA 的字段顺序须与 PositionRecord 一致")
+
+    @staticmethod
+    def _first_of(keys: tuple):
+        def get(item):
+            for key in keys:
+                value = item.get(key)
+                if value is not None and value != '':
+                    return value
+            return None
+        return get
+
+    def from_api(self, broker: str, item: dict, direction: str = None):
+        """接口数据项规整为记录；direction 为数据按净方向分组时的组名。缺少品种或净持仓时返回 None"""
+        fields = {name: get(item) for name, get in self._api_getters}
+        variety = fields['variety']
+        if not variety:
+            return None
+        long, long_change = self._to_int(fields['long']), self._to_int(fields['long_change'])
+        short, short_change = self._to_int(fields['short']), self._to_int(fields['short_change'])
+        net, net_change = self._to_int(fields['net']), self._to_int(fields['net_change'])
+        if net is None:
+            if long is None or short is None:
+                return None
+            net = long - short
+        if net_change is None:
+            net_change = (long_change - short_change
+                          if long_change is not None and short_change is not None else 0)
+        if net == 0 and direction in self.DIRECTIONS:
+            side = direction
+        else:
+            side = '多' if net >= 0 else '空'
+        # 接口的净变化是带符号净持仓之差，换算为与页面 "增/减" 相同的绝对值之差
+        return PositionRecord(broker, str(variety), self._parse_contract(fields['contract']),
+                              side, abs(net), abs(net) - abs(net - net_change),
+                              long, long_change, short, short_change, self.API)
+
+    def parse_table(self, df) -> pd.DataFrame:
+        """页面表格原文列式解析为合约级记录表，列与 frame 相同：品种在同一席位内沿行向下传递，
+        同一 (席位, 品种, 合约) 只保留第一条；无法识别合约代码的行记为空合约"""
+        def column(name):
+            # 缺失的列按空字符串处理，与逐行 row.get(name, '') 的语义保持一致
+            return df[name] if name in df.columns else pd.Series('', index=df.index, dtype=object)
+
+        broker = column('席位')
+        variety = df['品种'] if '品种' in df.columns else pd.Series(None, index=df.index, dtype=object)
+        variety_text = variety.where(variety.isna(), variety.astype(str)).fillna('').astype(object)
+
+        # 分类行：净持仓、合约、多头持仓均为空，品种列给出后续行所属品种
+        is_category = np.logical_and.reduce([column(header).isna().to_numpy() for header in self.CATEGORY_HEADERS])
+        has_text = (variety_text.str.len() > 0) & ~variety_text.str.contains('建仓过程', regex=False)
+        has_text = has_text.to_numpy()
+
+        net = column('总净持仓').astype(str).str.extract(self.NET_PATTERN)
+        is_position = net[0].notna().to_numpy() & ~is_category
+
+        # 品种沿行向下传递：分类行与带品种文字的持仓行会更新当前品种，换席位时不再沿用上一席位的品种
+        short_text = (variety_text.str.len() < 10).to_numpy()
+        sets_variety = (is_category & has_text & short_text) | (is_position & has_text)
+        current_variety = variety_text.where(sets_variety).groupby(broker, sort=False, dropna=False).ffill()
+        keep = is_position & current_variety.notna().to_numpy()
+        keep &= (current_variety.str.len() > 0).to_numpy()
+
+        net = net[keep]
+        change_sign = np.where(net[2].str.contains('增', regex=False).to_numpy(), 1, -1).astype('int32')
+        parsed = {
+            '合约': [column('合约')[keep].astype(str).str.extract(self.CONTRACT_PATTERN)[0]],
+            '总净持仓': [net[0], net[1].astype('int32').to_numpy(), net[3].astype('int32').to_numpy() * change_sign],
+            '多头持仓': self._parse_position_column(column('多头持仓')[keep]),
+            '空头持仓': self._parse_position_column(column('空头持仓')[keep]),
+        }
+        data = {'席位': pd.Categorical(broker[keep].to_numpy()),
+                '品种': pd.Categorical(current_variety[keep].to_numpy())}
+        for header, names in self.DOM_SCHEMA.items():
+            for name, values in zip(names, parsed[header]):
+                if name in self.CATEGORY_FIELDS or name == 'direction':
+                    categories = self.DIRECTIONS if name == 'direction' else None
+                    values = pd.Categorical(np.asarray(values, dtype=object), categories=categories)
+                data[self.COLUMNS[name]] = values
+        data['来源'] = pd.Categorical([self.DOM] * int(keep.sum()))
+        df_result = pd.DataFrame(data)
+        return df_result.drop_duplicates(subset=['席位', '品种', '合约'], ignore_index=True)
+
+    def from_table(self, df) -> list:
+        """清理后的合约级表格（原始记录文件）还原为记录；CSV 读入的数字为文本，按字段类型转换"""
+        frame = df.reindex(columns=list(self.COLUMNS.values()))
+        for name in self.INT_FIELDS + self.NULLABLE_INT_FIELDS:
+            column = self.COLUMNS[name]
+            frame[column] = np.trunc(pd.to_numeric(frame[column], errors='coerce')).astype('Int64')
+        valid = frame['净方向'].isin(self.DIRECTIONS) & frame['净持仓'].notna() & frame['净变化'].notna()
+        return self.records(frame[valid.to_numpy()])
+
+    def records(self, frame) -> list:
+        """合约级记录表逐行转为 PositionRecord，缺失值为 None"""
+        values = frame.reindex(columns=list(self.COLUMNS.values())).astype(object)
+        values = values.where(values.notna(), None)
+        return [PositionRecord(*row) for row in values.itertuples(index=False, name=None)]
+
+    def merge(self, dom, api, brokers: list):
+        """合并两种来源的合约级记录表：同一席位的同一合约（没有合约代码时为品种）以接口记录为准。
+        按 brokers 的顺序输出，席位内按页面顺序，页面行被对应的接口记录替换，页面上没有的接口记录排在后面"""
+        if api.empty:
+            return dom
+        if dom.empty:
+            return api
+        rank = {broker: i for i, broker in enumerate(brokers)}
+        dom_keys, api_keys = self._merge_keys(dom), self._merge_keys(api)
+        # 接口记录占用对应页面行（同键的第一行）的位置，没有对应页面行的排在该席位末尾
+        first = pd.Series(np.arange(len(dom)), index=dom_keys)
+        slot = first[~first.index.duplicated()].reindex(api_keys).to_numpy()
+        matched = ~np.isnan(slot)
+        kept = ~dom_keys.isin(api_keys)
+        order = pd.DataFrame({
+            'rank': np.concatenate([dom['席位'][kept].map(rank).to_numpy(dtype=float),
+                                    api['席位'].map(rank).to_numpy(dtype=float)]),
+            'tail': np.concatenate([np.zeros(int(kept.sum())), (~matched).astype(float)]),
+            'position': np.concatenate([np.flatnonzero(kept), np.where(matched, slot, np.arange(len(api)))]),
+        })
+        merged = pd.concat([dom[kept], api], ignore_index=True)
+        order = order[order['rank'].notna()].sort_values(['rank', 'tail', 'position'], kind='stable')
+        merged = merged.take(order.index.to_numpy()).reset_index(drop=True)
+        for name in self.CATEGORY_FIELDS + ('direction',):
+            column = self.COLUMNS[name]
+            categories = self.DIRECTIONS if name == 'direction' else None
+            merged[column] = pd.Categorical(merged[column].astype(object), categories=categories)
+        return merged
+
+    @staticmethod
+    def _merge_keys(frame):
+        """合并键 (席位, 合约)；没有合约代码时用品种，加前缀避免与合约代码混淆"""
+        contract = frame['合约'].astype(object)
+        variety = '\x00' + frame['品种'].astype(str)
+        return pd.MultiIndex.from_arrays([frame['席位'].astype(object).to_numpy(),
+                                          contract.where(contract.notna(), variety).to_numpy()])
+
+    def frame(self, records: list):
+        """记录列表按列转为合约级 DataFrame：字符串列为类别，净持仓等为 int32，多空持仓有缺失时为可空的 Int32"""
+        data = {}
+        for name, column in self.COLUMNS.items():
+            values = list(map(self._getters[name], records))
+            if name in self.CATEGORY_FIELDS or name == 'direction':
+                values = np.array(values, dtype=object)
+                categories = self.DIRECTIONS if name == 'direction' else None
+                data[column] = pd.Categorical(values, categories=categories)
+            elif name in self.NULLABLE_INT_FIELDS and None in values:
+                data[column] = pd.array(values, dtype='Int32')
+            else:
+                data[column] = np.array(values, dtype='int32')
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _missing(value) -> bool:
+        return value is None or value != value  # NaN
+
+    @staticmethod
+    def _to_int(value):
+        if value is None or value != value:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            try:
+                return int(float(value))
+            except (TypeError, ValueError):
+                return None
+
+    def _parse_contract(self, text):
+        """提取合约代码，如 "rb2501"；无法识别时为 None"""
+        if self._missing(text):
+            return None
+        match = self.CONTRACT_PATTERN.match(str(text))
+        return match.group(1) if match else None
+
+    def _parse_position_column(self, series) -> tuple:
+        """列式解析 "678\\n(+12)"，返回 (持仓, 变化) 两个数组；没有括号变化值时变化为 0，无法识别时均为空"""
+        parts = series.astype(str).str.extract(self.POSITION_PATTERN)
+        position = parts[0]
+        change = parts[1].where(parts[1].notna() | position.isna(), '0')
+        return self._to_int_array(position), self._to_int_array(change)
+
+    @staticmethod
+    def _to_int_array(series):
+        """数字文本转为 int32 数组；存在空值时使用可空的 Int32"""
+        series = series.astype(object)
+        if series.isna().any():
+            return pd.array(pd.to_numeric(series, errors='coerce'), dtype='Int32')
+        return series.map(int).astype('int32').to_numpy()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+持仓历史数据库
+以 SQLite 按交易日保存每次清理后的持仓数据，重复写入时替换所写席位当天的全部数据（已平仓的品种、合约不会残留）。
+pandas 在返回 DataFrame 的方法中才导入，命令行查询等只读元组的入口启动更快
+
+使用方法:
+    python3 position_store.py 摩根大通 螺纹钢 --days 60
+    python3 position_store.py 摩根大通 螺纹钢 --days 60 --contracts
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class PositionStore:
+    """持仓历史数据库"""
+
+    DB_FILE = "broker_positions.db"
+    TABLE = "positions"
+    CONTRACT_TABLE = "contracts"
+    KEY_COLUMNS = ["日期", "席位", "品种"]
+    CONTRACT_KEY_COLUMNS = ["日期", "席位", "合约"]
+    VALUE_COLUMNS = ["净方向", "净持仓", "净变化", "多头持仓", "多头变化", "空头持仓", "空头变化"]
+
+    SCHEMA = f'''
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            "日期" TEXT NOT NULL,
+            "席位" TEXT NOT NULL,
+            "品种" TEXT NOT NULL,
+            "净方向" TEXT,
+            "净持仓" INTEGER,
+            "净变化" INTEGER,
+            "多头持仓" INTEGER,
+            "多头变化" INTEGER,
+            "空头持仓" INTEGER,
+            "空头变化" INTEGER,
+            PRIMARY KEY ("日期", "席位", "品种")
+        );
+        CREATE INDEX IF NOT EXISTS idx_{TABLE}_seat_variety_date
+            ON {TABLE} ("席位", "品种", "日期");
+        CREATE INDEX IF NOT EXISTS idx_{TABLE}_variety_date
+            ON {TABLE} ("品种", "日期");
+        CREATE TABLE IF NOT EXISTS {CONTRACT_TABLE} (
+            "日期" TEXT NOT NULL,
+            "席位" TEXT NOT NULL,
+            "合约" TEXT NOT NULL,
+            "品种" TEXT NOT NULL,
+            "净方向" TEXT,
+            "净持仓" INTEGER,
+            "净变化" INTEGER,
+            "多头持仓" INTEGER,
+            "多头变化" INTEGER,
+            "空头持仓" INTEGER,
+            "空头变化" INTEGER,
+            PRIMARY KEY ("日期", "席位", "合约")
+        );
+        CREATE INDEX IF NOT EXISTS idx_{CONTRACT_TABLE}_seat_variety_date
+            ON {CONTRACT_TABLE} ("席位", "品种", "日期");
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta VALUES ('revision', 0);
+    '''
+
+    def __init__(self, path: str = None, readonly: bool = False):
+        self.path = path or self.DB_FILE
+        if readonly:
+            # 只读打开已有的数据库：不设置日志模式、不建表，多个进程同时读取时不会争用写锁
+            self.conn = sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True)
+            return
+        self.conn = sqlite3.connect(self.path)
+        # WAL 模式下写入不阻塞报告生成等读操作
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert(self, df: pd.DataFrame, trade_date: str) -> int:
+        """写入某交易日的清理后数据，数据中各席位当天原有的品种先被删除，返回写入行数"""
+        return self._upsert(self.TABLE, self.KEY_COLUMNS, self.VALUE_COLUMNS, df, trade_date)
+
+    def upsert_contracts(self, df: pd.DataFrame, trade_date: str) -> int:
+        """写入某交易日的合约级数据，数据中各席位当天原有的合约先被删除；没有合约代码的行不写入"""
+        if "合约" in df.columns:
+            df = df[df["合约"].notna()]
+        return self._upsert(self.CONTRACT_TABLE, self.CONTRACT_KEY_COLUMNS,
+                            ["品种"] + self.VALUE_COLUMNS, df, trade_date)
+
+    def _upsert(self, table: str, keys: list, values: list, df: pd.DataFrame, trade_date: str) -> int:
+        if df.empty:
+            return 0
+        columns = keys + values
+        frame = df.reindex(columns=columns[1:]).astype(object)
+        frame = frame.where(frame.notna(), None)
+        rows = [(trade_date, *row) for row in frame.itertuples(index=False, name=None)]
+        seats = [(trade_date, seat) for seat in dict.fromkeys(frame["席位"])]
+
+        names = ", ".join(f'"{c}"' for c in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in values)
+        key_names = ", ".join(f'"{c}"' for c in keys)
+        # 同一事务内先删除这些席位当天的旧行再写入：重新抓取后消失的品种、合约不会留在数据库中
+        with self.conn:
+            self.conn.executemany(f'DELETE FROM {table} WHERE "日期" = ? AND "席位" = ?', seats)
+            self.conn.executemany(
+                f"INSERT INTO {table} ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({key_names}) DO UPDATE SET {updates}",
+                rows,
+            )
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        return len(rows)
+
+    def query(self, broker: str = None, variety: str = None, start: str = None,
+              end: str = None, days: int = None) -> pd.DataFrame:
+        """按席位、品种和日期范围查询，days 表示截至 end（默认最新日期）的自然日天数"""
+        import pandas as pd
+        if days is not None:
+            end = end or self.latest_date()
+            if end is None:
+                return pd.DataFrame(columns=self.KEY_COLUMNS + self.VALUE_COLUMNS)
+            start = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+
+        conditions = []
+        params = []
+        for column, value, op in [("席位", broker, "="), ("品种", variety, "="),
+                                  ("日期", start, ">="), ("日期", end, "<=")]:
+            if value is not None:
+                conditions.append(f'"{column}" {op} ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f'SELECT * FROM {self.TABLE} {where} ORDER BY "日期", "席位", "品种"'
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def contracts(self, broker: str = None, variety: str = None, start: str = None,
+                  end: str = None) -> pd.DataFrame:
+        """按席位、品种和日期范围查询合约级数据"""
+        import pandas as pd
+        conditions = []
+        params = []
+        for column, value, op in [("席位", broker, "="), ("品种", variety, "="),
+                                  ("日期", start, ">="), ("日期", end, "<=")]:
+            if value is not None:
+                conditions.append(f'"{column}" {op} ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f'SELECT * FROM {self.CONTRACT_TABLE} {where} ORDER BY "日期", "席位", "品种", "合约"'
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def history(self, start: str = None, end: str = None, brokers: list = None,
+                columns: list = None) -> pd.DataFrame:
+        """读取日期范围内多个席位的数据，按 (席位, 品种, 日期) 排序，便于逐组做时间序列计算"""
+        import pandas as pd
+        columns = columns or self.KEY_COLUMNS + self.VALUE_COLUMNS
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append('"日期" >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('"日期" <= ?')
+            params.append(end)
+        # 席位过多时超出 SQLite 参数上限，改为读出后再过滤
+        in_sql = brokers is not None and len(brokers) <= 900
+        if in_sql:
+            conditions.append(f'"席位" IN ({", ".join("?" for _ in brokers)})')
+            params.extend(brokers)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        names = ", ".join(f'"{c}"' for c in columns)
+        sql = f'SELECT {names} FROM {self.TABLE} {where} ORDER BY "席位", "品种", "日期"'
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        if brokers is not None and not in_sql:
+            df = df[df["席位"].isin(set(brokers))].reset_index(drop=True)
+        return df
+
+    def revision(self) -> int:
+        """写入计数，每次 upsert 加一，用于判断基于历史数据的缓存是否过期"""
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def snapshot(self, trade_date: str = None) -> pd.DataFrame:
+        """读取某交易日（默认最新）的全部数据"""
+        trade_date = trade_date or self.latest_date()
+        if trade_date is None:
+            import pandas as pd
+            return pd.DataFrame(columns=self.KEY_COLUMNS + self.VALUE_COLUMNS)
+        return self.query(start=trade_date, end=trade_date)
+
+    def snapshot_rows(self, trade_date: str = None, columns: list = None) -> list:
+        """与 snapshot 相同的行，以元组列表返回，不需要 pandas；没有数据时返回空列表"""
+        trade_date = trade_date or self.latest_date()
+        columns = columns or self.KEY_COLUMNS + self.VALUE_COLUMNS
+        names = ", ".join(f'"{c}"' for c in columns)
+        sql = f'SELECT {names} FROM {self.TABLE} WHERE "日期" = ? ORDER BY "日期", "席位", "品种"'
+        return self.conn.execute(sql, (trade_date,)).fetchall()
+
+    def dates(self) -> list:
+        """已保存的交易日列表"""
+        rows = self.conn.execute(f'SELECT DISTINCT "日期" FROM {self.TABLE} ORDER BY "日期"')
+        return [r[0] for r in rows]
+
+    def latest_date(self):
+        return self.conn.execute(f'SELECT MAX("日期") FROM {self.TABLE}').fetchone()[0]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="查询持仓历史数据库")
+    parser.add_argument("broker", nargs="?", help="席位，如 摩根大通")
+    parser.add_argument("variety", nargs="?", help="品种，如 螺纹钢")
+    parser.add_argument("--days", type=int, help="最近 N 个自然日")
+    parser.add_argument("--start", help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD")
+    parser.add_argument("--contracts", action="store_true", help="查询合约级数据")
+    parser.add_argument("--db", default=PositionStore.DB_FILE, help="数据库文件")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ 数据库不存在: {args.db}")
+        return
+    with PositionStore(args.db, readonly=True) as store:
+        if args.contracts:
+            end = args.end
+            start = args.start
+            if args.days is not None:
+                end = end or store.latest_date()
+                if end:
+                    start = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=args.days)).strftime("%Y-%m-%d")
+            df = store.contracts(args.broker, args.variety, start, end)
+        else:
+            df = store.query(args.broker, args.variety, args.start, args.end, args.days)
+    if df.empty:
+        print("⚠️ 没有匹配的数据")
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
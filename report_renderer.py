@@ -0,0 +1,771 @@
+#!/usr/bin/env python3
+"""
+持仓报告 HTML 渲染
+按 席位 一次分组，逐段生成 HTML 并直接写入文件，内存占用不随报告规模增长。
+传入 FragmentCache 时按席位与品种行的内容哈希复用上次渲染的片段，只重新渲染有变化的部分
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from html import escape
+
+import numpy as np
+import pandas as pd
+
+from position_matrix import PositionMatrix
+
+
+class ReportRenderer:
+    """持仓报告渲染器"""
+
+    HEAD = '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>期货公司持仓分析报告</title>
+    <style>
+        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+            background: linear-gradient(135deg, #0f0f1a 0%, #1a1a2e 50%, #16213e 100%);
+            color: #e0e0e0;
+            min-height: 100vh;
+            padding: 20px;
+        }}
+        .container {{ max-width: 1600px; margin: 0 auto; }}
+        h1 {{
+            text-align: center;
+            color: #00d4ff;
+            margin-bottom: 10px;
+            font-size: 2.2em;
+            text-shadow: 0 0 30px rgba(0, 212, 255, 0.6);
+        }}
+        .subtitle {{ text-align: center; color: #888; margin-bottom: 30px; }}
+        .section {{
+            background: rgba(255, 255, 255, 0.03);
+            border-radius: 15px;
+            padding: 20px;
+            margin-bottom: 20px;
+            border: 1px solid rgba(255, 255, 255, 0.08);
+        }}
+        .section-title {{
+            color: #00d4ff;
+            font-size: 1.4em;
+            margin-bottom: 15px;
+            padding-bottom: 10px;
+            border-bottom: 2px solid rgba(0, 212, 255, 0.3);
+        }}
+        .summary-cards {{
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(260px, 1fr));
+            gap: 15px;
+            margin-bottom: 25px;
+        }}
+        .summary-cards.many {{ max-height: 640px; overflow-y: auto; padding: 6px 4px; }}
+        .broker-card {{
+            background: rgba(255, 255, 255, 0.05);
+            border-radius: 12px;
+            padding: 20px;
+            text-align: center;
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            transition: transform 0.3s;
+        }}
+        .broker-card:hover {{ transform: translateY(-5px); }}
+        .broker-name {{ font-size: 1.3em; font-weight: bold; color: #00d4ff; margin-bottom: 15px; }}
+        .broker-stats {{ display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }}
+        .stat-item {{ padding: 8px; border-radius: 8px; background: rgba(0, 0, 0, 0.2); }}
+        .stat-value {{ font-size: 1.5em; font-weight: bold; }}
+        .stat-label {{ font-size: 0.8em; color: #888; }}
+        .long {{ color: #ff4757; }}
+        .short {{ color: #2ed573; }}
+        .tabs {{ display: flex; gap: 10px; margin-bottom: 20px; flex-wrap: wrap; max-height: 220px; overflow-y: auto; }}
+        .tab {{
+            padding: 12px 24px;
+            background: rgba(255, 255, 255, 0.05);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            border-radius: 10px;
+            cursor: pointer;
+            transition: all 0.3s;
+        }}
+        .tab:hover {{ background: rgba(0, 212, 255, 0.1); }}
+        .tab.active {{ background: rgba(0, 212, 255, 0.2); border-color: #00d4ff; color: #00d4ff; }}
+        .tab-content {{ display: none; }}
+        .tab-content.active {{ display: block; }}
+        table {{ width: 100%; border-collapse: collapse; }}
+        th, td {{ padding: 12px 10px; text-align: right; border-bottom: 1px solid rgba(255, 255, 255, 0.08); }}
+        th {{ background: rgba(0, 212, 255, 0.1); color: #00d4ff; font-weight: 600; position: sticky; top: 0; }}
+        td:first-child, th:first-child {{ text-align: left; }}
+        tr:hover {{ background: rgba(255, 255, 255, 0.03); }}
+        .positive {{ color: #ff4757; }}
+        .negative {{ color: #2ed573; }}
+        .table-container {{ max-height: 500px; overflow-y: auto; border-radius: 10px; }}
+        .comparison {{ display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }}
+        .compare-box {{ background: rgba(255, 255, 255, 0.02); border-radius: 10px; padding: 15px; }}
+        .compare-title {{ font-size: 1.1em; margin-bottom: 10px; padding-bottom: 8px; border-bottom: 1px solid rgba(255, 255, 255, 0.1); }}
+        .variety-tag {{
+            display: inline-block;
+            padding: 4px 10px;
+            margin: 3px;
+            border-radius: 15px;
+            font-size: 0.85em;
+        }}
+        .variety-tag.long {{ background: rgba(255, 71, 87, 0.2); color: #ff4757; }}
+        .variety-tag.short {{ background: rgba(46, 213, 115, 0.2); color: #2ed573; }}
+        @media (max-width: 1200px) {{ .comparison {{ grid-template-columns: 1fr; }} }}
+        @media (max-width: 768px) {{ .summary-cards {{ grid-template-columns: 1fr; }} }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🔥 期货公司持仓分析报告</h1>
+        <p class="subtitle">生成时间: {generated_at} | 数据来源: 交易可查</p>
+        
+        <div class="{summary_class}">
+'''
+
+    FOOT = '''        </div>
+        
+        <div style="text-align: center; color: #666; margin-top: 30px; padding: 20px;">
+            <p>⚠️ 风险提示：以上数据仅供参考，期货交易风险较大，请谨慎决策</p>
+        </div>
+    </div>
+    
+'''
+
+    SCRIPT = '''    <script>
+        // 席位名只出现在 data-broker 属性中，不拼进脚本
+        function showTab(tab) {
+            document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
+            document.querySelectorAll('.tab').forEach(el => el.classList.remove('active'));
+            document.getElementById('tab-' + tab.dataset.broker).classList.add('active');
+            tab.classList.add('active');
+        }
+        document.querySelectorAll('.tab').forEach(tab => tab.addEventListener('click', () => showTab(tab)));
+    </script>
+'''
+
+    END = '''</body>
+</html>
+'''
+
+    ROW = '''                            <tr>
+                                <td>{variety}</td>
+                                <td class="{net_class}">净{net_dir}</td>
+                                <td>{net_pos:,}</td>
+                                <td class="{net_chg_class}">{net_chg_sign}{net_chg:,}</td>
+                                <td>{long_pos:,}</td>
+                                <td class="{long_chg_class}">{long_chg_sign}{long_chg:,}</td>
+                                <td>{short_pos:,}</td>
+                                <td class="{short_chg_class}">{short_chg_sign}{short_chg:,}</td>
+                            </tr>
+'''
+
+    INT_COLUMNS = ['净持仓', '净变化', '多头持仓', '多头变化', '空头持仓', '空头变化']
+    TOP_N = 8  # 对比区每个席位展示的品种数
+    MANY_BROKERS = 12  # 超过该席位数时统计卡片区域改为滚动
+    CHUNK_SIZE = 1 << 16  # 写文件时的缓冲块大小
+    ANALYTICS_TOP = 20  # 多日分析各表展示的行数
+    Z_ALERT = 2.0  # 列为异常变化的 |Z| 下限
+
+    def __init__(self, brokers: list, generated_at: datetime = None, analytics: dict = None,
+                 fragments: "FragmentCache" = None):
+        self.brokers = list(brokers)
+        self.generated_at = generated_at or datetime.now()
+        self.analytics = analytics  # PositionAnalytics.compute() 的结果，为 None 时不输出多日分析
+        self.fragments = fragments  # 片段缓存，为 None 时全部重新渲染
+
+    def write(self, df: pd.DataFrame, path: str) -> int:
+        """把报告逐段写入文件，返回写入的字符数"""
+        written = 0
+        buffer = []
+        size = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for chunk in self.render(df):
+                buffer.append(chunk)
+                size += len(chunk)
+                if size >= self.CHUNK_SIZE:
+                    f.write(''.join(buffer))
+                    written += size
+                    buffer, size = [], 0
+            f.write(''.join(buffer))
+            written += size
+        return written
+
+    def render(self, df: pd.DataFrame):
+        """逐段生成报告 HTML"""
+        data = self._prepare(df)
+
+        # 席位较多时统计卡片区域限高滚动
+        summary_class = 'summary-cards many' if len(self.brokers) > self.MANY_BROKERS else 'summary-cards'
+        yield self.HEAD.format(generated_at=self.generated_at.strftime("%Y-%m-%d %H:%M:%S"),
+                               summary_class=summary_class)
+
+        # 统计卡片
+        for broker in self.brokers:
+            yield self._cached(broker, 'card', data, lambda: self._summary_card(broker, data))
+
+        yield '''        </div>
+        
+        <div class="section">
+            <h2 class="section-title">📊 各席位持仓对比</h2>
+            <div class="comparison">
+                <div class="compare-box">
+                    <div class="compare-title long">🔴 净多品种</div>
+'''
+        # 净多对比
+        for broker in self.brokers:
+            yield self._cached(broker, 'long', data, lambda: self._compare_line(broker, data, 'top_long', 'long'))
+
+        yield '''                </div>
+                <div class="compare-box">
+                    <div class="compare-title short">🟢 净空品种</div>
+'''
+        # 净空对比
+        for broker in self.brokers:
+            yield self._cached(broker, 'short', data, lambda: self._compare_line(broker, data, 'top_short', 'short'))
+
+        yield '''                </div>
+            </div>
+        </div>
+'''
+        if self.analytics is not None and not self.analytics['seats'].empty:
+            if self.fragments is None:
+                yield from self._analytics_sections(self.analytics)
+            else:
+                key = _frame_digest(self.analytics['seats'], self.analytics['consensus'],
+                                    salt=str(self.analytics['window']))
+                yield self.fragments.get(FragmentCache.ANALYTICS, 'sections', key,
+                                         lambda: ''.join(self._analytics_sections(self.analytics)))
+
+        yield '''        
+        <div class="section">
+            <h2 class="section-title">📈 各席位持仓明细</h2>
+            <div class="tabs">
+'''
+        # 标签
+        for i, broker in enumerate(self.brokers):
+            active = 'active' if i == 0 else ''
+            yield self._cached(broker, f'tab{active}', data,
+                               lambda: f'                <div class="tab {active}" data-broker="{escape(broker)}">'
+                                       f'{escape(broker)}</div>\n')
+        yield '            </div>\n'
+
+        # 表格
+        yield from self._details(data)
+
+        yield self.FOOT
+        yield self.SCRIPT
+        yield self.END
+
+    def _details(self, data: dict):
+        """各席位明细表：每个席位一张完整的静态表格"""
+        for i, broker in enumerate(self.brokers):
+            yield from self._detail_table(broker, data, data['groups'][broker], i == 0)
+
+    def _prepare(self, df: pd.DataFrame) -> dict:
+        """一次性取出各列并按席位分组，得到每个席位的行号数组；
+        统计卡片与对比区的数据由席位 × 品种矩阵一次算出"""
+        indices = df.groupby('席位', sort=False).indices if not df.empty else {}
+        empty = np.empty(0, dtype=np.intp)
+        net = df['净持仓'].to_numpy(dtype='float64', na_value=np.nan)
+        groups = {broker: indices.get(broker, empty) for broker in self.brokers}
+        matrix = PositionMatrix.from_frame(df, self.brokers)
+        data = {
+            'groups': groups,
+            'matrix': matrix,
+            'counts': [c.tolist() for c in matrix.counts()],
+            'top_long': matrix.top_k(self.TOP_N, PositionMatrix.LONG),
+            'top_short': matrix.top_k(self.TOP_N, PositionMatrix.SHORT),
+            'variety': df['品种'].tolist(),
+            'direction': df['净方向'].tolist(),
+            # 明细表按绝对值降序、空值排在最后
+            'net_abs_rank': np.where(np.isnan(net), -np.inf, np.abs(net)),
+            'ints': {c: self._int_column(df[c]) for c in self.INT_COLUMNS},
+        }
+        if self.fragments is not None:
+            # 行哈希覆盖明细行显示的全部内容（空值与 0 区分，净持仓为空影响对比区与排序）；
+            # 席位哈希由该席位各行哈希按顺序组成
+            row_hash = pd.util.hash_pandas_object(df[['品种', '净方向'] + self.INT_COLUMNS], index=False).to_numpy()
+            data['row_keys'] = row_hash.tolist()
+            data['seat_keys'] = {broker: hashlib.blake2b(row_hash[rows].tobytes(), digest_size=16).hexdigest()
+                                 for broker, rows in groups.items()}
+        return data
+
+    def _cached(self, broker: str, part: str, data: dict, build) -> str:
+        """席位片段：内容未变时取自片段缓存，否则调用 build 渲染"""
+        if self.fragments is None:
+            return build()
+        return self.fragments.get(broker, part, data['seat_keys'][broker], build)
+
+    def _summary_card(self, broker: str, data: dict) -> str:
+        i = data['matrix'].seat_index[broker]
+        total, long_count, short_count = (c[i] for c in data['counts'])
+        pct = round(long_count / (total if total else 1) * 100)
+        return f'''            <div class="broker-card">
+                <div class="broker-name">{escape(broker)}</div>
+                <div class="broker-stats">
+                    <div class="stat-item"><div class="stat-value">{total}</div><div class="stat-label">持仓品种</div></div>
+                    <div class="stat-item"><div class="stat-value long">{long_count}</div><div class="stat-label">净多品种</div></div>
+                    <div class="stat-item"><div class="stat-value short">{short_count}</div><div class="stat-label">净空品种</div></div>
+                    <div class="stat-item"><div class="stat-value">{pct}%</div><div class="stat-label">多头占比</div></div>
+                </div>
+            </div>
+'''
+
+    def _compare_line(self, broker: str, data: dict, top: str, css: str) -> str:
+        matrix = data['matrix']
+        # 并列时按原表顺序，与 nlargest(keep='first') 一致
+        top = data[top][matrix.seat_index[broker]]
+        varieties = matrix.varieties
+        tags = ''.join(f'<span class="variety-tag {css}">{escape(str(varieties[j]))}</span>' for j in top[top >= 0])
+        return f'                    <div style="margin-bottom:10px;"><strong>{escape(broker)}:</strong> {tags}</div>\n'
+
+    def _detail_table(self, broker: str, data: dict, rows, active: bool):
+        """逐行生成单个席位的明细表"""
+        yield f'''            <div class="tab-content {'active' if active else ''}" id="tab-{escape(broker)}">
+                <div class="table-container">
+                    <table>
+                        <thead>
+                            <tr><th>品种</th><th>净方向</th><th>净持仓</th><th>净变化</th><th>多头持仓</th><th>多头变化</th><th>空头持仓</th><th>空头变化</th></tr>
+                        </thead>
+                        <tbody>
+'''
+        ordered = rows[np.argsort(-data['net_abs_rank'][rows], kind='stable')]
+        variety, direction, ints = data['variety'], data['direction'], data['ints']
+        net_pos, net_chg = ints['净持仓'], ints['净变化']
+        long_pos, long_chg = ints['多头持仓'], ints['多头变化']
+        short_pos, short_chg = ints['空头持仓'], ints['空头变化']
+
+        def render_row(i):
+            return self._row(variety[i], direction[i], net_pos[i], net_chg[i],
+                             long_pos[i], long_chg[i], short_pos[i], short_chg[i])
+
+        if self.fragments is None:
+            for i in ordered.tolist():
+                yield render_row(i)
+        else:
+            # 逐品种行复用：席位有变化时，未变的品种行仍取自缓存
+            yield self.fragments.rows(broker, data['seat_keys'][broker], data['row_keys'],
+                                      ordered.tolist(), render_row)
+
+        yield '''                        </tbody>
+                    </table>
+                </div>
+            </div>
+'''
+
+    def _analytics_sections(self, analytics: dict):
+        """多日分析：滚动净变化、异常变化与品种一致性"""
+        seats = analytics['seats']
+        window = analytics['window']
+        headers = ['席位', '品种', '净头寸', '当日变化', f'{window}日变化', '连续天数', 'Z值']
+
+        movers = seats.iloc[np.argsort(-seats['N日变化'].abs().to_numpy(), kind='stable')[:self.ANALYTICS_TOP]]
+        yield from self._analytics_table(f'🧭 近{window}个交易日净头寸变化', headers, movers, self._seat_cells)
+
+        z = seats['Z值'].abs().to_numpy()
+        alerts = np.flatnonzero(z >= self.Z_ALERT)
+        alerts = seats.iloc[alerts[np.argsort(-z[alerts], kind='stable')][:self.ANALYTICS_TOP]]
+        if not alerts.empty:
+            yield from self._analytics_table(f'⚡ 异常变化（|Z| ≥ {self.Z_ALERT:g}）', headers, alerts, self._seat_cells)
+
+        consensus = analytics['consensus'].head(self.ANALYTICS_TOP)
+        yield from self._analytics_table(
+            f'🤝 品种一致性（{window}日增减方向）',
+            ['品种', '席位数', '净多席位', '增多席位', '增空席位', '一致度', f'{window}日合计', '净头寸合计'],
+            consensus, self._consensus_cells)
+
+    def _analytics_table(self, title: str, headers: list, frame: pd.DataFrame, cells):
+        yield f'''        
+        <div class="section">
+            <h2 class="section-title">{title}</h2>
+            <div class="table-container">
+                <table>
+                    <thead>
+                        <tr>{''.join(f'<th>{h}</th>' for h in headers)}</tr>
+                    </thead>
+                    <tbody>
+'''
+        for row in frame.itertuples(index=False):
+            yield f'                        <tr>{cells(row)}</tr>\n'
+        yield '''                    </tbody>
+                </table>
+            </div>
+        </div>
+'''
+
+    def _seat_cells(self, row) -> str:
+        net, today, rolling, streak, z = row[2], row[3], row[4], row[5], row[6]
+        streak_text = f"{'增多' if streak > 0 else '增空'} {abs(streak)} 天" if streak else '-'
+        return (f'<td>{escape(str(row[0]))}</td><td>{escape(str(row[1]))}</td>'
+                f'<td class="{"long" if net > 0 else "short"}">{net:+,}</td>'
+                f'<td class="{self._change_class(today)}">{today:+,}</td>'
+                f'<td class="{self._change_class(rolling)}">{rolling:+,}</td>'
+                f'<td class="{self._change_class(streak)}">{streak_text}</td>'
+                f'<td>{"-" if np.isnan(z) else f"{z:+.2f}"}</td>')
+
+    def _consensus_cells(self, row) -> str:
+        agreement, rolling, net = row[5], row[6], row[7]
+        return (f'<td>{escape(str(row[0]))}</td><td>{row[1]}</td><td>{row[2]}</td>'
+                f'<td class="positive">{row[3]}</td><td class="negative">{row[4]}</td>'
+                f'<td class="{self._change_class(agreement)}">{agreement:+.0%}</td>'
+                f'<td class="{self._change_class(rolling)}">{rolling:+,}</td>'
+                f'<td class="{"long" if net > 0 else "short"}">{net:+,}</td>')
+
+    def _row(self, variety, net_dir, net_pos, net_chg, long_pos, long_chg, short_pos, short_chg) -> str:
+        return self.ROW.format(
+            variety=escape(str(variety)),
+            net_dir=net_dir,
+            net_class='long' if net_dir == '多' else 'short',
+            net_pos=net_pos,
+            net_chg=net_chg,
+            net_chg_class=self._change_class(net_chg),
+            net_chg_sign='+' if net_chg > 0 else '',
+            long_pos=long_pos,
+            long_chg=long_chg,
+            long_chg_class=self._change_class(long_chg),
+            long_chg_sign='+' if long_chg > 0 else '',
+            short_pos=short_pos,
+            short_chg=short_chg,
+            short_chg_class=self._change_class(short_chg),
+            short_chg_sign='+' if short_chg > 0 else '',
+        )
+
+    @staticmethod
+    def _int_column(series: pd.Series) -> list:
+        """空值按 0 处理的整数列"""
+        return series.fillna(0).astype('int64').tolist()
+
+    @staticmethod
+    def _change_class(value: int) -> str:
+        return 'positive' if value > 0 else 'negative' if value < 0 else ''
+
+
+class LazyReportRenderer(ReportRenderer):
+    """大报告渲染器：明细数据以列式 JSON 嵌入一次，由浏览器按需渲染当前席位的可见行"""
+
+    ROW_HEIGHT = 44  # 虚拟滚动的固定行高（像素），需与 CSS 中 .vrow 一致
+
+    STYLE = '''        <style>
+            .detail-toolbar {{ display: flex; gap: 10px; align-items: center; margin-bottom: 12px; color: #888; }}
+            .detail-filter {{
+                padding: 8px 12px;
+                background: rgba(255, 255, 255, 0.05);
+                border: 1px solid rgba(255, 255, 255, 0.1);
+                border-radius: 8px;
+                color: #e0e0e0;
+                min-width: 220px;
+            }}
+            th.sortable {{ cursor: pointer; user-select: none; }}
+            th.sortable.asc::after {{ content: " ▲"; }}
+            th.sortable.desc::after {{ content: " ▼"; }}
+            tr.vrow {{ height: {row_height}px; }}
+            tr.vrow td {{ padding-top: 0; padding-bottom: 0; white-space: nowrap; }}
+            tr.spacer td {{ padding: 0; border: none; }}
+        </style>
+'''
+
+    DETAIL = '''            <div class="detail-toolbar">
+                <input class="detail-filter" id="detail-filter" placeholder="筛选品种..." oninput="filterRows(this.value)">
+                <span id="detail-count"></span>
+            </div>
+            <div class="table-container" id="detail-scroll">
+                <table>
+                    <thead>
+                        <tr>
+                            <th class="sortable" data-key="variety">品种</th><th class="sortable" data-key="dir">净方向</th>
+                            <th class="sortable" data-key="net">净持仓</th><th class="sortable" data-key="net_chg">净变化</th>
+                            <th class="sortable" data-key="long">多头持仓</th><th class="sortable" data-key="long_chg">多头变化</th>
+                            <th class="sortable" data-key="short">空头持仓</th><th class="sortable" data-key="short_chg">空头变化</th>
+                        </tr>
+                    </thead>
+                    <tbody id="detail-body"></tbody>
+                </table>
+            </div>
+'''
+
+    SCRIPT = '''    <script>
+        const DATA = JSON.parse(document.getElementById('report-data').textContent);
+        const ROW_HEIGHT = DATA.row_height;
+        const KEYS = ['net', 'net_chg', 'long', 'long_chg', 'short', 'short_chg'];
+        const bySeat = {};
+        const state = { broker: DATA.brokers[0], rows: [], key: null, asc: false, filter: '' };
+
+        // 某席位的行号在首次打开该标签时才建立
+        function seatRows(broker) {
+            if (!bySeat[broker]) {
+                const code = DATA.brokers.indexOf(broker);
+                const rows = [];
+                DATA.seat.forEach((s, i) => { if (s === code) rows.push(i); });
+                bySeat[broker] = rows;
+            }
+            return bySeat[broker];
+        }
+
+        function value(key, i) {
+            if (key === 'variety') return DATA.varieties[DATA.variety[i]];
+            if (key === 'dir') return DATA.dir[i];
+            return DATA[key][i];
+        }
+
+        function refresh() {
+            let rows = seatRows(state.broker);
+            if (state.filter) rows = rows.filter(i => DATA.varieties[DATA.variety[i]].includes(state.filter));
+            if (state.key) {
+                const sign = state.asc ? 1 : -1;
+                rows = rows.slice().sort((a, b) => {
+                    const x = value(state.key, a), y = value(state.key, b);
+                    return (x < y ? -1 : x > y ? 1 : 0) * sign || a - b;
+                });
+            } else {
+                // 默认按净持仓绝对值降序，与静态报告一致
+                rows = rows.slice().sort((a, b) => Math.abs(DATA.net[b]) - Math.abs(DATA.net[a]) || a - b);
+            }
+            state.rows = rows;
+            document.getElementById('detail-count').textContent = `共 ${rows.length} 个品种`;
+            document.getElementById('detail-scroll').scrollTop = 0;
+            draw();
+        }
+
+        function fmt(n) { return n.toLocaleString('en-US'); }
+        function esc(text) {
+            return String(text).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'})[c]);
+        }
+        function chg(n) {
+            const cls = n > 0 ? 'positive' : n < 0 ? 'negative' : '';
+            return `<td class="${cls}">${n > 0 ? '+' : ''}${fmt(n)}</td>`;
+        }
+
+        // 只渲染可视区域内的行，上下用占位行撑开滚动高度
+        function draw() {
+            const scroll = document.getElementById('detail-scroll');
+            const total = state.rows.length;
+            const first = Math.max(0, Math.floor(scroll.scrollTop / ROW_HEIGHT) - 10);
+            const last = Math.min(total, first + Math.ceil(scroll.clientHeight / ROW_HEIGHT) + 20);
+            const html = [`<tr class="spacer"><td colspan="8" style="height:${first * ROW_HEIGHT}px"></td></tr>`];
+            for (let k = first; k < last; k++) {
+                const i = state.rows[k];
+                const dir = DATA.dir[i];
+                html.push(`<tr class="vrow"><td>${esc(DATA.varieties[DATA.variety[i]])}</td>` +
+                    `<td class="${dir === '多' ? 'long' : 'short'}">净${dir}</td>` +
+                    `<td>${fmt(DATA.net[i])}</td>${chg(DATA.net_chg[i])}` +
+                    `<td>${fmt(DATA.long[i])}</td>${chg(DATA.long_chg[i])}` +
+                    `<td>${fmt(DATA.short[i])}</td>${chg(DATA.short_chg[i])}</tr>`);
+            }
+            html.push(`<tr class="spacer"><td colspan="8" style="height:${(total - last) * ROW_HEIGHT}px"></td></tr>`);
+            document.getElementById('detail-body').innerHTML = html.join('');
+        }
+
+        function showTab(tab) {
+            document.querySelectorAll('.tab').forEach(el => el.classList.remove('active'));
+            tab.classList.add('active');
+            state.broker = tab.dataset.broker;
+            refresh();
+        }
+        document.querySelectorAll('.tab').forEach(tab => tab.addEventListener('click', () => showTab(tab)));
+
+        function filterRows(text) {
+            state.filter = text.trim();
+            refresh();
+        }
+
+        document.querySelectorAll('th.sortable').forEach(th => th.addEventListener('click', () => {
+            state.asc = state.key === th.dataset.key ? !state.asc : false;
+            state.key = th.dataset.key;
+            document.querySelectorAll('th.sortable').forEach(el => el.classList.remove('asc', 'desc'));
+            th.classList.add(state.asc ? 'asc' : 'desc');
+            refresh();
+        }));
+
+        let pending = false;
+        document.getElementById('detail-scroll').addEventListener('scroll', () => {
+            if (pending) return;
+            pending = true;
+            requestAnimationFrame(() => { pending = false; draw(); });
+        });
+
+        refresh();
+    </script>
+'''
+
+    def _details(self, data: dict):
+        """明细区只输出一个表格骨架与列式数据，行由脚本按需渲染"""
+        yield self.STYLE.format(row_height=self.ROW_HEIGHT)
+        yield self.DETAIL
+        yield '        <script type="application/json" id="report-data">'
+        yield self._payload(data)
+        yield '</script>\n'
+
+    def _payload(self, data: dict) -> str:
+        """列式 JSON：品种做字典编码，席位用序号表示"""
+        seat = np.full(len(data['variety']), -1, dtype=np.int64)
+        for code, broker in enumerate(self.brokers):
+            seat[data['groups'][broker]] = code
+        variety_codes, varieties = pd.factorize(pd.Series(data['variety'], dtype=object))
+        ints = data['ints']
+        payload = {
+            'row_height': self.ROW_HEIGHT,
+            'brokers': self.brokers,
+            'varieties': [str(v) for v in varieties],
+            'seat': seat.tolist(),
+            'variety': variety_codes.tolist(),
+            'dir': data['direction'],
+            'net': ints['净持仓'],
+            'net_chg': ints['净变化'],
+            'long': ints['多头持仓'],
+            'long_chg': ints['多头变化'],
+            'short': ints['空头持仓'],
+            'short_chg': ints['空头变化'],
+        }
+        # 防止数据中的 "</script>" 提前结束脚本块
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+class FragmentCache:
+    """报告片段缓存：按席位内容哈希保存统计卡片、对比行、标签与明细表各品种行的 HTML，
+    存放在 SQLite 中供下次运行复用，保存时只写入有变化的席位"""
+
+    FILE = "report_fragments.db"
+    VERSION = 2  # 修改片段模板后递增，旧缓存整体失效
+    ANALYTICS = "__analytics__"  # 多日分析区使用的条目名
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS fragments (
+            name TEXT PRIMARY KEY,
+            key TEXT NOT NULL,
+            parts TEXT NOT NULL,
+            rows_key TEXT,
+            rows TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT OR IGNORE INTO meta VALUES ('revision', 0);
+    '''
+
+    # 跨实例共享：常驻模式下多次生成报告时，数据库未被其他进程改动就直接复用内存中的缓存
+    _loaded = {}
+
+    def __init__(self, path: str = None):
+        self.path = path
+        # 席位 -> {"key": 内容哈希, "parts": {片段名: HTML}, "rows_key": 行缓存对应的内容哈希, "rows": {行哈希: HTML}}
+        self.entries = {}
+        self.reused = 0
+        self.rendered = 0
+        self.revision = None
+        self._used = set()
+        self._dirty = set()
+
+    @classmethod
+    def load(cls, path: str = None) -> "FragmentCache":
+        """读取片段缓存；版本不符时清空"""
+        path = os.path.abspath(path or cls.FILE)
+        conn = cls._connect(path)
+        try:
+            revision = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+            cached = cls._loaded.get(path)
+            if cached is not None and cached.revision == revision:
+                cached._reset_counters()
+                return cached
+
+            cache = cls(path)
+            for name, key, parts, rows_key, rows in conn.execute("SELECT * FROM fragments"):
+                cache.entries[name] = {"key": key, "parts": json.loads(parts), "rows_key": rows_key,
+                                       "rows": dict(json.loads(rows))}
+            cache.revision = revision
+        finally:
+            conn.close()
+        cls._loaded[path] = cache
+        return cache
+
+    def get(self, name: str, part: str, key: str, build) -> str:
+        """取 name 的 part 片段；内容哈希变化时丢弃该条目的旧片段"""
+        entry = self._entry(name)
+        if entry["key"] != key:
+            entry["key"] = key
+            entry["parts"] = {}
+        html = entry["parts"].get(part)
+        if html is None:
+            html = entry["parts"][part] = build()
+            self.rendered += 1
+            self._dirty.add(name)
+        else:
+            self.reused += 1
+        return html
+
+    def rows(self, name: str, key: str, row_keys: list, indices: list, build) -> str:
+        """按 indices 的顺序拼接明细行。席位内容未变时整体复用；否则逐行按行哈希复用，
+        其余调用 build(行号) 渲染，本次未出现的行随之淘汰"""
+        entry = self._entry(name)
+        if entry["rows_key"] == key:
+            # 内容相同则排序相同，缓存中的行已按显示顺序存放
+            self.reused += len(entry["rows"])
+            return ''.join(entry["rows"].values())
+
+        previous = entry["rows"]
+        current = {}
+        for index in indices:
+            row_key = row_keys[index]
+            html = previous.get(row_key)
+            if html is None:
+                html = build(index)
+                self.rendered += 1
+            else:
+                self.reused += 1
+            current[row_key] = html
+        entry["rows_key"] = key
+        entry["rows"] = current
+        self._dirty.add(name)
+        return ''.join(current.values())
+
+    def save(self):
+        """写入有变化的席位，删除本次渲染没有用到的条目"""
+        unused = [name for name in self.entries if name not in self._used]
+        for name in unused:
+            del self.entries[name]
+        if not self.path or not (self._dirty or unused):
+            return
+        conn = self._connect(self.path)
+        with conn:
+            conn.executemany("DELETE FROM fragments WHERE name = ?", [(name,) for name in unused])
+            conn.executemany("INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?)", [
+                (name, entry["key"], json.dumps(entry["parts"], ensure_ascii=False), entry["rows_key"],
+                 json.dumps(list(entry["rows"].items()), ensure_ascii=False))
+                for name, entry in ((name, self.entries[name]) for name in self._dirty)])
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            self.revision = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+        conn.close()
+        self._dirty = set()
+
+    def _entry(self, name: str) -> dict:
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self.entries[name] = {"key": None, "parts": {}, "rows_key": None, "rows": {}}
+        self._used.add(name)
+        return entry
+
+    def _reset_counters(self):
+        self.reused = self.rendered = 0
+        self._used = set()
+
+    @classmethod
+    def _connect(cls, path: str):
+        conn = sqlite3.connect(path)
+        conn.executescript(cls.SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != cls.VERSION:
+            with conn:
+                conn.execute("DELETE FROM fragments")
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            conn.execute(f"PRAGMA user_version = {cls.VERSION}")
+        return conn
+
+
+def _frame_digest(*frames: pd.DataFrame, salt: str = '') -> str:
+    """DataFrame 内容哈希（含列名与行顺序）"""
+    digest = hashlib.blake2b(salt.encode('utf-8'), digest_size=16)
+    for frame in frames:
+        digest.update('|'.join(map(str, frame.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
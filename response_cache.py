@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+原始响应缓存
+把抓取到的接口 JSON 和页面表格记录按内容哈希保存到磁盘，索引按 (类型, 地址/席位, 交易日) 记录，
+支持条件请求（ETag / Last-Modified）、按保存时间和总大小淘汰，以及离线重放
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class ResponseCache:
+    """按内容寻址的原始响应缓存"""
+
+    CACHE_DIR = "cache"
+    TTL_DAYS = 30  # 条目保存天数
+    MAX_BYTES = 512 * 1024 * 1024  # 缓存总大小上限
+
+    API = "api"  # 接口原始 JSON，键为地址
+    DOM = "dom"  # 页面表格记录，键为席位
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS entries (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (kind, key, trade_date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_date ON entries (trade_date, kind);
+        CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries (digest);
+    '''
+
+    def __init__(self, root: str = None, ttl_days: float = None, max_bytes: int = None):
+        self.root = root or self.CACHE_DIR
+        self.ttl_days = self.TTL_DAYS if ttl_days is None else ttl_days
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.root, "index.db"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, kind: str, key: str, trade_date: str, payload, headers: dict = None) -> str:
+        """保存一条记录，内容相同的记录共用同一个文件，返回内容哈希"""
+        blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(blob).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，避免中断时留下半个文件
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, key, trade_date) DO UPDATE SET digest = excluded.digest, "
+                "size = excluded.size, etag = excluded.etag, last_modified = excluded.last_modified, "
+                "accessed = excluded.accessed",
+                (kind, key, trade_date, digest, len(blob), headers.get("etag"),
+                 headers.get("last-modified"), now, now),
+            )
+        return digest
+
+    def get(self, kind: str, key: str, trade_date: str = None):
+        """读取记录；不指定交易日时取最新一条，不存在返回 None"""
+        row = self._lookup(kind, key, trade_date)
+        if row is None:
+            return None
+        return self._load(row[0], kind, key, row[1])
+
+    def validators(self, url: str) -> dict:
+        """最近一次接口响应的条件请求头"""
+        row = self.conn.execute(
+            "SELECT etag, last_modified FROM entries WHERE kind = ? AND key = ? "
+            "ORDER BY trade_date DESC LIMIT 1", (self.API, url)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def entries(self, kind: str, trade_date: str):
+        """某交易日某类型的全部记录，逐条返回 (键, 内容)，按键排序保证重放顺序确定"""
+        rows = self.conn.execute(
+            "SELECT key, digest FROM entries WHERE kind = ? AND trade_date = ? ORDER BY key",
+            (kind, trade_date)).fetchall()
+        for key, digest in rows:
+            payload = self._load(digest, kind, key, trade_date)
+            if payload is not None:
+                yield key, payload
+
+    def dates(self) -> list:
+        return [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT trade_date FROM entries ORDER BY trade_date")]
+
+    def latest_date(self):
+        return self.conn.execute("SELECT MAX(trade_date) FROM entries").fetchone()[0]
+
+    def evict(self) -> int:
+        """删除过期条目，再按最近访问时间淘汰直到总大小不超过上限，返回删除的条目数"""
+        removed = 0
+        with self.conn:
+            if self.ttl_days:
+                cutoff = time.time() - self.ttl_days * 86400
+                removed += self.conn.execute("DELETE FROM entries WHERE created < ?", (cutoff,)).rowcount
+
+            total = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)").fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                rows = self.conn.execute(
+                    "SELECT kind, key, trade_date, size FROM entries ORDER BY accessed").fetchall()
+                for kind, key, trade_date, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self.conn.execute("DELETE FROM entries WHERE kind = ? AND key = ? AND trade_date = ?",
+                                      (kind, key, trade_date))
+                    total -= size
+                    removed += 1
+        self._remove_orphans()
+        return removed
+
+    def _lookup(self, kind: str, key: str, trade_date: str = None):
+        if trade_date is None:
+            return self.conn.execute(
+                "SELECT digest, trade_date FROM entries WHERE kind = ? AND key = ? "
+                "ORDER BY trade_date DESC LIMIT 1", (kind, key)).fetchone()
+        return self.conn.execute(
+            "SELECT digest, trade_date FROM entries WHERE kind = ? AND key = ? AND trade_date = ?",
+            (kind, key, trade_date)).fetchone()
+
+    def _load(self, digest: str, kind: str, key: str, trade_date: str):
+        try:
+            with gzip.open(self._object_path(digest), "rb") as f:
+                payload = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE entries SET accessed = ? WHERE kind = ? AND key = ? AND trade_date = ?",
+                (time.time(), kind, key, trade_date))
+        return payload
+
+    def _remove_orphans(self):
+        """删除不再被任何条目引用的内容文件"""
+        live = {r[0] for r in self.conn.execute("SELECT DISTINCT digest FROM entries")}
+        objects = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects):
+            folder = os.path.join(objects, prefix)
+            for name in os.listdir(folder):
+                if name.endswith(".json.gz") and name.split(".")[0] not in live:
+                    os.remove(os.path.join(folder, name))
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+登录状态管理
+登录状态文件（Playwright storage_state）在多个进程间共享：读写都加文件锁，写入先写临时文件再改名；
+需要交互登录时另持一把登录锁，并发运行的其他进程等待其完成后直接使用新的登录状态。
+登录是否有效优先用一次持仓接口请求确认，不加载整个页面；网络异常等无法判断的情况不视为登录失效
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，退化为不加锁
+    fcntl = None
+
+
+class SessionManager:
+    """共享登录状态文件的读写与有效性验证"""
+
+    AUTH_FILE = "auth_state.json"
+    VALIDATE_INTERVAL = 1800  # 距上次确认有效不超过该秒数且 Cookie 未过期时，不再访问网络
+    PROBE_TIMEOUT = 10.0  # 验证请求的超时（秒）
+
+    VALID = "valid"
+    INVALID = "invalid"
+    UNKNOWN = "unknown"  # 网络异常、服务端错误等，无法判断登录是否有效
+
+    # 跨实例共享：常驻模式每次抓取创建新的爬虫实例，上次确认有效的时间按文件路径保留
+    _validated = {}
+
+    def __init__(self, path: str = None, base_url: str = None, probe_url: str = None, metrics=None):
+        self.path = path or self.AUTH_FILE
+        self.base_url = base_url
+        self.probe_url = probe_url  # 需要登录才能正常返回的接口；为 None 时改用页面检查
+        self.metrics = metrics
+        self._loaded_mtime = None
+
+    @property
+    def validated_at(self) -> float:
+        return self._validated.get(os.path.abspath(self.path), 0.0)
+
+    def reset_validation(self):
+        """浏览器重新启动后，之前的确认结果不再适用"""
+        self._validated.pop(os.path.abspath(self.path), None)
+
+    def load(self):
+        """读取登录状态，文件不存在或损坏时返回 None"""
+        with self._lock(exclusive=False):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    state = json.load(f)
+                self._loaded_mtime = os.stat(self.path).st_mtime_ns
+            except (OSError, ValueError):
+                return None
+        return state if isinstance(state, dict) else None
+
+    def changed_on_disk(self) -> bool:
+        """上次读取后文件是否被其他进程更新过"""
+        try:
+            return os.stat(self.path).st_mtime_ns != self._loaded_mtime
+        except OSError:
+            return False
+
+    async def save(self, context) -> bool:
+        """把 context 当前的登录状态写回文件；内容未变时不写，返回是否写入"""
+        state = await context.storage_state()
+        blob = json.dumps(state, ensure_ascii=False, indent=2, sort_keys=True)
+        with self._lock(exclusive=True):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    if f.read() == blob:
+                        return False
+            except OSError:
+                pass
+            # 先写临时文件再改名，读取方不会看到写了一半的文件
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        return True
+
+    async def validate(self, context, page_check=None) -> str:
+        """验证 context 的登录状态，返回 VALID / INVALID / UNKNOWN。
+        先看 Cookie 是否已全部过期，再请求 probe_url；没有可用接口时调用 page_check()（返回是否已登录）"""
+        start = time.perf_counter()
+        status = await self._validate(context, page_check)
+        if status == self.VALID:
+            self._validated[os.path.abspath(self.path)] = time.time()
+        if self.metrics is not None:
+            self.metrics.record("session_validate", time.perf_counter() - start, source=status)
+        return status
+
+    async def _validate(self, context, page_check) -> str:
+        now = time.time()
+        cookies = await context.cookies(self.base_url) if self.base_url else await context.cookies()
+        live = [c for c in cookies if not 0 < c.get("expires", -1) < now]
+        if not live:
+            return self.INVALID
+        if len(live) == len(cookies) and now - self.validated_at < self.VALIDATE_INTERVAL:
+            return self.VALID
+
+        if self.probe_url:
+            try:
+                response = await context.request.get(self.probe_url, timeout=self.PROBE_TIMEOUT * 1000)
+            except Exception:
+                return self.UNKNOWN
+            if response.status in (401, 403):
+                return self.INVALID
+            if response.status != 200:
+                return self.UNKNOWN
+            try:
+                data = await response.json()
+            except Exception:
+                # 未登录时可能被重定向到登录页，返回的是 HTML
+                return self.INVALID
+            # 与直连模式一致：接口返回的 code 非 0 视为登录失效
+            return self.VALID if isinstance(data, dict) and data.get("code") == 0 else self.INVALID
+
+        if page_check is None:
+            return self.UNKNOWN
+        try:
+            return self.VALID if await page_check() else self.INVALID
+        except Exception:
+            return self.UNKNOWN
+
+    @contextmanager
+    def login_lock(self):
+        """交互登录期间持有；其他进程在此等待，拿到锁后应先检查 changed_on_disk()"""
+        with self._lock(exclusive=True, suffix=".login"):
+            yield
+
+    @contextmanager
+    def _lock(self, exclusive: bool, suffix: str = ".lock"):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + suffix, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)